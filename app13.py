@@ -1,20 +1,989 @@
-import pandas as pd
+from time import perf_counter, monotonic
+_PROCESS_START = perf_counter()
+
 import random
 import json
 import os
 import re
 import shutil
+import csv
+import sqlite3
+import struct
+import zlib
 import pickle
 import atexit
+import threading
 import traceback
+import copy
+import sys
+import subprocess
+import queue
+import heapq
+import functools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, time, timedelta
-from openpyxl import load_workbook
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from collections import defaultdict
+from bisect import bisect_left, bisect_right
+
+EXPORT_HEADERS = ["Hari", "Mata Kuliah", "Kelas", "Ruangan", "Jam", "SKS", "Semester", "Dosen", "Jumlah Mahasiswa"]
+
+
+def schedule_to_row(sched):
+    return (
+        sched['hari'],
+        sched['mata_kuliah'],
+        sched['kelas'],
+        sched.get('ruangan', ''),
+        sched['jam'],
+        sched['sks'],
+        sched['semester'],
+        sched['dosen'],
+        sched.get('jumlah_mahasiswa', '')
+    )
+
+
+def safe_filename(name):
+    return re.sub(r'[^a-zA-Z0-9]', '_', str(name))
+
+
+def open_folder(path):
+    """Buka folder output dengan file manager bawaan sistem operasi"""
+    try:
+        if sys.platform.startswith('win'):
+            os.startfile(path)
+        elif sys.platform == 'darwin':
+            subprocess.Popen(['open', path])
+        else:
+            subprocess.Popen(['xdg-open', path])
+    except Exception as e:
+        print(f"Error opening folder: {e}")
+
+
+def _json_default(value):
+    # Nilai numpy (hasil pandas) punya .item() untuk dikonversi ke tipe Python
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+MAPPING_SHEET = 'Mapping mata kuliah'
+
+
+def _plain(value):
+    # Nilai numpy dari pandas diubah ke tipe Python agar ringan di-pickle/JSON
+    return value.item() if hasattr(value, 'item') else value
+
+
+def read_mapping_rows(excel_path, sheet_name=MAPPING_SHEET):
+    """Baca satu sheet mapping mata kuliah menjadi list baris jadwal (tanpa row_id)"""
+    import pandas as pd
+    df = pd.read_excel(excel_path, sheet_name=sheet_name, skiprows=2)
+    df = df.dropna(subset=['Nama Dosen', 'Mata Kuliah'])
+
+    # Konversi kolom SKS dan Semester ke integer
+    df['SKS'] = df['SKS'].fillna(0).astype(int)
+    df['Semester'] = df['Semester'].fillna(0).astype(int)
+
+    rows = []
+    for idx, row in df.iterrows():
+        rows.append({
+            'source': 'excel',
+            'excel_index': _plain(idx),
+            'dosen': _plain(row['Nama Dosen']),
+            'mata_kuliah': _plain(row['Mata Kuliah']),
+            'kelas': _plain(row['Kelas']),
+            'hari': "",
+            'jam': "",
+            'semester': _plain(row['Semester']),  # Sudah integer
+            'sks': _plain(row['SKS']),            # Sudah integer
+            'ruangan': "",
+            'jumlah_mahasiswa': _plain(row.get('Jumlah Mahasiswa', 0)),
+            'is_fixed': False  # Default tidak tetap
+        })
+    return rows
+
+
+def _read_mapping_source(source):
+    # Dijalankan di process pool: source berupa (path, sheet)
+    path, sheet_name = source
+    rows = read_mapping_rows(path, sheet_name)
+    for row in rows:
+        row['source_file'] = os.path.basename(path)
+        row['source_sheet'] = sheet_name
+    return rows
+
+
+def normalize_name(name):
+    """Kunci pembanding nama: spasi dirapikan dan huruf besar/kecil diabaikan"""
+    return ' '.join(str(name).split()).casefold()
+
+
+def jam_to_minutes(jam):
+    """Ubah string jam 'HH:MM - HH:MM' (boleh berakhiran '(online)') menjadi menit"""
+    parts = re.findall(r'(\d{1,2})[:.](\d{2})', str(jam or ''))
+    if len(parts) != 2:
+        return None, None
+    (sh, sm), (eh, em) = parts
+    return int(sh) * 60 + int(sm), int(eh) * 60 + int(em)
+
+
+def minute_bits(start, end):
+    """Bitmask menit [start, end); kosong jika rentangnya tidak valid"""
+    if start is None or end is None or end <= start:
+        return 0
+    return (1 << end) - (1 << start)
+
+
+def unrecorded_batch(method):
+    """Tandai method generator yang mengubah baris di tempat dan baru mencatatnya di akhir.
+
+    Selama method berjalan isi SQLite store tertinggal dari data di memori,
+    sehingga query lewat store dialihkan ke pemindaian memori (lihat store_ready).
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._unrecorded_batches += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._unrecorded_batches -= 1
+    return wrapper
+
+
+def write_json_atomic(path, data):
+    """Tulis JSON ke file sementara lalu rename, sehingga file tidak pernah setengah jadi"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, default=_json_default)
+    os.replace(temp_path, path)
+
+
+_worker_exporter = None
+
+
+def _init_export_worker(template):
+    # Template dikirim sekali per proses worker, bukan sekali per file
+    global _worker_exporter
+    _worker_exporter = StreamingExcelExporter(template=template)
+
+
+def _write_export_job(schedules, output_path):
+    return _worker_exporter.write(schedules, output_path)
+
+
+_scenario_base = None
+
+
+def _init_scenario_worker(base):
+    # Dengan start method fork, base diwarisi dari proses induk (copy-on-write), tidak di-pickle
+    global _scenario_base
+    _scenario_base = base
+
+
+def _run_scenario_job(scenario, reshuffle):
+    return ScheduleGenerator.run_scenario(_scenario_base, scenario, reshuffle)
+
+
+class StreamingExcelExporter:
+    """Tulis jadwal ke Excel dengan mode write_only openpyxl.
+
+    Template hanya dibaca sekali untuk mengambil baris pembuka, style header
+    dan lebar kolom. Baris data di-stream satu per satu sehingga memori tetap
+    datar berapapun jumlah barisnya.
+    """
+    HEADER_ROW = 3
+    STYLE_ATTRS = ('font', 'fill', 'border', 'alignment', 'number_format', 'protection')
+
+    _template_cache = {}
+    _template_cache_lock = threading.Lock()
+
+    def __init__(self, template_path=None, template=None):
+        self.template = template if template is not None else self.cached_template(template_path)
+
+    @classmethod
+    def cached_template(cls, template_path):
+        """Template yang sudah di-parse, dibaca ulang hanya jika file berubah (mtime/ukuran)"""
+        key = os.path.abspath(template_path)
+        stat = os.stat(key)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with cls._template_cache_lock:
+            cached = cls._template_cache.get(key)
+            if cached and cached[0] == signature:
+                # Spec template hanya dibaca saat menulis, jadi salinan dangkal sudah cukup
+                return dict(cached[1])
+        template = cls.read_template(template_path)
+        with cls._template_cache_lock:
+            cls._template_cache[key] = (signature, template)
+        return dict(template)
+
+    @classmethod
+    def read_template(cls, template_path):
+        from openpyxl import load_workbook
+        wb = load_workbook(template_path)
+        sheet = wb.active
+
+        def cell_spec(cell):
+            spec = {'value': cell.value}
+            if cell.has_style:
+                for attr in cls.STYLE_ATTRS:
+                    spec[attr] = copy.copy(getattr(cell, attr))
+            return spec
+
+        preamble = []
+        for row in sheet.iter_rows(min_row=1, max_row=cls.HEADER_ROW - 1):
+            preamble.append([cell_spec(cell) for cell in row])
+
+        # Style header diambil dari baris header template (baris pertama)
+        header_styles = []
+        for col in range(1, len(EXPORT_HEADERS) + 1):
+            spec = cell_spec(sheet.cell(row=1, column=col))
+            spec.pop('value')
+            header_styles.append(spec)
+
+        template = {
+            'title': sheet.title,
+            'preamble': preamble,
+            'header_styles': header_styles,
+            'column_widths': {key: dim.width for key, dim in sheet.column_dimensions.items() if dim.width},
+            'row_heights': {idx: dim.height for idx, dim in sheet.row_dimensions.items() if dim.height}
+        }
+        wb.close()
+        return template
+
+    def _styled_cell(self, sheet, value, style):
+        from openpyxl.cell import WriteOnlyCell
+        cell = WriteOnlyCell(sheet, value=value)
+        for attr in self.STYLE_ATTRS:
+            if attr in style:
+                setattr(cell, attr, style[attr])
+        return cell
+
+    def write(self, schedules, output_path):
+        start = perf_counter()
+        template = self.template
+
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        sheet = wb.create_sheet(title=template['title'])
+        for key, width in template['column_widths'].items():
+            sheet.column_dimensions[key].width = width
+        for idx, height in template['row_heights'].items():
+            if idx <= self.HEADER_ROW:
+                sheet.row_dimensions[idx].height = height
+
+        for row in template['preamble']:
+            sheet.append([self._styled_cell(sheet, spec['value'], spec) for spec in row])
+        for _ in range(len(template['preamble']), self.HEADER_ROW - 1):
+            sheet.append([])
+
+        sheet.append([
+            self._styled_cell(sheet, header, template['header_styles'][col])
+            for col, header in enumerate(EXPORT_HEADERS)
+        ])
+
+        row_count = 0
+        for sched in schedules:
+            sheet.append(schedule_to_row(sched))
+            row_count += 1
+
+        wb.save(output_path)
+        elapsed = perf_counter() - start
+        return {
+            'path': output_path,
+            'rows': row_count,
+            'seconds': elapsed,
+            'rows_per_sec': row_count / elapsed if elapsed > 0 else float(row_count)
+        }
+
+
+class JobCancelled(Exception):
+    """Dilempar di dalam operasi panjang ketika pengguna menekan tombol batal"""
+
+
+class DebouncedStateWriter:
+    """Simpan state UI dari thread background dengan debounce.
+
+    Perubahan beruntun dalam jangka `delay` detik digabung menjadi satu
+    penulisan atomik, sehingga thread Tk tidak pernah menunggu disk.
+    """
+    def __init__(self, path, delay=1.0):
+        self.path = path
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None
+        self._deadline = 0
+        self._last_written = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def update(self, state):
+        with self._cond:
+            self._pending = state
+            self._deadline = monotonic() + self.delay
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Tunggu sampai tidak ada perubahan baru selama `delay`
+                remaining = self._deadline - monotonic()
+                while remaining > 0 and not self._closed:
+                    self._cond.wait(remaining)
+                    remaining = self._deadline - monotonic()
+                if self._closed:
+                    return
+                state, self._pending = self._pending, None
+            self._write(state)
+
+    def _write(self, state):
+        with self._write_lock:
+            if state is None or state == self._last_written:
+                return
+            try:
+                write_json_atomic(self.path, state)
+                self._last_written = state
+            except Exception as e:
+                print(f"Error saving UI state: {e}")
+
+    def flush(self):
+        with self._cond:
+            state, self._pending = self._pending, None
+        self._write(state)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+
+class ChangeJournal:
+    """Journal append-only (write-ahead log) untuk setiap perubahan jadwal.
+
+    Setiap mutasi ditulis sebagai satu baris JSON dan langsung di-fsync,
+    sehingga biaya simpan sebanding dengan perubahan dan data bisa
+    dipulihkan sampai edit terakhir setelah crash.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.entry_count = 0
+        self._file = None
+        for entry in self.read_entries():
+            self.seq = max(self.seq, entry['seq'])
+            self.entry_count += 1
+
+    def append(self, op, **payload):
+        with self.lock:
+            self.seq += 1
+            entry = {'seq': self.seq, 'op': op, 'time': datetime.now().isoformat(timespec='seconds')}
+            entry.update(payload)
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(entry, ensure_ascii=False, default=_json_default) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.entry_count += 1
+            return self.seq
+
+    def read_entries(self, after_seq=0):
+        entries = []
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Baris terakhir bisa terpotong jika aplikasi crash saat menulis
+                    break
+                if entry.get('seq', 0) > after_seq:
+                    entries.append(entry)
+        return entries
+
+    def truncate(self, through_seq):
+        """Buang entri yang sudah tercakup snapshot (seq <= through_seq)"""
+        with self.lock:
+            self._close_file()
+            remaining = self.read_entries(after_seq=through_seq)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for entry in remaining:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=_json_default) + "\n")
+            os.replace(temp_path, self.path)
+            self.entry_count = len(remaining)
+
+    def size_bytes(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self.lock:
+            self._close_file()
+
+
+class SQLiteScheduleStore:
+    """Backend penyimpanan SQLite (mode WAL) sebagai alternatif schedule_cache.pkl.
+
+    Setiap baris jadwal disimpan utuh sebagai JSON di kolom data, ditambah
+    kolom yang diindeks (dosen/ruangan/kelas + hari) untuk query cepat.
+    Perubahan diterapkan per baris dalam transaksi, bukan menulis ulang file.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS schedules (
+            row_id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL,
+            generated INTEGER NOT NULL DEFAULT 0,
+            dosen TEXT, mata_kuliah TEXT, kelas TEXT, hari TEXT, jam TEXT, ruangan TEXT,
+            start_min INTEGER, end_min INTEGER,
+            sks INTEGER, jumlah_mahasiswa INTEGER, is_fixed INTEGER,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_schedules_dosen_hari ON schedules (dosen, hari);
+        CREATE INDEX IF NOT EXISTS idx_schedules_ruangan_hari ON schedules (ruangan, hari);
+        CREATE INDEX IF NOT EXISTS idx_schedules_kelas_hari ON schedules (kelas, hari);
+        CREATE TABLE IF NOT EXISTS lecturers (name TEXT PRIMARY KEY, position INTEGER);
+        CREATE TABLE IF NOT EXISTS rooms (nama TEXT PRIMARY KEY, lantai INTEGER, kapasitas INTEGER, data TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS preferences (lecturer TEXT PRIMARY KEY, data TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS breaks (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, value TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS idx_breaks_key ON breaks (key);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def has_data(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM schedules LIMIT 1").fetchone() is not None \
+                or self.conn.execute("SELECT 1 FROM meta LIMIT 1").fetchone() is not None
+
+    def _schedule_params(self, schedule, position, generated):
+        start_min, end_min = jam_to_minutes(schedule.get('jam'))
+        return (
+            schedule['row_id'], position, int(generated),
+            schedule.get('dosen'), schedule.get('mata_kuliah'), schedule.get('kelas'),
+            schedule.get('hari', ''), schedule.get('jam', ''), schedule.get('ruangan', ''),
+            start_min, end_min,
+            _json_default(schedule.get('sks', 0)), _json_default(schedule.get('jumlah_mahasiswa', 0) or 0),
+            int(bool(schedule.get('is_fixed', False))),
+            json.dumps(schedule, ensure_ascii=False, default=_json_default)
+        )
+
+    def _insert_schedule(self, schedule, position=None, generated=False):
+        if position is None:
+            position = self.conn.execute("SELECT COALESCE(MAX(position), 0) + 1 FROM schedules").fetchone()[0]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO schedules (row_id, position, generated, dosen, mata_kuliah, kelas, hari, jam, "
+            "ruangan, start_min, end_min, sks, jumlah_mahasiswa, is_fixed, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._schedule_params(schedule, position, generated)
+        )
+
+    def _save_meta(self, generator):
+        meta = {
+            'subjects': generator.subjects,
+            'classes': generator.classes,
+            'excel_path': generator.excel_path,
+            'next_row_id': generator.next_row_id
+        }
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value, ensure_ascii=False, default=_json_default)) for key, value in meta.items()]
+        )
+        self.conn.execute("DELETE FROM lecturers")
+        self.conn.executemany("INSERT OR IGNORE INTO lecturers (name, position) VALUES (?, ?)",
+                              [(name, pos) for pos, name in enumerate(generator.lecturers)])
+
+    def save_all(self, generator):
+        """Tulis seluruh state dalam satu transaksi (dipakai saat data dimuat ulang)"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM schedules")
+            self.conn.execute("DELETE FROM rooms")
+            self.conn.execute("DELETE FROM preferences")
+            self.conn.execute("DELETE FROM breaks")
+            position = 0
+            for generated, schedules in ((False, generator.fixed_schedules), (True, generator.generated_schedules)):
+                for schedule in schedules:
+                    position += 1
+                    self._insert_schedule(schedule, position, generated)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rooms (nama, lantai, kapasitas, data) VALUES (?, ?, ?, ?)",
+                [(room['nama'], room.get('lantai'), room.get('kapasitas', 30), json.dumps(room, ensure_ascii=False))
+                 for room in generator.available_rooms]
+            )
+            self.conn.executemany(
+                "INSERT INTO preferences (lecturer, data) VALUES (?, ?)",
+                [(lecturer, json.dumps(prefs, ensure_ascii=False))
+                 for lecturer, prefs in generator.lecturer_preferences.items()]
+            )
+            self.conn.executemany(
+                "INSERT INTO breaks (key, value) VALUES (?, ?)",
+                [(key, value) for key, values in generator.lecturer_breaks.items() for value in values]
+            )
+            self._save_meta(generator)
+
+    def save_meta(self, generator):
+        with self.lock, self.conn:
+            self._save_meta(generator)
+
+    def load_into(self, generator):
+        with self.lock:
+            meta = {row['key']: json.loads(row['value']) for row in self.conn.execute("SELECT key, value FROM meta")}
+            generator.lecturers = [row['name'] for row in self.conn.execute("SELECT name FROM lecturers ORDER BY position")]
+            generator.subjects = meta.get('subjects', [])
+            generator.classes = meta.get('classes', [])
+            generator.excel_path = meta.get('excel_path')
+            generator.next_row_id = meta.get('next_row_id', 1)
+            generator.fixed_schedules = []
+            generator.generated_schedules = []
+            for row in self.conn.execute("SELECT data, generated FROM schedules ORDER BY position"):
+                target = generator.generated_schedules if row['generated'] else generator.fixed_schedules
+                target.append(json.loads(row['data']))
+            generator.available_rooms = [json.loads(row['data']) for row in self.conn.execute("SELECT data FROM rooms")]
+            generator.room_capacities = {room['nama']: room.get('kapasitas', 30) for room in generator.available_rooms}
+            generator.lecturer_preferences = defaultdict(dict)
+            for row in self.conn.execute("SELECT lecturer, data FROM preferences"):
+                prefs = json.loads(row['data'])
+                for key in ('preferred_times_offline', 'preferred_times_online'):
+                    prefs[key] = [tuple(t) for t in prefs.get(key, [])]
+                generator.lecturer_preferences[row['lecturer']] = prefs
+            generator.lecturer_breaks = defaultdict(list)
+            for row in self.conn.execute("SELECT key, value FROM breaks ORDER BY id"):
+                generator.lecturer_breaks[row['key']].append(row['value'])
+
+    def apply_change(self, generator, op, payload):
+        """Terapkan satu mutasi sebagai transaksi baris (op sama dengan ChangeJournal)"""
+        with self.lock, self.conn:
+            if op == 'add':
+                self._insert_schedule(payload['schedule'])
+                self._save_meta(generator)
+            elif op == 'edit':
+                self.conn.execute("DELETE FROM schedules WHERE row_id = ?", (payload['row_id'],))
+                self._insert_schedule(payload['schedule'])
+            elif op == 'remove':
+                self.conn.execute("DELETE FROM schedules WHERE row_id = ?", (payload['row_id'],))
+            elif op == 'update':
+                for state in payload['rows']:
+                    row = self.conn.execute("SELECT position, generated, data FROM schedules WHERE row_id = ?",
+                                            (state['row_id'],)).fetchone()
+                    if row is None:
+                        continue
+                    schedule = json.loads(row['data'])
+                    schedule.update(state)
+                    self._insert_schedule(schedule, row['position'], row['generated'])
+            elif op == 'preference':
+                self.conn.execute("INSERT OR REPLACE INTO preferences (lecturer, data) VALUES (?, ?)",
+                                  (payload['lecturer'], json.dumps(payload['prefs'], ensure_ascii=False)))
+            elif op == 'break':
+                self.conn.execute("INSERT INTO breaks (key, value) VALUES (?, ?)", (payload['key'], payload['value']))
+
+    def _fetch(self, sql, params, ids_only):
+        # ids_only: cukup row_id, dipakai generator untuk memetakan ke baris di memori
+        with self.lock:
+            if ids_only:
+                return [row['row_id'] for row in self.conn.execute(sql.format(columns='row_id'), params)]
+            return [json.loads(row['data']) for row in self.conn.execute(sql.format(columns='data'), params)]
+
+    def query_schedules(self, dosen=None, kelas=None, ruangan=None, hari=None, ids_only=False):
+        clauses, params = [], []
+        for column, value in (('dosen', dosen), ('kelas', kelas), ('ruangan', ruangan), ('hari', hari)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT {columns} FROM schedules"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY position"
+        return self._fetch(sql, params, ids_only)
+
+    def find_overlaps(self, column, value, hari, start_min, end_min, exclude_row_id=None, ids_only=False):
+        """Cari jadwal yang bentrok waktu untuk dosen/ruangan/kelas tertentu pada satu hari"""
+        if column not in ('dosen', 'ruangan', 'kelas'):
+            raise ValueError(f"Kolom tidak valid: {column}")
+        return self._fetch(
+            f"SELECT {{columns}} FROM schedules WHERE {column} = ? AND hari = ? "
+            "AND start_min < ? AND end_min > ? AND row_id IS NOT ? ORDER BY position",
+            (value, hari, end_min, start_min, exclude_row_id), ids_only
+        )
+
+
+class SnapshotFile:
+    """Format snapshot berversi dengan section yang bisa dimuat terpisah.
+
+    Layout: MAGIC, versi (uint16), panjang index (uint32), index JSON,
+    lalu isi tiap section (pickle, opsional dikompres zlib). Index menyimpan
+    offset dan panjang tiap section sehingga section berat seperti jadwal
+    bisa dibaca belakangan tanpa mem-parse seluruh file.
+    """
+    MAGIC = b'NUSCHED'
+    VERSION = 1
+    HEADER = struct.Struct('>HI')
+
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self.index = None
+        self._data_offset = 0
+
+    @classmethod
+    def is_snapshot(cls, path):
+        try:
+            with open(path, 'rb') as f:
+                return f.read(len(cls.MAGIC)) == cls.MAGIC
+        except OSError:
+            return False
+
+    @classmethod
+    def write(cls, path, sections, compress=True):
+        blobs = []
+        index = {'compression': 'zlib' if compress else 'none', 'sections': {},
+                 'created': datetime.now().isoformat(timespec='seconds')}
+        offset = 0
+        for name, value in sections.items():
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if compress:
+                blob = zlib.compress(blob, 1)
+            index['sections'][name] = {'offset': offset, 'length': len(blob)}
+            offset += len(blob)
+            blobs.append(blob)
+
+        index_bytes = json.dumps(index).encode('utf-8')
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(cls.HEADER.pack(cls.VERSION, len(index_bytes)))
+            f.write(index_bytes)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(temp_path, path)
+
+    def read_index(self):
+        with open(self.path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError("Bukan file snapshot jadwal")
+            self.version, index_length = self.HEADER.unpack(f.read(self.HEADER.size))
+            if self.version > self.VERSION:
+                raise ValueError(f"Versi snapshot {self.version} lebih baru dari yang didukung ({self.VERSION})")
+            self.index = json.loads(f.read(index_length).decode('utf-8'))
+            self._data_offset = f.tell()
+        return self.index
+
+    def sections(self):
+        if self.index is None:
+            self.read_index()
+        return list(self.index['sections'])
+
+    def load_section(self, name, default=None):
+        if self.index is None:
+            self.read_index()
+        info = self.index['sections'].get(name)
+        if info is None:
+            return default
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_offset + info['offset'])
+            blob = f.read(info['length'])
+        if len(blob) != info['length']:
+            raise ValueError(f"Section {name} terpotong")
+        if self.index.get('compression') == 'zlib':
+            blob = zlib.decompress(blob)
+        return pickle.loads(blob)
+
+
+class MetricsRegistry:
+    """Counter dan gauge sederhana untuk operasional; bisa ditulis sebagai teks Prometheus atau JSON"""
+
+    def __init__(self, prefix="schedule_"):
+        self.prefix = prefix
+        self.definitions = {}
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def define(self, name, kind, help_text):
+        self.definitions[name] = (kind, help_text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        self.values[(name, tuple(sorted(labels.items())))] = value
+
+    def get(self, name, **labels):
+        return self.values.get((name, tuple(sorted(labels.items()))), 0)
+
+    @staticmethod
+    def escape_label(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def to_prometheus(self):
+        lines = []
+        items = sorted(self.values.items())
+        for name, (kind, help_text) in sorted(self.definitions.items()):
+            full_name = self.prefix + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for (key_name, labels), value in items:
+                if key_name != name:
+                    continue
+                label_text = ",".join(f'{label}="{self.escape_label(v)}"' for label, v in labels)
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        data = {}
+        for (name, labels), value in sorted(self.values.items()):
+            if labels:
+                data.setdefault(name, {})[",".join(f"{label}={v}" for label, v in labels)] = value
+            else:
+                data[name] = value
+        return data
+
+    def write_prometheus(self, path):
+        # Ditulis atomik agar node_exporter textfile collector tidak membaca file setengah jadi
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def write_json(self, path):
+        write_json_atomic(path, self.to_dict())
+
+
+class SolverStats:
+    """Statistik randomize_schedule: waktu per fase, percobaan per baris dan penolakan per penyebab.
+
+    Hanya dikumpulkan jika generator.solver_stats diisi objek ini; jika None,
+    solver hanya membayar satu pengecekan per percobaan.
+    """
+    PHASES = ('precheck', 'slot_filtering', 'room_lookup', 'conflict_check')
+    CAUSES = ('lecturer_overlap', 'room_overlap', 'class_overlap', 'break_time', 'preference',
+              'online_day', 'no_room', 'capacity', 'invalid_time', 'no_slot', 'no_day', 'infeasible')
+
+    def __init__(self, log=None):
+        # log: path file atau callable yang menerima satu baris teks per jadwal
+        self.log = log
+        self.reset()
+
+    def reset(self):
+        self.timers = {phase: 0.0 for phase in self.PHASES}
+        self.rejections = {cause: 0 for cause in self.CAUSES}
+        self.attempts = {}
+        self.row_causes = {}
+        self.scheduled = 0
+        self.failed = 0
+        self.seconds = 0.0
+
+    def reject(self, row_key, cause):
+        self.rejections[cause] = self.rejections.get(cause, 0) + 1
+        causes = self.row_causes.setdefault(row_key, {})
+        causes[cause] = causes.get(cause, 0) + 1
+
+    def finish_row(self, schedule, attempts, assigned):
+        row_key = schedule.get('row_id') or id(schedule)
+        self.attempts[row_key] = attempts
+        if assigned:
+            self.scheduled += 1
+        else:
+            self.failed += 1
+        if self.log is not None:
+            causes = self.row_causes.get(row_key, {})
+            line = (f"{row_key}\t{schedule['dosen']}\t{schedule['kelas']}\t{schedule['mata_kuliah']}\t"
+                    f"{'ok' if assigned else 'gagal'}\t{attempts}\t"
+                    + ",".join(f"{cause}={count}" for cause, count in sorted(causes.items())))
+            if callable(self.log):
+                self.log(line)
+            else:
+                with open(self.log, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+
+    def as_dict(self):
+        attempts = list(self.attempts.values())
+        return {
+            'scheduled': self.scheduled,
+            'failed': self.failed,
+            'seconds': self.seconds,
+            'timers': dict(self.timers),
+            'rejections': {cause: count for cause, count in self.rejections.items() if count},
+            'attempts_total': sum(attempts),
+            'attempts_max': max(attempts, default=0),
+            'attempts_mean': sum(attempts) / len(attempts) if attempts else 0.0
+        }
+
+    def format_report(self):
+        data = self.as_dict()
+        lines = [f"Terjadwal {data['scheduled']}, gagal {data['failed']} dalam {data['seconds']:.2f} detik",
+                 f"Percobaan: total {data['attempts_total']}, rata-rata {data['attempts_mean']:.1f}, "
+                 f"maks {data['attempts_max']}"]
+        lines += [f"  {phase:<16}{seconds:8.3f} detik" for phase, seconds in data['timers'].items()]
+        lines += [f"  ditolak {cause:<18}{count:>8}" for cause, count in
+                  sorted(data['rejections'].items(), key=lambda item: -item[1])]
+        return "\n".join(lines)
+
+
+class OccupancyIndex:
+    """Indeks okupansi per (jenis, kunci, hari) dengan bitmask menit untuk cek bentrok cepat"""
+
+    def __init__(self, schedules=()):
+        self.masks = {}
+        self.rows = defaultdict(list)
+        for schedule in schedules:
+            self.add(schedule)
+
+    @staticmethod
+    def slots_for(schedule):
+        day = schedule.get('hari')
+        yield 'dosen', schedule.get('dosen'), day
+        yield 'kelas', schedule.get('kelas'), day
+        room = schedule.get('ruangan')
+        if room and room != 'Online':
+            yield 'ruangan', room, day
+
+    def add(self, schedule):
+        start, end = jam_to_minutes(schedule.get('jam'))
+        if start is None or end <= start:
+            return
+        bits = (1 << end) - (1 << start)
+        for slot in self.slots_for(schedule):
+            self.masks[slot] = self.masks.get(slot, 0) | bits
+            self.rows[slot].append((start, end, schedule))
+
+    def overlapping(self, kind, key, day, start, end, ignore=()):
+        """Baris yang bentrok dengan rentang menit [start, end) pada slot tertentu"""
+        slot = (kind, key, day)
+        if not self.masks.get(slot, 0) & ((1 << end) - (1 << start)):
+            return []
+        return [row for s, e, row in self.rows[slot]
+                if s < end and e > start and not any(row is other for other in ignore)]
+
+    def is_free(self, kind, key, day, start, end, ignore=()):
+        return not self.overlapping(kind, key, day, start, end, ignore)
+
+
+class RoomOccupancy:
+    """Interval terpakai per (hari, ruangan) untuk cek ruangan bebas tanpa memindai semua jadwal.
+
+    Baris dicatat saat mendapat ruangan (note) dan dicocokkan ulang dengan isinya
+    saat dibaca, sehingga baris yang kemudian dipindah atau dikosongkan di tempat
+    tidak lagi dihitung.
+    """
+
+    def __init__(self, schedules=()):
+        self.slots = defaultdict(list)
+        for schedule in schedules:
+            self.note(schedule)
+
+    def note(self, schedule):
+        room = schedule.get('ruangan')
+        if not room or room == 'Online':
+            return
+        start, end = jam_to_minutes(schedule.get('jam'))
+        if start is None:
+            return
+        self.slots[(schedule.get('hari'), room)].append((start, end, schedule['jam'], schedule))
+
+    def is_busy(self, day, room, start, end, ignore=None):
+        """True jika ruangan dipakai baris lain (selain ignore) yang beririsan dengan [start, end)"""
+        entries = self.slots.get((day, room))
+        if not entries:
+            return False
+        live = [entry for entry in entries
+                if entry[3].get('hari') == day and entry[3].get('ruangan') == room and entry[3].get('jam') == entry[2]]
+        if len(live) != len(entries):
+            # Buang entri basi (dan duplikat baris yang sama) agar daftar tidak terus tumbuh
+            seen = set()
+            self.slots[(day, room)] = live = [entry for entry in live
+                                              if id(entry[3]) not in seen and not seen.add(id(entry[3]))]
+        return any(s < end and e > start and row is not ignore for s, e, _, row in live)
+
+    def busy(self, day, start, end, ignore=None):
+        """Himpunan malas ruangan terpakai: `nama in busy` dihitung hanya untuk ruangan yang ditanyakan"""
+        return BusyRooms(self, day, start, end, ignore)
+
+
+class BusyRooms:
+    __slots__ = ('occupancy', 'day', 'start', 'end', 'ignore')
+
+    def __init__(self, occupancy, day, start, end, ignore):
+        self.occupancy = occupancy
+        self.day = day
+        self.start = start
+        self.end = end
+        self.ignore = ignore
+
+    def __contains__(self, room):
+        return self.occupancy.is_busy(self.day, room, self.start, self.end, self.ignore)
+
+
+class RoomAllocator:
+    """Ruangan per lantai terurut kapasitas; ruangan terkecil yang cukup ditemukan dengan bisect"""
+
+    def __init__(self, rooms):
+        self.source = rooms
+        self.entries = {None: sorted((room.get('kapasitas', 30), room['nama']) for room in rooms)}
+        for room in rooms:
+            self.entries.setdefault(room.get('lantai'), []).append((room.get('kapasitas', 30), room['nama']))
+        for floor, entries in self.entries.items():
+            if floor is not None:
+                entries.sort()
+        self.capacities = {floor: [capacity for capacity, _ in entries] for floor, entries in self.entries.items()}
+
+    def candidates(self, student_count, floors=None):
+        """(kapasitas, nama) ruangan dengan kapasitas >= student_count dari yang terkecil; floors None = semua lantai"""
+        if floors is None:
+            floors = [None]
+        slices = [self.entries[floor][bisect_left(self.capacities[floor], student_count):]
+                  for floor in floors if floor in self.entries]
+        return slices[0] if len(slices) == 1 else heapq.merge(*slices)
+
+    def best_fit(self, student_count, busy, floors=None, reserve_threshold=None):
+        """Nama ruangan bebas terkecil yang cukup, atau None. Dengan reserve_threshold, kelas kecil
+        tidak mengambil ruangan berkapasitas >= threshold (dicadangkan untuk kelas besar)."""
+        for capacity, name in self.candidates(student_count, floors):
+            if reserve_threshold is not None and student_count < reserve_threshold <= capacity:
+                return None
+            if name not in busy:
+                return name
+        return None
+
 
 class ScheduleGenerator:
     def __init__(self):
+        self._deferred_snapshot = None
+        self._deferred_journal = []
+        self._deferred_lock = threading.RLock()
+        self._deferred_loading = False
         self.lecturers = []
         self.subjects = []
         self.classes = []
@@ -45,6 +1014,161 @@ class ScheduleGenerator:
         self.max_attempts = 200
         self.ui_state_file = "ui_state.json"
         self.online_ratio = 0.2  # Rasio 20% online, 80% offline
+        self.last_export_stats = None
+        self.next_row_id = 1
+        self.journal = None
+        self.store = None
+        self.journal_file = "schedule_journal.jsonl"
+        # Dipanggil dengan pesan error; None berarti tampilkan messagebox (mode GUI)
+        self.error_handler = None
+        # Isi dengan SolverStats untuk mengukur randomize_schedule; None = tanpa instrumentasi
+        self.solver_stats = None
+        # Lewati jadwal yang pasti gagal (lihat analyze_feasibility) sebelum pengacakan
+        self.feasibility_precheck = True
+        self.last_feasibility = None
+        self.metrics = MetricsRegistry()
+        for name, kind, help_text in (
+            ('rows', 'gauge', "Jumlah baris jadwal"),
+            ('mutations_total', 'counter', "Perubahan jadwal per operasi"),
+            ('conflicts', 'gauge', "Jumlah konflik per kategori pada pemeriksaan terakhir"),
+            ('solve_seconds', 'gauge', "Durasi randomize_schedule terakhir"),
+            ('solve_rows_total', 'counter', "Baris yang diacak per hasil"),
+            ('solve_failure_ratio', 'gauge', "Rasio baris gagal pada pengacakan terakhir"),
+            ('cache_save_seconds', 'gauge', "Durasi penyimpanan cache terakhir"),
+            ('cache_saves_total', 'counter', "Penyimpanan cache per hasil"),
+            ('journal_bytes', 'gauge', "Ukuran file journal"),
+            ('seat_utilization', 'gauge', "Rasio mahasiswa terhadap kapasitas ruangan setelah pengacakan ruangan"),
+        ):
+            self.metrics.define(name, kind, help_text)
+        self.journal_seq = 0
+        self.compaction_threshold = 500  # Jumlah entri journal sebelum dipadatkan
+        self._compaction_thread = None
+        self.snapshot_compression = True
+        self.last_cache_error = None
+        # True jika section jadwal gagal dimuat: file cache yang ada tidak boleh ditimpa data kosong
+        self.cache_read_only = False
+        # True selama load_cache berjalan (mis. di thread init GUI); state di memori belum lengkap
+        self.cache_loading = False
+        # Hook untuk job background: progress, pembatalan dan penjaga mutasi
+        self.progress_callback = None
+        self.cancel_event = None
+        self.mutation_lock = threading.RLock()
+        # Naik setiap kali data jadwal berubah; dipakai untuk invalidasi cache saran
+        self.revision = 0
+        self._suggestion_cache = {}
+        self._suggestion_revision = 0
+        # 'best_fit' = ruangan terkecil yang cukup; 'random' = ruangan acak pertama yang cukup (cara lama)
+        self.room_strategy = 'best_fit'
+        # Jika diisi, kelas di bawah jumlah ini tidak memakai ruangan berkapasitas >= jumlah ini kecuali terpaksa
+        self.room_reserve_threshold = None
+        self._room_allocator = None
+        self._room_occupancy = None
+        self._room_occupancy_key = None
+        # Preferensi dan istirahat dosen dalam bentuk mask menit, lihat compile_lecturer_masks
+        self.lecturer_masks = {}
+        self._empty_lecturer_mask = None
+        self._occupancy = None
+        self._occupancy_revision = -1
+        # Jumlah batch @unrecorded_batch yang sedang berjalan, dan peta row_id -> baris per revisi
+        self._unrecorded_batches = 0
+        self._row_positions = {}
+        self._row_positions_revision = -1
+        # Batas pencarian saran per konflik
+        self.suggestion_breadth = 150
+        self.suggestion_budget = 0.03
+
+    # Section jadwal dari snapshot dimuat saat pertama kali diakses
+    @property
+    def fixed_schedules(self):
+        if self._deferred_snapshot is not None:
+            self.load_deferred_sections()
+        return self._fixed_schedules
+
+    @fixed_schedules.setter
+    def fixed_schedules(self, value):
+        if self._deferred_snapshot is not None:
+            self.load_deferred_sections()
+        self._fixed_schedules = value
+
+    @property
+    def generated_schedules(self):
+        if self._deferred_snapshot is not None:
+            self.load_deferred_sections()
+        return self._generated_schedules
+
+    @generated_schedules.setter
+    def generated_schedules(self, value):
+        if self._deferred_snapshot is not None:
+            self.load_deferred_sections()
+        self._generated_schedules = value
+
+    def report_error(self, message):
+        if self.error_handler is not None:
+            self.error_handler(message)
+        else:
+            messagebox.showerror("Error", message)
+
+    def update_metrics(self):
+        """Perbarui gauge yang dihitung saat dibaca (ukuran jadwal dan journal)"""
+        self.metrics.set('rows', len(self.fixed_schedules) + len(self.generated_schedules))
+        self.metrics.set('journal_bytes', self.journal.size_bytes() if self.journal else 0)
+        return self.metrics
+
+    def job_tick(self, done, total, message=None):
+        """Laporkan progress dan cek pembatalan; murah jika tidak ada job yang berjalan"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise JobCancelled()
+        if self.progress_callback is not None:
+            self.progress_callback(done, total, message)
+
+    def sections_pending(self):
+        return self._deferred_snapshot is not None
+
+    def state_complete(self):
+        """True jika state di memori dimuat penuh dan journal sudah diputar ulang, sehingga
+        snapshot darinya boleh menggantikan entri journal"""
+        return not (self.cache_loading or self.cache_read_only or self.sections_pending())
+
+    def truncate_journal(self, seq):
+        """Buang entri journal s.d. seq setelah snapshot ditulis; ditolak jika state belum lengkap"""
+        if self.journal is None:
+            return False
+        if not self.state_complete():
+            print("Journal tidak dipotong: data cache belum termuat lengkap")
+            return False
+        self.journal.truncate(seq)
+        return True
+
+    def load_deferred_sections(self):
+        """Muat section berat (jadwal) dari snapshot, aman dipanggil dari thread lain"""
+        with self._deferred_lock:
+            snapshot = self._deferred_snapshot
+            # Thread lain menunggu di lock; pemanggilan ulang dari thread yang sama diabaikan
+            if snapshot is None or self._deferred_loading:
+                return False
+            self._deferred_loading = True
+            try:
+                try:
+                    schedules = snapshot.load_section('schedules', {})
+                except Exception as e:
+                    # Snapshot dan journal di disk dibiarkan utuh; sesi ini tidak menyimpan cache
+                    self.last_cache_error = (f"Gagal memuat section jadwal: {e}\n"
+                                             f"Cache {self.cache_file} tidak akan ditimpa selama sesi ini.")
+                    print(self.last_cache_error)
+                    self.cache_read_only = True
+                    self._fixed_schedules = []
+                    self._generated_schedules = []
+                    return False
+                self._fixed_schedules = schedules.get('fixed_schedules', [])
+                self._generated_schedules = schedules.get('generated_schedules', [])
+                for s in self._fixed_schedules + self._generated_schedules:
+                    self.assign_row_id(s)
+                self._apply_journal_entries(self._deferred_journal)
+                self._deferred_journal = []
+            finally:
+                self._deferred_snapshot = None
+                self._deferred_loading = False
+            return True
 
     def generate_time_slots(self):
         slots = []
@@ -100,49 +1224,451 @@ class ScheduleGenerator:
         except:
             return False
 
+    def assign_row_id(self, schedule):
+        if not schedule.get('row_id'):
+            schedule['row_id'] = self.next_row_id
+            self.next_row_id += 1
+        else:
+            self.next_row_id = max(self.next_row_id, schedule['row_id'] + 1)
+        return schedule['row_id']
+
+    def row_state(self, schedule):
+        return {
+            'row_id': schedule.get('row_id'),
+            'hari': schedule.get('hari', ''),
+            'jam': schedule.get('jam', ''),
+            'ruangan': schedule.get('ruangan', ''),
+            'is_fixed': schedule.get('is_fixed', False)
+        }
+
+    def enable_journal(self, path=None):
+        self.journal_file = path or self.journal_file
+        self.journal = ChangeJournal(self.journal_file)
+        self.journal.seq = max(self.journal.seq, self.journal_seq)
+
+    def enable_sqlite(self, path):
+        """Gunakan SQLite sebagai backend penyimpanan menggantikan pickle + journal"""
+        self.store = SQLiteScheduleStore(path)
+        if self.store.has_data():
+            self.store.load_into(self)
+            self.compile_lecturer_masks()
+            for s in self.fixed_schedules + self.generated_schedules:
+                self.assign_row_id(s)
+        else:
+            self.store.save_all(self)
+
+    def record_change(self, op, **payload):
+        self.revision += 1
+        if self.store is not None:
+            try:
+                self.store.apply_change(self, op, payload)
+            except Exception as e:
+                print(f"Error writing SQLite store: {e}")
+        if self.journal is None or self.cache_read_only:
+            return
+        try:
+            self.journal_seq = self.journal.append(op, **payload)
+        except Exception as e:
+            print(f"Error writing journal: {e}")
+
+    def checkpoint(self):
+        """Simpan penuh setelah data diganti seluruhnya (load Excel/ruangan)"""
+        self.revision += 1
+        if self.store is not None:
+            self.store.save_all(self)
+        if self.journal is not None:
+            self.save_cache()
+
+    def cache_payload(self):
+        self.load_deferred_sections()
+        # Salinan dangkal per baris cukup karena nilai jadwal berupa skalar
+        return {
+            'lecturers': list(self.lecturers),
+            'subjects': list(self.subjects),
+            'classes': list(self.classes),
+            'fixed_schedules': [dict(s) for s in self.fixed_schedules],
+            'generated_schedules': [dict(s) for s in self.generated_schedules],
+            'lecturer_breaks': {k: list(v) for k, v in self.lecturer_breaks.items()},
+            'lecturer_preferences': copy.deepcopy(dict(self.lecturer_preferences)),
+            'excel_path': self.excel_path,
+            'available_rooms': [dict(r) for r in self.available_rooms],
+            'room_capacities': dict(self.room_capacities),
+            'next_row_id': self.next_row_id,
+            'journal_seq': self.journal.seq if self.journal else self.journal_seq
+        }
+
+    def config_payload(self):
+        return {
+            'department_preferences': copy.deepcopy(self.department_preferences),
+            'break_times': list(self.break_times),
+            'additional_break_times': list(self.additional_break_times),
+            'days': list(self.days),
+            'online_ratio': self.online_ratio,
+            'max_attempts': self.max_attempts,
+            'room_strategy': self.room_strategy,
+            'room_reserve_threshold': self.room_reserve_threshold
+        }
+
+    @classmethod
+    def from_payload(cls, data, config):
+        """Generator baru dari cache_payload() dan config_payload(), tanpa journal/store"""
+        other = cls()
+        for key in ('lecturers', 'subjects', 'classes', 'excel_path', 'room_capacities', 'next_row_id'):
+            setattr(other, key, copy.copy(data[key]))
+        other.fixed_schedules = [dict(s) for s in data['fixed_schedules']]
+        other.generated_schedules = [dict(s) for s in data['generated_schedules']]
+        other.available_rooms = [dict(r) for r in data['available_rooms']]
+        other.lecturer_breaks = defaultdict(list, {k: list(v) for k, v in data['lecturer_breaks'].items()})
+        other.lecturer_preferences = defaultdict(dict, copy.deepcopy(data['lecturer_preferences']))
+        for key, value in copy.deepcopy(config).items():
+            setattr(other, key, value)
+        other.compile_lecturer_masks()
+        return other
+
+    def clone(self):
+        other = ScheduleGenerator.from_payload(self.cache_payload(), self.config_payload())
+        other.revision = self.revision
+        return other
+
+    def room_utilization(self, day_start=8 * 60, day_end=21 * 60):
+        """Persentase menit ruangan fisik yang terpakai, total dan per ruangan"""
+        used = {room['nama']: 0 for room in self.available_rooms}
+        for schedule in self.fixed_schedules + self.generated_schedules:
+            room = schedule.get('ruangan')
+            start, end = jam_to_minutes(schedule.get('jam'))
+            if room in used and start is not None:
+                used[room] += max(0, min(end, day_end) - max(start, day_start))
+        capacity = (day_end - day_start) * len(self.days)
+        by_room = {room: minutes / capacity for room, minutes in used.items()} if capacity else {}
+        overall = sum(used.values()) / (capacity * len(used)) if used and capacity else 0.0
+        return {'overall': overall, 'by_room': by_room}
+
+    SCENARIO_KEYS = ('name', 'seed', 'online_ratio', 'max_attempts', 'department_preferences',
+                     'closed_floors', 'closed_rooms', 'room_strategy', 'room_reserve_threshold')
+
+    @staticmethod
+    def run_scenario(base, scenario, reshuffle=True):
+        """Selesaikan satu skenario what-if di atas salinan data dasar (dipanggil di proses worker)"""
+        start = perf_counter()
+        result = {'name': scenario.get('name', 'skenario')}
+        unknown = set(scenario) - set(ScheduleGenerator.SCENARIO_KEYS)
+        if unknown:
+            result['error'] = f"Kunci tidak dikenal: {', '.join(sorted(unknown))}"
+            return result
+        data, config = base
+        generator = ScheduleGenerator.from_payload(data, config)
+        if 'online_ratio' in scenario:
+            generator.online_ratio = float(scenario['online_ratio'])
+        if 'max_attempts' in scenario:
+            generator.max_attempts = int(scenario['max_attempts'])
+        if 'room_strategy' in scenario:
+            generator.room_strategy = scenario['room_strategy']
+        if 'room_reserve_threshold' in scenario:
+            generator.room_reserve_threshold = scenario['room_reserve_threshold']
+        generator.department_preferences.update(scenario.get('department_preferences', {}))
+        closed_floors = set(scenario.get('closed_floors', []))
+        closed_rooms = set(scenario.get('closed_rooms', []))
+        generator.available_rooms = [room for room in generator.available_rooms
+                                     if room.get('lantai') not in closed_floors and room['nama'] not in closed_rooms]
+        generator.room_capacities = {room['nama']: room.get('kapasitas', 30) for room in generator.available_rooms}
+        # Jadwal tidak tetap di ruangan yang ditutup dikosongkan agar dicarikan ruangan lain
+        for schedule in generator.fixed_schedules + generator.generated_schedules:
+            if (not schedule.get('is_fixed') and schedule.get('ruangan') != 'Online'
+                    and schedule.get('ruangan') not in generator.room_capacities):
+                schedule['ruangan'] = ''
+        random.seed(scenario.get('seed', 0))
+
+        success_count, failure_count, _ = generator.randomize_schedule(reshuffle)
+        generator.fill_empty_rooms_randomly()
+        conflicts = generator.find_all_conflicts()
+        all_schedules = generator.fixed_schedules + generator.generated_schedules
+        result.update({
+            'scheduled': success_count,
+            'failures': failure_count,
+            'conflicts': sum(len(items) for items in conflicts.values()),
+            'conflicts_by_type': {kind: len(items) for kind, items in conflicts.items()},
+            'online_share': (sum(1 for s in all_schedules if s.get('ruangan') == 'Online') / len(all_schedules)
+                             if all_schedules else 0.0),
+            'room_utilization': generator.room_utilization()['overall'],
+            'seat_utilization': generator.seat_utilization()['overall'],
+            'rooms': len(generator.available_rooms),
+            'seconds': perf_counter() - start
+        })
+        return result
+
+    def run_scenarios(self, scenarios, max_workers=None, reshuffle=True):
+        """Jalankan banyak skenario what-if paralel, masing-masing di proses terpisah.
+
+        Data dasar disiapkan sekali; dengan start method fork proses worker
+        mewarisinya lewat copy-on-write, selain itu dikirim sekali per worker.
+        Data generator ini sendiri tidak diubah.
+        """
+        import multiprocessing
+        base = (self.cache_payload(), self.config_payload())
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        results = [None] * len(scenarios)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                 initializer=_init_scenario_worker, initargs=(base,)) as pool:
+            futures = {pool.submit(_run_scenario_job, scenario, reshuffle): index
+                       for index, scenario in enumerate(scenarios)}
+            try:
+                for done, future in enumerate(as_completed(futures)):
+                    self.job_tick(done, len(futures), "Menjalankan skenario")
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        results[index] = {'name': scenarios[index].get('name', f"skenario {index + 1}"),
+                                          'error': str(e)}
+            except JobCancelled:
+                pool.shutdown(cancel_futures=True)
+                raise
+        return results
+
+    @staticmethod
+    def format_scenario_table(results):
+        header = f"{'Skenario':<24}{'Gagal':>7}{'Konflik':>9}{'Online':>9}{'Util. ruang':>13}{'Ruang':>7}{'Detik':>8}"
+        lines = [header, '-' * len(header)]
+        for result in results:
+            if result.get('error'):
+                lines.append(f"{result['name'][:23]:<24}ERROR: {result['error']}")
+                continue
+            lines.append(f"{result['name'][:23]:<24}{result['failures']:>7}{result['conflicts']:>9}"
+                         f"{result['online_share']:>9.1%}{result['room_utilization']:>13.1%}"
+                         f"{result['rooms']:>7}{result['seconds']:>8.2f}")
+        return "\n".join(lines)
+
+    def write_cache(self, data):
+        sections = {
+            'meta': {key: data[key] for key in ('lecturers', 'subjects', 'classes', 'excel_path',
+                                                'next_row_id', 'journal_seq')},
+            'rooms': {'available_rooms': data['available_rooms'], 'room_capacities': data['room_capacities']},
+            'preferences': data['lecturer_preferences'],
+            'breaks': data['lecturer_breaks'],
+            'schedules': {'fixed_schedules': data['fixed_schedules'],
+                          'generated_schedules': data['generated_schedules']}
+        }
+        SnapshotFile.write(self.cache_file, sections, compress=self.snapshot_compression)
+
     def save_cache(self):
+        if self.cache_read_only:
+            print(f"Cache tidak disimpan, {self.cache_file} gagal dimuat")
+            return False
+        if self.cache_loading:
+            print("Cache tidak disimpan, data masih dimuat")
+            return False
+        if self.store is not None:
+            # Baris jadwal sudah tersimpan per transaksi, cukup metadata
+            try:
+                self.store.save_meta(self)
+                return True
+            except Exception as e:
+                print(f"Error saving SQLite store: {e}")
+                return False
+        start = perf_counter()
         try:
-            with open(self.cache_file, 'wb') as f:
-                data = {
-                    'lecturers': self.lecturers,
-                    'subjects': self.subjects,
-                    'classes': self.classes,
-                    'fixed_schedules': self.fixed_schedules,
-                    'generated_schedules': self.generated_schedules,
-                    'lecturer_breaks': dict(self.lecturer_breaks),
-                    'lecturer_preferences': dict(self.lecturer_preferences),
-                    'excel_path': self.excel_path,
-                    'available_rooms': self.available_rooms,
-                    'room_capacities': self.room_capacities
-                }
-                pickle.dump(data, f)
+            data = self.cache_payload()
+            # cache_payload memuat section tertunda; jika itu gagal state tidak lengkap
+            if not self.state_complete():
+                print(f"Cache tidak disimpan, {self.cache_file} gagal dimuat")
+                return False
+            self.write_cache(data)
+            self.truncate_journal(data['journal_seq'])
+            self.metrics.set('cache_save_seconds', perf_counter() - start)
+            self.metrics.inc('cache_saves_total', result='ok')
+            return True
         except Exception as e:
             print(f"Error saving cache: {e}")
+            self.metrics.inc('cache_saves_total', result='error')
+            return False
 
-    def load_cache(self):
+    def compact_journal_async(self, force=False):
+        """Padatkan journal ke snapshot di thread background.
+
+        Salinan state diambil di thread pemanggil agar konsisten, sedangkan
+        pickle dan penulisan file dilakukan di background.
+        """
+        if self.cache_read_only or self.cache_loading or self.store is not None or (
+                self._compaction_thread and self._compaction_thread.is_alive()):
+            return False
+        if not force and self.journal and self.journal.entry_count < self.compaction_threshold:
+            return False
+        data = self.cache_payload()
+        if not self.state_complete():
+            return False
+        self._compaction_thread = threading.Thread(target=self._write_snapshot, args=(data,), daemon=True)
+        self._compaction_thread.start()
+        return True
+
+    def _write_snapshot(self, data):
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'rb') as f:
-                    data = pickle.load(f)
-                    self.lecturers = data.get('lecturers', [])
-                    self.subjects = data.get('subjects', [])
-                    self.classes = data.get('classes', [])
-                    self.fixed_schedules = data.get('fixed_schedules', [])
-                    self.generated_schedules = data.get('generated_schedules', [])
-                    self.lecturer_breaks = defaultdict(list, data.get('lecturer_breaks', {}))
-                    self.lecturer_preferences = defaultdict(dict, data.get('lecturer_preferences', {}))
-                    self.excel_path = data.get('excel_path')
-                    self.available_rooms = data.get('available_rooms', [])
-                    self.room_capacities = data.get('room_capacities', {})
-                return True
-        except:
-            pass
+            self.write_cache(data)
+            self.truncate_journal(data['journal_seq'])
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+
+    def wait_for_compaction(self):
+        if self._compaction_thread:
+            self._compaction_thread.join()
+
+    def close_storage(self):
+        if self.journal is not None:
+            self.journal.close()
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def load_cache(self, lazy=False):
+        """Muat cache. Dengan lazy=True section jadwal baru dibaca saat dibutuhkan."""
+        if self.store is not None:
+            return self.store.has_data()
+        self.last_cache_error = None
+        self.cache_read_only = False
+        if not os.path.exists(self.cache_file):
+            return False
+        self.cache_loading = True
+        try:
+            if SnapshotFile.is_snapshot(self.cache_file):
+                self._load_snapshot(lazy)
+            else:
+                self._load_legacy_pickle()
+            self.compile_lecturer_masks()
+            return True
+        except Exception as e:
+            # File yang tidak terbaca (rusak atau dari versi lebih baru) tidak boleh ditimpa sesi ini
+            self.cache_read_only = True
+            self.last_cache_error = (f"Gagal memuat cache {self.cache_file}: {e}\n"
+                                     f"Cache tidak akan ditimpa selama sesi ini.")
+            print(self.last_cache_error)
+            traceback.print_exc()
+            return False
+        finally:
+            self.cache_loading = False
+
+    def _load_snapshot(self, lazy):
+        snapshot = SnapshotFile(self.cache_file)
+        snapshot.read_index()
+        meta = snapshot.load_section('meta', {})
+        rooms = snapshot.load_section('rooms', {})
+        self.lecturers = meta.get('lecturers', [])
+        self.subjects = meta.get('subjects', [])
+        self.classes = meta.get('classes', [])
+        self.excel_path = meta.get('excel_path')
+        self.next_row_id = meta.get('next_row_id', 1)
+        self.journal_seq = meta.get('journal_seq', 0)
+        self.available_rooms = rooms.get('available_rooms', [])
+        self.room_capacities = rooms.get('room_capacities', {})
+        self.lecturer_preferences = defaultdict(dict, snapshot.load_section('preferences', {}))
+        self.lecturer_breaks = defaultdict(list, snapshot.load_section('breaks', {}))
+
+        entries = self._read_journal_tail()
+        # Preferensi dan istirahat tidak bergantung pada jadwal, langsung diterapkan
+        self._apply_journal_entries([e for e in entries if e['op'] in ('preference', 'break')])
+        schedule_entries = [e for e in entries if e['op'] not in ('preference', 'break')]
+        for entry in schedule_entries:
+            if entry['op'] == 'add':
+                self._register_names(entry['schedule'])
+
+        with self._deferred_lock:
+            self._deferred_snapshot = snapshot
+            self._deferred_journal = schedule_entries
+        if not lazy:
+            self.load_deferred_sections()
+
+    def _load_legacy_pickle(self):
+        with open(self.cache_file, 'rb') as f:
+            data = pickle.load(f)
+        self.lecturers = data.get('lecturers', [])
+        self.subjects = data.get('subjects', [])
+        self.classes = data.get('classes', [])
+        self.fixed_schedules = data.get('fixed_schedules', [])
+        self.generated_schedules = data.get('generated_schedules', [])
+        self.lecturer_breaks = defaultdict(list, data.get('lecturer_breaks', {}))
+        self.lecturer_preferences = defaultdict(dict, data.get('lecturer_preferences', {}))
+        self.excel_path = data.get('excel_path')
+        self.available_rooms = data.get('available_rooms', [])
+        self.room_capacities = data.get('room_capacities', {})
+        self.next_row_id = data.get('next_row_id', 1)
+        self.journal_seq = data.get('journal_seq', 0)
+        for s in self.fixed_schedules + self.generated_schedules:
+            self.assign_row_id(s)
+        self._apply_journal_entries(self._read_journal_tail())
+
+    def _read_journal_tail(self):
+        if self.journal is None:
+            return []
+        self.journal.seq = max(self.journal.seq, self.journal_seq)
+        return self.journal.read_entries(after_seq=self.journal_seq)
+
+    def replay_journal(self):
+        """Terapkan entri journal yang lebih baru dari snapshot"""
+        entries = self._read_journal_tail()
+        self._apply_journal_entries(entries)
+        return len(entries)
+
+    def _apply_journal_entries(self, entries):
+        if not entries:
+            return
+        rows = {s['row_id']: s for s in self._fixed_schedules + self._generated_schedules}
+        for entry in entries:
+            try:
+                self.apply_journal_entry(entry, rows)
+            except Exception as e:
+                print(f"Error replaying journal entry {entry.get('seq')}: {e}")
+            self.journal_seq = max(self.journal_seq, entry['seq'])
+        if any(entry['op'] in ('preference', 'break') for entry in entries):
+            self.compile_lecturer_masks()
+
+    def apply_journal_entry(self, entry, rows):
+        op = entry['op']
+        if op == 'add':
+            schedule = entry['schedule']
+            self.fixed_schedules.append(schedule)
+            rows[self.assign_row_id(schedule)] = schedule
+            self._register_names(schedule)
+        elif op == 'edit':
+            old = rows.pop(entry['row_id'], None)
+            if old is not None:
+                self._remove_row(old)
+            schedule = entry['schedule']
+            self.fixed_schedules.append(schedule)
+            rows[self.assign_row_id(schedule)] = schedule
+        elif op == 'remove':
+            old = rows.pop(entry['row_id'], None)
+            if old is not None:
+                self._remove_row(old)
+        elif op == 'update':
+            for state in entry['rows']:
+                schedule = rows.get(state['row_id'])
+                if schedule is not None:
+                    schedule.update(state)
+        elif op == 'preference':
+            prefs = entry['prefs']
+            for key in ('preferred_times_offline', 'preferred_times_online'):
+                prefs[key] = [tuple(t) for t in prefs.get(key, [])]
+            self.lecturer_preferences[entry['lecturer']] = prefs
+        elif op == 'break':
+            self.lecturer_breaks[entry['key']].append(entry['value'])
+
+    def _register_names(self, schedule):
+        for value, items in ((schedule['dosen'], self.lecturers),
+                             (schedule['mata_kuliah'], self.subjects),
+                             (schedule['kelas'], self.classes)):
+            if value not in items:
+                items.append(value)
+
+    def _remove_row(self, schedule):
+        for schedules in (self.fixed_schedules, self.generated_schedules):
+            for idx, s in enumerate(schedules):
+                if s is schedule:
+                    del schedules[idx]
+                    return True
         return False
 
     def save_ui_state(self, state):
         try:
-            with open(self.ui_state_file, 'w') as f:
-                json.dump(state, f)
+            write_json_atomic(self.ui_state_file, state)
         except Exception as e:
             print(f"Error saving UI state: {e}")
 
@@ -191,6 +1717,100 @@ class ScheduleGenerator:
                 valid_prefs['preferred_times_online'].append((start, end))
         
         self.lecturer_preferences[lecturer] = valid_prefs
+        self.compile_lecturer_masks(lecturer)
+        self.record_change('preference', lecturer=lecturer, prefs=valid_prefs)
+
+    def split_break_key(self, key):
+        """(dosen, hari) dari kunci lecturer_breaks; hari None untuk kunci lama tanpa hari (berlaku setiap hari)"""
+        lecturer, sep, day = key.rpartition('|')
+        if sep and day in self.days:
+            return lecturer, day
+        return key, None
+
+    def compile_lecturer_masks(self, lecturer=None):
+        """Kompilasi preferensi dan istirahat dosen menjadi mask menit per hari.
+        Dipanggil saat preferensi/istirahat ditambah atau dimuat; lecturer=None berarti semua dosen."""
+        if lecturer is None:
+            self.lecturer_masks = {}
+            self._empty_lecturer_mask = self._compile_lecturer(None)
+            names = set(self.lecturer_preferences)
+            names.update(self.split_break_key(key)[0] for key in self.lecturer_breaks)
+        else:
+            names = [lecturer]
+        for name in names:
+            self.lecturer_masks[name] = self._compile_lecturer(name)
+
+    def _compile_lecturer(self, lecturer):
+        pref = self.lecturer_preferences.get(lecturer, {}) if lecturer is not None else {}
+        
+        def to_minutes(value):
+            parsed, _ = self.parse_time(value)
+            return parsed.hour * 60 + parsed.minute if parsed else None
+        
+        preferred = None
+        if pref.get('preferred_times_offline') or pref.get('preferred_times_online'):
+            preferred = {}
+            for mode in ('offline', 'online'):
+                times = pref.get(f'preferred_times_{mode}', [])
+                windows = [(to_minutes(a), to_minutes(b)) for a, b in times]
+                # (wajib, jendela): daftar kosong berarti mode ini bebas waktu
+                preferred[mode] = (bool(times), [(a, b) for a, b in windows if a is not None and b is not None])
+        
+        fixed = self.break_times + (self.additional_break_times if pref.get('use_additional_breaks', False) else [])
+        fixed_bits = 0
+        for bt in fixed:
+            fixed_bits |= minute_bits(bt['start'].hour * 60 + bt['start'].minute, bt['end'].hour * 60 + bt['end'].minute)
+        
+        day_bits = defaultdict(int)
+        break_items = []
+        if lecturer is not None:
+            for key, values in self.lecturer_breaks.items():
+                name, day = self.split_break_key(key)
+                if name != lecturer:
+                    continue
+                for value in values:
+                    parts = value.split(' - ')
+                    if len(parts) != 2:
+                        continue
+                    start, end = to_minutes(parts[0]), to_minutes(parts[1])
+                    if start is None or end is None:
+                        continue
+                    day_bits[day] |= minute_bits(start, end)
+                    break_items.append((day, start, end, parts[0], parts[1]))
+        
+        return {
+            'available_days': frozenset(pref.get('available_days', [])),
+            'online_days': frozenset(pref.get('online_days', [])),
+            'preferred': preferred,
+            'use_additional_breaks': pref.get('use_additional_breaks', False),
+            'fixed_breaks': fixed_bits,
+            # Kunci None = istirahat tanpa hari, berlaku setiap hari
+            'day_breaks': dict(day_bits),
+            'break_items': break_items
+        }
+
+    def lecturer_mask(self, lecturer):
+        """Hasil kompilasi preferensi dan istirahat satu dosen (O(1))"""
+        mask = self.lecturer_masks.get(lecturer)
+        if mask is None:
+            if self._empty_lecturer_mask is None:
+                self._empty_lecturer_mask = self._compile_lecturer(None)
+            mask = self._empty_lecturer_mask
+        return mask
+
+    def lecturer_blocked_bits(self, mask, day, is_online):
+        """Mask menit yang tertutup oleh istirahat pada hari itu; istirahat umum hanya untuk kelas offline"""
+        bits = mask['day_breaks'].get(day, 0) | mask['day_breaks'].get(None, 0)
+        if not is_online:
+            bits |= mask['fixed_breaks']
+        return bits
+
+    def preferred_time_ok(self, mask, is_online, start, end):
+        """True jika [start, end) menit masuk salah satu jendela waktu yang diinginkan dosen"""
+        if mask['preferred'] is None:
+            return True
+        required, windows = mask['preferred']['online' if is_online else 'offline']
+        return not required or any(p_start <= start and end <= p_end for p_start, p_end in windows)
 
     def parse_time(self, time_str):
         try:
@@ -224,72 +1844,129 @@ class ScheduleGenerator:
 
     def load_data(self, excel_path):
         try:
-            self.excel_path = excel_path
-            df = pd.read_excel(excel_path, sheet_name='Mapping mata kuliah', skiprows=2)
-            df = df.dropna(subset=['Nama Dosen', 'Mata Kuliah'])
-
-            # Konversi kolom SKS dan Semester ke integer
-            df['SKS'] = df['SKS'].fillna(0).astype(int)
-            df['Semester'] = df['Semester'].fillna(0).astype(int)
-        
-            self.lecturers = df['Nama Dosen'].unique().tolist()
-            self.subjects = df['Mata Kuliah'].unique().tolist()
-            self.classes = df['Kelas'].unique().tolist()
-            self.fixed_schedules = []
-        
-            for idx, row in df.iterrows():
-                self.fixed_schedules.append({
-                    'source': 'excel',
-                    'excel_index': idx,
-                    'dosen': row['Nama Dosen'],
-                    'mata_kuliah': row['Mata Kuliah'],
-                    'kelas': row['Kelas'],
-                    'hari': "",
-                    'jam': "",
-                    'semester': row['Semester'],  # Sudah integer
-                    'sks': row['SKS'],            # Sudah integer
-                    'ruangan': "",
-                    'jumlah_mahasiswa': row.get('Jumlah Mahasiswa', 0),
-                    'is_fixed': False  # Default tidak tetap
-                })
+            rows = read_mapping_rows(excel_path)
+            # Normalisasi nama sama dengan load_data_multi agar kunci preferensi/istirahat cocok
+            self._apply_mapping_rows(excel_path, [rows])
             return True
         except Exception as e:
-            messagebox.showerror("Error", f"Gagal memuat data: {str(e)}")
+            self.report_error(f"Gagal memuat data: {str(e)}")
             return False
 
+    def _apply_mapping_rows(self, excel_path, row_lists):
+        """Ganti jadwal dengan baris mapping; nama dosen, kelas dan mata kuliah yang sama (beda
+        spasi/kapitalisasi) disatukan ke ejaan pertama. Mengembalikan (jumlah baris, nama digabung)."""
+        canonical = {'dosen': {}, 'mata_kuliah': {}, 'kelas': {}}
+        spellings = {'dosen': set(), 'mata_kuliah': set(), 'kelas': set()}
+        merged_rows = []
+        for rows in row_lists:
+            for row in rows:
+                for field, names in canonical.items():
+                    value = row[field]
+                    spellings[field].add(value)
+                    row[field] = names.setdefault(normalize_name(value), value)
+                merged_rows.append(row)
+
+        self.excel_path = excel_path
+        self.lecturers = list(canonical['dosen'].values())
+        self.subjects = list(canonical['mata_kuliah'].values())
+        self.classes = list(canonical['kelas'].values())
+        self.fixed_schedules = []
+        for row in merged_rows:
+            self.assign_row_id(row)
+            self.fixed_schedules.append(row)
+        # Data baru menggantikan semuanya, jadi langsung dijadikan snapshot
+        self.checkpoint()
+        return len(merged_rows), sum(len(spellings[f]) - len(canonical[f]) for f in canonical)
+
+    def load_data_multi(self, sources, max_workers=None):
+        """Muat banyak workbook/sheet mapping sekaligus dan gabungkan menjadi satu jadwal.
+
+        sources berisi path atau tuple (path, sheet). Tiap sumber dibaca paralel
+        di process pool; dosen, kelas dan mata kuliah yang namanya sama (beda
+        spasi/kapitalisasi) disatukan, dan tiap baris menyimpan asal filenya.
+        """
+        start = perf_counter()
+        normalized_sources = []
+        for source in sources:
+            if isinstance(source, (tuple, list)):
+                normalized_sources.append((source[0], source[1]))
+            else:
+                normalized_sources.append((source, MAPPING_SHEET))
+
+        summary = {'sources': len(normalized_sources), 'rows': 0, 'errors': [], 'merged_names': 0}
+        results = []
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_read_mapping_source, source): source for source in normalized_sources}
+            for future in as_completed(futures):
+                path, sheet_name = futures[future]
+                try:
+                    results.append((normalized_sources.index((path, sheet_name)), future.result()))
+                except Exception as e:
+                    summary['errors'].append(f"{os.path.basename(path)} [{sheet_name}]: {e}")
+
+        if not results:
+            summary['seconds'] = perf_counter() - start
+            return summary
+
+        # Urutan hasil mengikuti urutan sumber agar nama kanonik deterministik
+        results.sort(key=lambda item: item[0])
+        summary['rows'], summary['merged_names'] = self._apply_mapping_rows(
+            normalized_sources[0][0], [rows for _, rows in results])
+        summary['lecturers'] = len(self.lecturers)
+        summary['classes'] = len(self.classes)
+        summary['subjects'] = len(self.subjects)
+        summary['seconds'] = perf_counter() - start
+        return summary
+
     def load_rooms(self, json_path):
         try:
             with open(json_path, 'r') as f:
                 rooms = json.load(f)
                 self.available_rooms = [room for room in rooms if 'online' not in room['nama'].lower()]
                 self.room_capacities = {room['nama']: room.get('kapasitas', 30) for room in self.available_rooms}
+            self.checkpoint()
             return True
         except Exception as e:
-            messagebox.showerror("Error", f"Gagal memuat data ruangan: {str(e)}")
+            self.report_error(f"Gagal memuat data ruangan: {str(e)}")
             return False
 
     def is_time_overlap(self, start1, end1, start2, end2):
         return not (end1 <= start2 or start1 >= end2)
 
-    def is_conflict(self, schedule, check_room_capacity=True):
+    def is_conflict(self, schedule, check_room_capacity=True, ignore=None):
+        return self.conflict_cause(schedule, check_room_capacity, ignore) is not None
+
+    def conflict_cause(self, schedule, check_room_capacity=True, ignore=None):
+        """Penyebab konflik pertama yang ditemukan (mis. 'lecturer_overlap'), atau None jika bebas konflik"""
         if not schedule['jam']:
-            return False
+            return None
             
         jam_parts = schedule['jam'].split(' - ')
         if len(jam_parts) != 2:
-            return True
+            return 'invalid_time'
             
         start, end = jam_parts
         start_time, is_online = self.parse_time(start)
         end_time, _ = self.parse_time(end)
         
         if not start_time or not end_time or not self.is_valid_time_range(start, end):
-            return True
-            
-        all_schedules = self.fixed_schedules + self.generated_schedules
+            return 'invalid_time'
+        
+        start_minute = start_time.hour * 60 + start_time.minute
+        end_minute = end_time.hour * 60 + end_time.minute
+        use_store = self.store_ready()
+        if use_store:
+            # Kandidat per pemeriksaan diambil dari indeks store (dosen/ruangan/kelas + hari)
+            all_schedules = None
+        else:
+            all_schedules = self.fixed_schedules + self.generated_schedules
+            if ignore is not None:
+                # Baris asal dari salinan yang sedang dievaluasi tidak dihitung
+                all_schedules = [s for s in all_schedules if s is not ignore]
         
         # 1. Check lecturer availability
-        for sched in all_schedules:
+        candidates = self._store_overlaps('dosen', schedule, start_minute, end_minute, ignore) if use_store else all_schedules
+        for sched in candidates:
             if (sched != schedule and sched['dosen'] == schedule['dosen'] 
                 and sched['hari'] == schedule['hari'] and sched['jam']):
                 s_start, s_end = sched['jam'].split(' - ')
@@ -297,45 +1974,18 @@ class ScheduleGenerator:
                 s_end_time, _ = self.parse_time(s_end)
                 
                 if s_start_time and s_end_time and self.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
-                    return True
+                    return 'lecturer_overlap'
         
-        # Check lecturer preferences
-        lecturer_pref = self.lecturer_preferences.get(schedule['dosen'], {})
-        
-        # Check available days (hari yang tersedia)
-        available_days = lecturer_pref.get('available_days', [])
-        if available_days and schedule['hari'] not in available_days:
-            return True
-            
-        # Check online days
-        if schedule['hari'] in lecturer_pref.get('online_days', []) and schedule.get('ruangan') != 'Online':
-            return True
-            
-        # Check preferred times (online/offline specific)
-        if lecturer_pref.get('preferred_times_offline') or lecturer_pref.get('preferred_times_online'):
-            time_ok = False
-            is_online_class = schedule.get('ruangan') == 'Online'
-            
-            if is_online_class:
-                preferred_times = lecturer_pref.get('preferred_times_online', [])
-            else:
-                preferred_times = lecturer_pref.get('preferred_times_offline', [])
-            
-            for pref_start, pref_end in preferred_times:
-                pref_start_time, _ = self.parse_time(pref_start)
-                pref_end_time, _ = self.parse_time(pref_end)
-                
-                if pref_start_time and pref_end_time and start_time >= pref_start_time and end_time <= pref_end_time:
-                    time_ok = True
-                    break
-            
-            if preferred_times and not time_ok:
-                return True
+        # Check lecturer preferences, kapasitas dan jam istirahat (aturan per baris, lihat rule_violations)
+        rule_causes = self.rule_violations(schedule, schedule['hari'], start_minute, end_minute, check_room_capacity)
+        if rule_causes and rule_causes[0] in ('preference', 'online_day'):
+            return rule_causes[0]
                     
         # 2. Check room availability and capacity (only for offline classes)
         if (check_room_capacity and schedule.get('ruangan') 
             and schedule['ruangan'] != 'Online' and schedule.get('jam')):
-            for sched in all_schedules:
+            candidates = self._store_overlaps('ruangan', schedule, start_minute, end_minute, ignore) if use_store else all_schedules
+            for sched in candidates:
                 if (sched != schedule and sched.get('ruangan') == schedule['ruangan'] 
                     and sched['hari'] == schedule['hari'] and sched['jam']):
                     s_start, s_end = sched['jam'].split(' - ')
@@ -343,14 +1993,14 @@ class ScheduleGenerator:
                     s_end_time, _ = self.parse_time(s_end)
                     
                     if s_start_time and s_end_time and self.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
-                        return True
+                        return 'room_overlap'
             
-            room_capacity = self.room_capacities.get(schedule['ruangan'], 0)
-            if schedule.get('jumlah_mahasiswa', 0) > room_capacity:
-                return True
+            if 'capacity' in rule_causes:
+                return 'capacity'
         
         # 3. Check class availability (for both online and offline)
-        for sched in all_schedules:
+        candidates = self._store_overlaps('kelas', schedule, start_minute, end_minute, ignore) if use_store else all_schedules
+        for sched in candidates:
             if (sched != schedule and sched['kelas'] == schedule['kelas'] 
                 and sched['hari'] == schedule['hari'] and sched['jam']):
                 s_start, s_end = sched['jam'].split(' - ')
@@ -358,30 +2008,32 @@ class ScheduleGenerator:
                 s_end_time, _ = self.parse_time(s_end)
                 
                 if s_start_time and s_end_time and self.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
-                    return True
+                    return 'class_overlap'
         
-        # 4. Check break times (only for offline classes)
-        if schedule.get('ruangan') != 'Online' and schedule.get('jam'):
-            break_times_to_check = self.break_times.copy()
-            
-            if lecturer_pref.get('use_additional_breaks', False):
-                break_times_to_check.extend(self.additional_break_times)
-            
-            for bt in break_times_to_check:
-                if start_time < bt['end'] and end_time > bt['start']:
-                    return True
-            
-        # 5. Check lecturer break times (for both online and offline)
-        lecturer_breaks = self.lecturer_breaks.get(schedule['dosen'], [])
-        for break_time in lecturer_breaks:
-            break_start, break_end = break_time.split(' - ')
-            break_start_time, _ = self.parse_time(break_start)
-            break_end_time, _ = self.parse_time(break_end)
-            
-            if break_start_time and break_end_time and self.is_time_overlap(start_time, end_time, break_start_time, break_end_time):
-                return True
+        # 4-5. Check break times (umum hanya untuk offline) dan istirahat dosen pada hari jadwal
+        if 'break_time' in rule_causes:
+            return 'break_time'
                 
-        return False
+        return None
+
+    def rule_violations(self, schedule, day, start, end, check_room_capacity=True):
+        """Pelanggaran aturan satu baris yang tidak bergantung pada baris lain (preferensi dosen,
+        hari online, kapasitas ruangan, jam istirahat), urut seperti diperiksa conflict_cause"""
+        mask = self.lecturer_mask(schedule['dosen'])
+        is_online = schedule.get('ruangan') == 'Online'
+        causes = []
+        if mask['available_days'] and day not in mask['available_days']:
+            causes.append('preference')
+        if day in mask['online_days'] and not is_online:
+            causes.append('online_day')
+        if not self.preferred_time_ok(mask, is_online, start, end):
+            causes.append('preference')
+        if check_room_capacity and schedule.get('ruangan') and not is_online:
+            if schedule.get('jumlah_mahasiswa', 0) > self.room_capacities.get(schedule['ruangan'], 0):
+                causes.append('capacity')
+        if self.lecturer_blocked_bits(mask, day, is_online) & minute_bits(start, end):
+            causes.append('break_time')
+        return causes
 
     def get_conflict_reasons(self, schedule):
         reasons = []
@@ -441,57 +2093,37 @@ class ScheduleGenerator:
                     reasons.append(f"Konflik kelas dengan jadwal {sched['mata_kuliah']}")
         
         # Check break times (only for offline)
-        if schedule.get('ruangan') != 'Online':
-            lecturer_pref = self.lecturer_preferences.get(schedule['dosen'], {})
+        lecturer_mask = self.lecturer_mask(schedule['dosen'])
+        is_online_class = schedule.get('ruangan') == 'Online'
+        start_minute = start_time.hour * 60 + start_time.minute
+        end_minute = end_time.hour * 60 + end_time.minute
+        if not is_online_class:
             break_times_to_check = self.break_times.copy()
-            if lecturer_pref.get('use_additional_breaks', False):
+            if lecturer_mask['use_additional_breaks']:
                 break_times_to_check.extend(self.additional_break_times)
             
             for bt in break_times_to_check:
                 if start_time < bt['end'] and end_time > bt['start']:
                     reasons.append(f"Tumpang tindih dengan waktu istirahat ({bt['start'].strftime('%H:%M')}-{bt['end'].strftime('%H:%M')})")
         
-        # Check lecturer breaks
-        lecturer_breaks = self.lecturer_breaks.get(schedule['dosen'], [])
-        for break_time in lecturer_breaks:
-            break_start, break_end = break_time.split(' - ')
-            break_start_time, _ = self.parse_time(break_start)
-            break_end_time, _ = self.parse_time(break_end)
-            
-            if break_start_time and break_end_time and self.is_time_overlap(start_time, end_time, break_start_time, break_end_time):
+        # Check lecturer breaks (istirahat tanpa hari berlaku setiap hari)
+        for day, break_start_minute, break_end_minute, break_start, break_end in lecturer_mask['break_items']:
+            if (day is None or day == schedule['hari']) and minute_bits(break_start_minute, break_end_minute) & minute_bits(start_minute, end_minute):
                 reasons.append(f"Tumpang tindih dengan waktu istirahat dosen ({break_start}-{break_end})")
         
         # Check lecturer preferences
-        available_days = lecturer_pref.get('available_days', [])
-        if available_days and schedule['hari'] not in available_days:
+        if lecturer_mask['available_days'] and schedule['hari'] not in lecturer_mask['available_days']:
             reasons.append(f"Hari {schedule['hari']} tidak tersedia untuk dosen ini")
             
-        if schedule['hari'] in lecturer_pref.get('online_days', []) and schedule.get('ruangan') != 'Online':
+        if schedule['hari'] in lecturer_mask['online_days'] and not is_online_class:
             reasons.append(f"Hari {schedule['hari']} harus online tetapi jadwal offline")
             
-        if lecturer_pref.get('preferred_times_offline') or lecturer_pref.get('preferred_times_online'):
-            time_ok = False
-            is_online_class = schedule.get('ruangan') == 'Online'
-            
-            if is_online_class:
-                preferred_times = lecturer_pref.get('preferred_times_online', [])
-            else:
-                preferred_times = lecturer_pref.get('preferred_times_offline', [])
-            
-            for pref_start, pref_end in preferred_times:
-                pref_start_time, _ = self.parse_time(pref_start)
-                pref_end_time, _ = self.parse_time(pref_end)
-                
-                if pref_start_time and pref_end_time and start_time >= pref_start_time and end_time <= pref_end_time:
-                    time_ok = True
-                    break
-            
-            if preferred_times and not time_ok:
-                reasons.append("Waktu tidak sesuai preferensi dosen")
+        if not self.preferred_time_ok(lecturer_mask, is_online_class, start_minute, end_minute):
+            reasons.append("Waktu tidak sesuai preferensi dosen")
         
         return reasons
 
-    def get_available_room(self, department, day, start_time_str, end_time_str, student_count=0):
+    def get_available_room(self, department, day, start_time_str, end_time_str, student_count=0, ignore=None):
         try:
             start_time, is_online = self.parse_time(start_time_str)
             end_time, _ = self.parse_time(end_time_str)
@@ -504,52 +2136,77 @@ class ScheduleGenerator:
                 return 'Online'
                 
             preferred_floors = self.department_preferences.get(department, self.department_preferences['default'])
-            rooms = self.available_rooms.copy()
-            random.shuffle(rooms)
-            
-            valid_rooms = [room for room in rooms 
-                          if room.get('kapasitas', 30) >= student_count]
-            
-            for room in valid_rooms:
-                if room.get('lantai') in preferred_floors:
-                    available = True
-                    for sched in self.fixed_schedules + self.generated_schedules:
-                        if (sched.get('ruangan') == room['nama'] 
-                            and sched['hari'] == day 
-                            and sched['jam']):
-                            s_start, s_end = sched['jam'].split(' - ')
-                            s_start_time, _ = self.parse_time(s_start)
-                            s_end_time, _ = self.parse_time(s_end)
-                            
-                            if (s_start_time and s_end_time 
-                                and self.is_time_overlap(start_time, end_time, s_start_time, s_end_time)):
-                                available = False
-                                break
-                    if available:
+            busy = self.busy_rooms(day, start_time.hour * 60 + start_time.minute, end_time.hour * 60 + end_time.minute,
+                                   ignore)
+            
+            if self.room_strategy == 'random':
+                rooms = self.available_rooms.copy()
+                random.shuffle(rooms)
+                valid_rooms = [room for room in rooms if room.get('kapasitas', 30) >= student_count]
+                for room in [room for room in valid_rooms if room.get('lantai') in preferred_floors] + valid_rooms:
+                    if room['nama'] not in busy:
                         return room['nama']
-                    
-            for room in valid_rooms:
-                available = True
-                for sched in self.fixed_schedules + self.generated_schedules:
-                    if (sched.get('ruangan') == room['nama'] 
-                        and sched['hari'] == day 
-                        and sched['jam']):
-                        s_start, s_end = sched['jam'].split(' - ')
-                        s_start_time, _ = self.parse_time(s_start)
-                        s_end_time, _ = self.parse_time(s_end)
-                        
-                        if (s_start_time and s_end_time 
-                            and self.is_time_overlap(start_time, end_time, s_start_time, s_end_time)):
-                            available = False
-                            break
-                if available:
-                    return room['nama']
-                    
+                return None
+            
+            # Best-fit: ruangan terkecil yang cukup, lantai preferensi dulu lalu semua lantai
+            allocator = self.room_allocator()
+            for floors in (preferred_floors, None):
+                room = allocator.best_fit(student_count, busy, floors, self.room_reserve_threshold)
+                if room:
+                    return room
+            if self.room_reserve_threshold is not None:
+                # Ruangan cadangan baru dipakai kelas kecil jika tidak ada pilihan lain
+                return allocator.best_fit(student_count, busy)
             return None
         except Exception as e:
             print(f"Error in get_available_room: {e}")
             return None
 
+    def room_allocator(self):
+        """RoomAllocator untuk available_rooms saat ini, dibangun ulang jika daftar ruangan diganti"""
+        if self._room_allocator is None or self._room_allocator.source is not self.available_rooms:
+            self._room_allocator = RoomAllocator(self.available_rooms)
+        return self._room_allocator
+
+    def room_occupancy(self):
+        """RoomOccupancy jadwal saat ini. Dibangun ulang jika revisi naik atau daftar jadwal diganti;
+        selama batch di tempat diperbarui lewat note_room"""
+        fixed, generated = self.fixed_schedules, self.generated_schedules
+        key = (self.revision, id(fixed), id(generated), len(fixed), len(generated))
+        if self._room_occupancy is None or self._room_occupancy_key != key:
+            self._room_occupancy = RoomOccupancy(fixed + generated)
+            self._room_occupancy_key = key
+        return self._room_occupancy
+
+    def note_room(self, schedule):
+        """Catat ruangan/hari/jam baru sebuah baris di indeks ruangan (dipanggil setelah penugasan di tempat)"""
+        self.room_occupancy().note(schedule)
+
+    def busy_rooms(self, day, start, end, ignore=None):
+        """Ruangan yang terpakai pada hari itu dan beririsan dengan rentang menit [start, end), tanpa
+        menghitung baris ignore. Mendukung `nama in busy`; tiap ruangan dicek di indeks saat ditanyakan."""
+        return self.room_occupancy().busy(day, start, end, ignore)
+
+    def seat_utilization(self):
+        """Rasio mahasiswa terhadap kapasitas ruangan pada jadwal offline yang sudah mendapat ruangan"""
+        seats = students = 0
+        by_room = defaultdict(lambda: [0, 0])
+        for schedule in self.fixed_schedules + self.generated_schedules:
+            room = schedule.get('ruangan')
+            if room in self.room_capacities:
+                capacity = self.room_capacities[room]
+                count = min(schedule.get('jumlah_mahasiswa', 0) or 0, capacity)
+                seats += capacity
+                students += count
+                by_room[room][0] += count
+                by_room[room][1] += capacity
+        return {
+            'overall': students / seats if seats else 0.0,
+            'wasted_seats': seats - students,
+            'by_room': {room: used / capacity for room, (used, capacity) in by_room.items() if capacity}
+        }
+
+    @unrecorded_batch
     def fill_empty_rooms_randomly(self):
         try:
             all_schedules = self.fixed_schedules + self.generated_schedules
@@ -588,66 +2245,162 @@ class ScheduleGenerator:
                 )
                 if room:
                     sched['ruangan'] = room
+                    self.note_room(sched)
                 else:
+                    start_min, end_min = jam_to_minutes(sched['jam'])
+                    occupancy = self.room_occupancy()
                     for room in self.available_rooms:
                         if room.get('kapasitas', 30) < student_count:
                             continue
-                            
-                        available = True
-                        for existing in all_schedules:
-                            if (existing.get('ruangan') == room['nama'] 
-                                and existing['hari'] == sched['hari'] 
-                                and existing.get('jam')):
-                                try:
-                                    e_jam_parts = existing['jam'].split(' - ')
-                                    if len(e_jam_parts) != 2:
-                                        continue
-                                    e_start, e_end = e_jam_parts
-                                    e_start_time, _ = self.parse_time(e_start)
-                                    e_end_time, _ = self.parse_time(e_end)
-                                    current_start_time, _ = self.parse_time(start)
-                                    current_end_time, _ = self.parse_time(end)
-                                    
-                                    if (e_start_time and e_end_time and current_start_time and current_end_time
-                                        and self.is_time_overlap(current_start_time, current_end_time, e_start_time, e_end_time)):
-                                        available = False
-                                        break
-                                except:
-                                    continue
-                        if available:
+                        if start_min is None or not occupancy.is_busy(sched['hari'], room['nama'], start_min, end_min):
                             sched['ruangan'] = room['nama']
+                            self.note_room(sched)
                             break
+            filled = [s for s in schedules_without_room if s.get('ruangan')]
+            if filled:
+                self.record_change('update', rows=[self.row_state(s) for s in filled])
             return True
         except Exception as e:
             print(f"Error in fill_empty_rooms_randomly: {e}")
             return False
 
-    def save_to_excel(self, schedules, template_path, output_folder):
+    def export_to_excel(self, schedules, template_path, output_folder, filename=None):
+        """Seperti save_to_excel tetapi melempar exception (dipakai dari thread worker)"""
+        if not filename:
+            filename = f"Jadwal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        output_path = os.path.join(output_folder, filename)
+        exporter = StreamingExcelExporter(template_path)
+        self.last_export_stats = exporter.write(schedules, output_path)
+        print(f"Export {self.last_export_stats['rows']} baris dalam "
+              f"{self.last_export_stats['seconds']:.3f} detik "
+              f"({self.last_export_stats['rows_per_sec']:.0f} baris/detik)")
+        return output_path
+
+    def save_to_excel(self, schedules, template_path, output_folder, filename=None):
         try:
-            output_path = os.path.join(output_folder, f"Jadwal_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-            wb = load_workbook(template_path)
-            sheet = wb.active
-            
-            headers = ["Hari", "Mata Kuliah", "Kelas", "Ruangan", "Jam", "SKS", "Semester", "Dosen", "Jumlah Mahasiswa"]
-            for col, header in enumerate(headers, start=1):
-                sheet.cell(row=3, column=col, value=header)
-            
-            for row_idx, sched in enumerate(schedules, start=4):
-                sheet.cell(row=row_idx, column=1, value=sched['hari'])
-                sheet.cell(row=row_idx, column=2, value=sched['mata_kuliah'])
-                sheet.cell(row=row_idx, column=3, value=sched['kelas'])
-                sheet.cell(row=row_idx, column=4, value=sched.get('ruangan', ''))
-                sheet.cell(row=row_idx, column=5, value=sched['jam'])
-                sheet.cell(row=row_idx, column=6, value=sched['sks'])
-                sheet.cell(row=row_idx, column=7, value=sched['semester'])
-                sheet.cell(row=row_idx, column=8, value=sched['dosen'])
-                sheet.cell(row=row_idx, column=9, value=sched.get('jumlah_mahasiswa', ''))
-                
-            wb.save(output_path)
-            return output_path
+            return self.export_to_excel(schedules, template_path, output_folder, filename)
         except Exception as e:
-            messagebox.showerror("Error", f"Gagal menyimpan: {str(e)}")
+            self.report_error(f"Gagal menyimpan: {str(e)}")
+            return None
+
+    def export_records(self, schedules, output_path, fmt=None):
+        """Ekspor jadwal ke CSV, JSON Lines atau Parquet tanpa melalui openpyxl.
+
+        Kolom sama dengan header Excel. File ditulis ke file sementara lalu
+        di-rename agar pembaca tidak pernah melihat file setengah jadi.
+        """
+        fmt = (fmt or os.path.splitext(output_path)[1].lstrip('.')).lower()
+        start = perf_counter()
+        temp_path = output_path + ".tmp"
+        row_count = 0
+        try:
+            if fmt == 'csv':
+                with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(EXPORT_HEADERS)
+                    for sched in schedules:
+                        writer.writerow(schedule_to_row(sched))
+                        row_count += 1
+            elif fmt in ('jsonl', 'ndjson'):
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    for sched in schedules:
+                        record = dict(zip(EXPORT_HEADERS, schedule_to_row(sched)))
+                        f.write(json.dumps(record, ensure_ascii=False, default=_json_default))
+                        f.write("\n")
+                        row_count += 1
+            elif fmt == 'parquet':
+                import pandas as pd
+                rows = [schedule_to_row(sched) for sched in schedules]
+                row_count = len(rows)
+                df = pd.DataFrame.from_records(rows, columns=EXPORT_HEADERS)
+                try:
+                    df.to_parquet(temp_path, index=False)
+                except ImportError:
+                    raise RuntimeError("Ekspor Parquet membutuhkan paket pyarrow atau fastparquet")
+            else:
+                raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        elapsed = perf_counter() - start
+        self.last_export_stats = {
+            'path': output_path,
+            'rows': row_count,
+            'seconds': elapsed,
+            'rows_per_sec': row_count / elapsed if elapsed > 0 else float(row_count)
+        }
+        return output_path
+
+    def bulk_export(self, template_path, output_folder, max_workers=None):
+        """Ekspor semua jadwal per dosen, per kelas dan per ruangan sekaligus.
+
+        Jadwal dikelompokkan sekali, template dibaca sekali, lalu semua file
+        ditulis paralel di process pool.
+        """
+        start = perf_counter()
+        groups = {'Dosen': defaultdict(list), 'Kelas': defaultdict(list), 'Ruangan': defaultdict(list)}
+        for sched in self.fixed_schedules + self.generated_schedules:
+            groups['Dosen'][sched['dosen']].append(sched)
+            groups['Kelas'][sched['kelas']].append(sched)
+            if sched.get('ruangan'):
+                groups['Ruangan'][sched['ruangan']].append(sched)
+
+        template = StreamingExcelExporter.cached_template(template_path)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        jobs = []
+        for group_name, members in groups.items():
+            group_folder = os.path.join(output_folder, group_name)
+            os.makedirs(group_folder, exist_ok=True)
+            for key, schedules in members.items():
+                output_path = os.path.join(group_folder, f"Jadwal_{safe_filename(key)}_{timestamp}.xlsx")
+                jobs.append((group_name, schedules, output_path))
+
+        summary = {
+            'files': {name: 0 for name in groups},
+            'rows': 0,
+            'errors': [],
+            'output_folder': output_folder
+        }
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_export_worker,
+                                 initargs=(template,)) as pool:
+            futures = {
+                pool.submit(_write_export_job, schedules, output_path): (group_name, output_path)
+                for group_name, schedules, output_path in jobs
+            }
+            try:
+                for done, future in enumerate(as_completed(futures)):
+                    self.job_tick(done, len(futures), "Ekspor massal")
+                    group_name, output_path = futures[future]
+                    try:
+                        stats = future.result()
+                        summary['files'][group_name] += 1
+                        summary['rows'] += stats['rows']
+                    except Exception as e:
+                        summary['errors'].append(f"{output_path}: {e}")
+            except JobCancelled:
+                pool.shutdown(cancel_futures=True)
+                raise
+
+        summary['seconds'] = perf_counter() - start
+        print(f"Ekspor massal: {summary['files']['Dosen']} dosen, {summary['files']['Kelas']} kelas, "
+              f"{summary['files']['Ruangan']} ruangan, {summary['rows']} baris, "
+              f"{len(summary['errors'])} gagal dalam {summary['seconds']:.2f} detik")
+        return summary
+
+    def _row_times(self, sched, cache):
+        """(start_time, end_time) hasil parse_time untuk jam baris, None jika formatnya tidak bisa dipecah"""
+        jam = sched['jam']
+        if not isinstance(jam, str):
             return None
+        if jam not in cache:
+            parts = jam.split(' - ')
+            if len(parts) != 2:
+                cache[jam] = None
+            else:
+                cache[jam] = (self.parse_time(parts[0])[0], self.parse_time(parts[1])[0])
+        return cache[jam]
 
     def find_all_conflicts(self):
         conflicts = {
@@ -662,99 +2415,60 @@ class ScheduleGenerator:
         
         all_schedules = self.fixed_schedules + self.generated_schedules
         
+        # Pasangan hanya dibandingkan di dalam grup (dosen/ruangan/kelas, hari) yang sama,
+        # dengan urutan i < j seperti perbandingan semua pasangan sebelumnya
+        groups = {'dosen': defaultdict(list), 'ruangan': defaultdict(list), 'kelas': defaultdict(list)}
+        for j, other in enumerate(all_schedules):
+            if other.get('jam'):
+                groups['dosen'][(other['dosen'], other['hari'])].append(j)
+                groups['kelas'][(other['kelas'], other['hari'])].append(j)
+                if other.get('ruangan'):
+                    groups['ruangan'][(other['ruangan'], other['hari'])].append(j)
+        times = {}
+        pair_specs = (
+            ('lecturer', 'dosen', 'Dosen ganda'),
+            ('room', 'ruangan', 'Ruangan ganda'),
+            ('class', 'kelas', 'Kelas ganda')
+        )
+        
         for i, sched in enumerate(all_schedules):
+            self.job_tick(i, len(all_schedules), "Memeriksa konflik")
             if not sched.get('jam'):
                 continue
-                
-            for j, other in enumerate(all_schedules[i+1:], i+1):
-                if (sched['dosen'] == other['dosen'] 
-                    and sched['hari'] == other['hari'] 
-                    and other.get('jam')):
-                    try:
-                        s_start, s_end = sched['jam'].split(' - ')
-                        o_start, o_end = other['jam'].split(' - ')
-                        
-                        s_start_time, _ = self.parse_time(s_start)
-                        s_end_time, _ = self.parse_time(s_end)
-                        o_start_time, _ = self.parse_time(o_start)
-                        o_end_time, _ = self.parse_time(o_end)
-                        
-                        if (s_start_time and s_end_time and o_start_time and o_end_time
-                            and self.is_time_overlap(s_start_time, s_end_time, o_start_time, o_end_time)):
-                            conflicts['lecturer'].append({
-                                'conflict_type': 'Dosen ganda',
-                                'dosen': sched['dosen'],
-                                'hari': sched['hari'],
-                                'waktu': f"{max(s_start_time, o_start_time)}-{min(s_end_time, o_end_time)}",
-                                'schedule1': sched,
-                                'schedule2': other
-                            })
-                    except:
-                        continue
-            
-            if (sched.get('ruangan') and sched['ruangan'] != 'Online' 
-                and sched.get('jam')):
-                for j, other in enumerate(all_schedules[i+1:], i+1):
-                    if (other.get('ruangan') == sched['ruangan'] 
-                        and other['hari'] == sched['hari'] 
-                        and other.get('jam')):
-                        try:
-                            s_start, s_end = sched['jam'].split(' - ')
-                            o_start, o_end = other['jam'].split(' - ')
-                            
-                            s_start_time, _ = self.parse_time(s_start)
-                            s_end_time, _ = self.parse_time(s_end)
-                            o_start_time, _ = self.parse_time(o_start)
-                            o_end_time, _ = self.parse_time(o_end)
-                            
-                            if (s_start_time and s_end_time and o_start_time and o_end_time
-                                and self.is_time_overlap(s_start_time, s_end_time, o_start_time, o_end_time)):
-                                conflicts['room'].append({
-                                    'conflict_type': 'Ruangan ganda',
-                                    'ruangan': sched['ruangan'],
-                                    'hari': sched['hari'],
-                                    'waktu': f"{max(s_start_time, o_start_time)}-{min(s_end_time, o_end_time)}",
-                                    'schedule1': sched,
-                                    'schedule2': other
-                                })
-                        except:
-                            continue
-                
-                room_capacity = self.room_capacities.get(sched['ruangan'], 0)
-                if sched.get('jumlah_mahasiswa', 0) > room_capacity:
-                    conflicts['capacity'].append({
-                        'conflict_type': 'Kapasitas ruangan terlampaui',
-                        'ruangan': sched['ruangan'],
-                        'kapasitas': room_capacity,
-                        'mahasiswa': sched.get('jumlah_mahasiswa', 0),
-                        'schedule': sched
-                    })
             
-            for j, other in enumerate(all_schedules[i+1:], i+1):
-                if (sched['kelas'] == other['kelas'] 
-                    and sched['hari'] == other['hari'] 
-                    and other.get('jam')):
-                    try:
-                        s_start, s_end = sched['jam'].split(' - ')
-                        o_start, o_end = other['jam'].split(' - ')
-                        
-                        s_start_time, _ = self.parse_time(s_start)
-                        s_end_time, _ = self.parse_time(s_end)
-                        o_start_time, _ = self.parse_time(o_start)
-                        o_end_time, _ = self.parse_time(o_end)
-                        
-                        if (s_start_time and s_end_time and o_start_time and o_end_time
-                            and self.is_time_overlap(s_start_time, s_end_time, o_start_time, o_end_time)):
-                            conflicts['class'].append({
-                                'conflict_type': 'Kelas ganda',
-                                'kelas': sched['kelas'],
-                                'hari': sched['hari'],
-                                'waktu': f"{max(s_start_time, o_start_time)}-{min(s_end_time, o_end_time)}",
-                                'schedule1': sched,
-                                'schedule2': other
-                            })
-                    except:
+            s_times = self._row_times(sched, times)
+            for category, kind, conflict_type in pair_specs:
+                if kind == 'ruangan' and (not sched.get('ruangan') or sched['ruangan'] == 'Online'):
+                    continue
+                members = groups[kind][(sched[kind], sched['hari'])]
+                for j in members[bisect_right(members, i):]:
+                    other = all_schedules[j]
+                    o_times = self._row_times(other, times)
+                    if s_times is None or o_times is None:
                         continue
+                    s_start_time, s_end_time = s_times
+                    o_start_time, o_end_time = o_times
+                    if (s_start_time and s_end_time and o_start_time and o_end_time
+                        and self.is_time_overlap(s_start_time, s_end_time, o_start_time, o_end_time)):
+                        conflicts[category].append({
+                            'conflict_type': conflict_type,
+                            kind: sched[kind],
+                            'hari': sched['hari'],
+                            'waktu': f"{max(s_start_time, o_start_time)}-{min(s_end_time, o_end_time)}",
+                            'schedule1': sched,
+                            'schedule2': other
+                        })
+                
+                if kind == 'ruangan':
+                    room_capacity = self.room_capacities.get(sched['ruangan'], 0)
+                    if sched.get('jumlah_mahasiswa', 0) > room_capacity:
+                        conflicts['capacity'].append({
+                            'conflict_type': 'Kapasitas ruangan terlampaui',
+                            'ruangan': sched['ruangan'],
+                            'kapasitas': room_capacity,
+                            'mahasiswa': sched.get('jumlah_mahasiswa', 0),
+                            'schedule': sched
+                        })
             
             if sched.get('ruangan') != 'Online' and sched.get('jam'):
                 try:
@@ -819,72 +2533,270 @@ class ScheduleGenerator:
                         'schedule': sched
                     })
         
+        for kind, items in conflicts.items():
+            self.metrics.set('conflicts', len(items), type=kind)
         return conflicts
     
-    def suggest_conflict_resolutions(self, conflict):
-        suggestions = []
+    def conflict_rows(self, conflict):
+        if 'schedule' in conflict:
+            return [conflict['schedule']]
+        return [conflict['schedule1'], conflict['schedule2']]
+
+    def occupancy_index(self):
+        """Indeks okupansi jadwal saat ini, dibangun ulang hanya jika data berubah"""
+        if self._occupancy is None or self._occupancy_revision != self.revision:
+            self._occupancy = OccupancyIndex(self.fixed_schedules + self.generated_schedules)
+            self._occupancy_revision = self.revision
+        return self._occupancy
+
+    def row_violations(self, schedule, index, ignore=(), extra=()):
+        """Jumlah pelanggaran satu jadwal terhadap indeks (tanpa baris ignore) ditambah baris extra"""
+        start, end = jam_to_minutes(schedule.get('jam'))
+        if start is None or end <= start:
+            return 1
+        ignore = (schedule,) + tuple(ignore)
+        day = schedule.get('hari')
+        count = 0
+        for kind, key, _ in OccupancyIndex.slots_for(schedule):
+            count += len(index.overlapping(kind, key, day, start, end, ignore))
+            for other in extra:
+                if other.get(kind) == key and other.get('hari') == day:
+                    o_start, o_end = jam_to_minutes(other.get('jam'))
+                    if o_start is not None and o_start < end and o_end > start:
+                        count += 1
+        return count + len(self.rule_violations(schedule, day, start, end))
+
+    def _best_fit_rooms(self, schedule, day, start, end, index, ignore):
+        """Ruangan bebas dengan kapasitas cukup, dari yang paling pas"""
+        needed = schedule.get('jumlah_mahasiswa', 0)
+        rooms = sorted((r for r in self.available_rooms if r.get('kapasitas', 30) >= needed),
+                       key=lambda r: r.get('kapasitas', 30))
+        return [r['nama'] for r in rooms
+                if not index.overlapping('ruangan', r['nama'], day, start, end, ignore)]
+
+    def _suggestion_candidates(self, row, index):
+        """Kandidat perubahan untuk satu baris, dari perubahan terkecil ke terbesar"""
+        start, end = jam_to_minutes(row.get('jam'))
+        is_online = row.get('ruangan') == 'Online'
+        if not is_online:
+            yield 'online', {'ruangan': 'Online'}, None
+        if start is None:
+            return
+        if not is_online:
+            for room in self._best_fit_rooms(row, row['hari'], start, end, index, (row,))[:3]:
+                if room != row.get('ruangan'):
+                    yield 'room', {'ruangan': room}, None
+        
+        # Slot dengan durasi dan mode yang sama, hari sekarang dulu lalu hari lain
+        duration = end - start
+        slots = []
+        for slot in self.time_slots:
+            slot_online = "(online)" in slot[0].lower()
+            s_start, s_end = jam_to_minutes(f"{slot[0]} - {slot[1]}")
+            if slot_online == is_online and s_end - s_start == duration and s_start != start:
+                slots.append((abs(s_start - start), s_start, s_end, f"{slot[0]} - {slot[1]}"))
+        slots.sort()
+        available_days = self.lecturer_preferences.get(row['dosen'], {}).get('available_days') or self.days
+        days = [row['hari']] + [d for d in available_days if d != row['hari']]
+        for day in days:
+            for _, s_start, s_end, jam in ([(0, start, end, row['jam'])] if day != row['hari'] else []) + slots:
+                changes = {'hari': day, 'jam': jam}
+                if not is_online:
+                    rooms = self._best_fit_rooms(row, day, s_start, s_end, index, (row,))
+                    if not rooms:
+                        continue
+                    changes['ruangan'] = row['ruangan'] if row.get('ruangan') in rooms else rooms[0]
+                yield 'move', changes, None
         
-        if conflict['conflict_type'] == 'Dosen ganda':
+        # Tukar hari/jam dengan jadwal lain milik dosen atau kelas yang sama
+        seen = set()
+        for kind in ('dosen', 'kelas'):
             for day in self.days:
-                if day == conflict['hari']:
+                for _, _, other in index.rows.get((kind, row[kind], day), []):
+                    if other is row or other.get('is_fixed') or id(other) in seen:
+                        continue
+                    seen.add(id(other))
+                    if other.get('jam') == row.get('jam') and day == row['hari']:
+                        continue
+                    o_start, o_end = jam_to_minutes(other.get('jam'))
+                    if o_start is not None and o_end - o_start == duration:
+                        yield 'swap', {'hari': other['hari'], 'jam': other['jam']}, other
+
+    def find_free_slots(self, lecturer, kelas, sks, student_count=0, ignore=None, limit=None):
+        """Semua opsi (hari, jam, ruangan) di mana dosen, kelas dan ruangan berkapasitas cukup
+        sama-sama kosong untuk blok sepanjang SKS, dari indeks okupansi"""
+        duration = int(sks) * 50
+        if duration <= 0:
+            return []
+        index = self.occupancy_index()
+        ignore = (ignore,) if ignore is not None else ()
+        mask = self.lecturer_mask(lecturer)
+        rooms = sorted((r for r in self.available_rooms if r.get('kapasitas', 30) >= student_count),
+                       key=lambda r: r.get('kapasitas', 30))
+        starts = sorted({jam_to_minutes(f"{slot[0]} - {slot[1]}")[0] for slot in self.time_slots
+                         if "(online)" not in slot[0].lower()})
+        
+        options = []
+        for day in self.days:
+            if (mask['available_days'] and day not in mask['available_days']) or day in mask['online_days']:
+                continue
+            blocked = self.lecturer_blocked_bits(mask, day, False)
+            for start in starts:
+                end = start + duration
+                if end > 21 * 60 or blocked & minute_bits(start, end):
                     continue
-                    
-                new_schedule = conflict['schedule1'].copy()
-                new_schedule['hari'] = day
-                
-                if not self.is_conflict(new_schedule):
-                    if self.edit_schedule(conflict['schedule1'], new_schedule):
-                        resolved += 1
-                        break
-                        
-        for conflict in conflict['online_day']:
-            new_schedule = conflict['schedule'].copy()
-            new_schedule['ruangan'] = 'Online'
-            if not self.is_conflict(new_schedule):
-                if self.edit_schedule(conflict['schedule'], new_schedule):
-                    resolved += 1
-                        
-        return resolved
+                if not self.preferred_time_ok(mask, False, start, end):
+                    continue
+                if not (index.is_free('dosen', lecturer, day, start, end, ignore)
+                        and index.is_free('kelas', kelas, day, start, end, ignore)):
+                    continue
+                jam = f"{start // 60:02d}:{start % 60:02d} - {end // 60:02d}:{end % 60:02d}"
+                for room in rooms:
+                    if index.is_free('ruangan', room['nama'], day, start, end, ignore):
+                        options.append({'hari': day, 'jam': jam, 'ruangan': room['nama'],
+                                        'kapasitas': room.get('kapasitas', 30)})
+                        if limit and len(options) >= limit:
+                            return options
+        return options
 
-    def add_manual_schedule(self, schedule):
-        schedule['source'] = 'manual'
-        schedule['is_fixed'] = schedule.get('is_fixed', False)  # Tambahkan atribut is_fixed
-        self.fixed_schedules.append(schedule)
+    def describe_suggestion(self, suggestion):
+        row = suggestion['row']
+        label = f"{row['mata_kuliah']} ({row['kelas']})"
+        changes = suggestion['changes']
+        if suggestion['action'] == 'online':
+            text = f"Ubah {label} menjadi Online"
+        elif suggestion['action'] == 'room':
+            text = f"Pindahkan {label} ke ruangan {changes['ruangan']}"
+        elif suggestion['action'] == 'swap':
+            other = suggestion['swap_with']
+            text = f"Tukar {label} dengan {other['mata_kuliah']} ({other['kelas']}) {other['hari']} {other['jam']}"
+        else:
+            target = dict(row, **changes)
+            text = f"Pindahkan {label} ke {target['hari']} {target['jam']}"
+            if target.get('ruangan') != 'Online':
+                text += f" di {target.get('ruangan')}"
+        return f"{text} (konflik {suggestion['delta']:+d})"
+
+    def suggest_conflict_resolutions(self, conflict, limit=5):
+        """Saran perbaikan berperingkat untuk satu konflik; hanya membaca data, tidak mengubah jadwal.
+        
+        Setiap saran berisi aksi (move/online/room/swap), perubahan, delta jumlah
+        pelanggaran pada baris yang diubah dan sisa pelanggarannya (remaining). Pencarian dibatasi jumlah kandidat dan waktu.
+        """
+        index = self.occupancy_index()
+        deadline = perf_counter() + self.suggestion_budget
+        cost = {'online': 1, 'room': 2, 'move': 3, 'swap': 4}
+        suggestions = []
         
-        if schedule['dosen'] not in self.lecturers:
-            self.lecturers.append(schedule['dosen'])
-        if schedule['mata_kuliah'] not in self.subjects:
-            self.subjects.append(schedule['mata_kuliah'])
-        if schedule['kelas'] not in self.classes:
-            self.classes.append(schedule['kelas'])
-            
-        return True
+        for row in self.conflict_rows(conflict):
+            if row.get('is_fixed'):
+                continue
+            evaluated = 0
+            before_row = self.row_violations(row, index)
+            for action, changes, other in self._suggestion_candidates(row, index):
+                if evaluated >= self.suggestion_breadth or perf_counter() > deadline:
+                    break
+                evaluated += 1
+                moved = dict(row, **changes)
+                if other is None:
+                    before = before_row
+                    after = self.row_violations(moved, index, ignore=(row,))
+                else:
+                    other_moved = dict(other, hari=row['hari'], jam=row['jam'])
+                    if other.get('ruangan') != 'Online' and row.get('ruangan') != 'Online':
+                        # Ruangan ikut bertukar agar tidak memindahkan bentrok ruangan
+                        moved['ruangan'], other_moved['ruangan'] = other.get('ruangan'), row.get('ruangan')
+                    before = before_row + self.row_violations(other, index)
+                    after = (self.row_violations(moved, index, ignore=(row, other), extra=(other_moved,))
+                             + self.row_violations(other_moved, index, ignore=(row, other), extra=(moved,)))
+                delta = after - before
+                if delta < 0:
+                    suggestions.append({
+                        'action': action,
+                        'row': row,
+                        'changes': {k: moved[k] for k in ('hari', 'jam', 'ruangan') if moved.get(k) != row.get(k)},
+                        'swap_with': other,
+                        'delta': delta,
+                        'remaining': after,
+                        'cost': cost[action]
+                    })
+        
+        # Yang menyisakan pelanggaran paling sedikit lebih dulu, lalu perubahan termurah
+        suggestions.sort(key=lambda s: (s['remaining'], s['delta'], s['cost']))
+        suggestions = suggestions[:limit]
+        for suggestion in suggestions:
+            suggestion['description'] = self.describe_suggestion(suggestion)
+        return suggestions
 
-    def remove_schedule(self, schedule):
-        if schedule in self.fixed_schedules:
-            self.fixed_schedules.remove(schedule)
+    def cached_suggestions(self, conflict):
+        """Saran konflik dengan cache yang dibuang saat data jadwal berubah"""
+        if self._suggestion_revision != self.revision:
+            self._suggestion_cache = {}
+            self._suggestion_revision = self.revision
+        key = (conflict['conflict_type'],) + tuple(row.get('row_id') or id(row) for row in self.conflict_rows(conflict))
+        if key not in self._suggestion_cache:
+            self._suggestion_cache[key] = self.suggest_conflict_resolutions(conflict)
+        return self._suggestion_cache[key]
+
+    def add_manual_schedule(self, schedule):
+        with self.mutation_lock:
+            schedule['source'] = 'manual'
+            schedule['is_fixed'] = schedule.get('is_fixed', False)  # Tambahkan atribut is_fixed
+            self.assign_row_id(schedule)
+            self.fixed_schedules.append(schedule)
+        
+            if schedule['dosen'] not in self.lecturers:
+                self.lecturers.append(schedule['dosen'])
+            if schedule['mata_kuliah'] not in self.subjects:
+                self.subjects.append(schedule['mata_kuliah'])
+            if schedule['kelas'] not in self.classes:
+                self.classes.append(schedule['kelas'])
+            
+            self.record_change('add', schedule=schedule)
+            self.metrics.inc('mutations_total', op='add')
             return True
-        elif schedule in self.generated_schedules:
-            self.generated_schedules.remove(schedule)
+
+    def remove_schedule(self, schedule, record=True):
+        with self.mutation_lock:
+            if schedule in self.fixed_schedules:
+                self.fixed_schedules.remove(schedule)
+            elif schedule in self.generated_schedules:
+                self.generated_schedules.remove(schedule)
+            else:
+                return False
+            if record:
+                self.record_change('remove', row_id=schedule.get('row_id'))
+                self.metrics.inc('mutations_total', op='remove')
             return True
-        return False
 
     def edit_schedule(self, old_schedule, new_schedule):
-        if self.remove_schedule(old_schedule):
-            # Jadwal dari Excel diubah menjadi manual setelah diedit
-            new_schedule['source'] = 'manual'
-            if old_schedule.get('source') == 'excel':
-                new_schedule['excel_index'] = old_schedule['excel_index']
+        with self.mutation_lock:
+            if self.remove_schedule(old_schedule, record=False):
+                # Jadwal dari Excel diubah menjadi manual setelah diedit
+                new_schedule['source'] = 'manual'
+                if old_schedule.get('source') == 'excel':
+                    new_schedule['excel_index'] = old_schedule['excel_index']
+                new_schedule['row_id'] = old_schedule.get('row_id')
+                self.assign_row_id(new_schedule)
             
-            self.fixed_schedules.append(new_schedule)
-            return True
-        return False
+                self.fixed_schedules.append(new_schedule)
+                self.record_change('edit', row_id=old_schedule.get('row_id'), schedule=new_schedule)
+                self.metrics.inc('mutations_total', op='edit')
+                return True
+            return False
+
+    def set_fixed(self, schedule, is_fixed):
+        with self.mutation_lock:
+            schedule['is_fixed'] = is_fixed
+            self.record_change('update', rows=[self.row_state(schedule)])
 
     def auto_resolve_conflicts(self):
         resolved = 0
         conflicts = self.find_all_conflicts()
+        total = len(conflicts['lecturer']) + len(conflicts['online_day'])
         
-        for conflict in conflicts['lecturer']:
+        for index, conflict in enumerate(conflicts['lecturer']):
+            self.job_tick(index, total, "Menyelesaikan konflik")
             for day in self.days:
                 if day == conflict['hari']:
                     continue
@@ -897,7 +2809,8 @@ class ScheduleGenerator:
                         resolved += 1
                         break
                         
-        for conflict in conflicts['online_day']:
+        for index, conflict in enumerate(conflicts['online_day'], len(conflicts['lecturer'])):
+            self.job_tick(index, total, "Menyelesaikan konflik")
             new_schedule = conflict['schedule'].copy()
             new_schedule['ruangan'] = 'Online'
             if not self.is_conflict(new_schedule):
@@ -908,9 +2821,172 @@ class ScheduleGenerator:
 
     def add_lecturer_break(self, lecturer, day, start_time, end_time):
         key = f"{lecturer}|{day}"
-        self.lecturer_breaks[key].append(f"{start_time} - {end_time}")
+        value = f"{start_time} - {end_time}"
+        self.lecturer_breaks[key].append(value)
+        self.compile_lecturer_masks(lecturer)
+        self.record_change('break', key=key, value=value)
+
+    def analyze_feasibility(self, rows):
+        """Batas kapasitas sebelum pengacakan, linear terhadap jumlah baris.
+
+        Baris di 'infeasible' pasti gagal: tidak ada kombinasi hari, slot, mode online/offline
+        dan ruangan yang lolos preferensi, istirahat, kapasitas ruangan dan jadwal yang sudah
+        terisi (jadwal tersebut tidak dipindah oleh randomize_schedule). 'lecturers', 'classes'
+        dan 'rooms' berisi beban yang melebihi kapasitas; minimal satu barisnya akan gagal,
+        tetapi tidak bisa dipastikan yang mana sehingga tidak dilewati.
+        """
+        start_clock = perf_counter()
+        pending = {id(row) for row in rows}
+        committed = [s for s in self.fixed_schedules + self.generated_schedules
+                     if id(s) not in pending and s.get('hari') and s.get('jam')]
+        index = OccupancyIndex(committed)
+        allocator = self.room_allocator()
+        max_capacity = max((room.get('kapasitas', 30) for room in self.available_rooms), default=0)
+        
+        slots = defaultdict(list)
+        for slot in self.time_slots:
+            start, end = jam_to_minutes(f"{slot[0]} - {slot[1]}")
+            if start is not None and end > start and (end - start) % 50 == 0:
+                slots[((end - start) // 50, "(online)" in slot[0].lower())].append((start, end))
+        
+        def modes_for(day, mask):
+            if day in mask['online_days']:
+                return (True,)
+            return tuple(mode for mode, possible in ((False, self.online_ratio < 1), (True, self.online_ratio > 0))
+                         if possible)
+        
+        def lecturer_capacity(lecturer):
+            """Menit per minggu yang bisa dipakai dosen menurut preferensi dan istirahat"""
+            mask = self.lecturer_mask(lecturer)
+            total = 0
+            for day in self.days:
+                if mask['available_days'] and day not in mask['available_days']:
+                    continue
+                covered = 0
+                for is_online in modes_for(day, mask):
+                    blocked = self.lecturer_blocked_bits(mask, day, is_online)
+                    for (_, slot_online), ranges in slots.items():
+                        if slot_online != is_online:
+                            continue
+                        for start, end in ranges:
+                            bits = minute_bits(start, end)
+                            if not bits & blocked and self.preferred_time_ok(mask, is_online, start, end):
+                                covered |= bits
+                total += bin(covered).count('1')
+            return total
+        
+        infeasible = []
+        offline_only = []
+        for row in rows:
+            sks = row.get('sks') or 0
+            count = row.get('jumlah_mahasiswa', 0) or 0
+            mask = self.lecturer_mask(row['dosen'])
+            days = [day for day in self.days if not mask['available_days'] or day in mask['available_days']]
+            if days and all(modes_for(day, mask) == (False,) for day in days):
+                offline_only.append(row)
+            # Tahap terjauh yang masih lolos menentukan alasan kegagalan
+            stage = 0
+            found = False
+            for day in days:
+                for is_online in modes_for(day, mask):
+                    blocked = self.lecturer_blocked_bits(mask, day, is_online)
+                    for start, end in slots.get((sks, is_online), ()):
+                        stage = max(stage, 1)
+                        bits = minute_bits(start, end)
+                        if bits & blocked or not self.preferred_time_ok(mask, is_online, start, end):
+                            continue
+                        stage = max(stage, 2)
+                        if not is_online and count > max_capacity:
+                            continue
+                        stage = max(stage, 3)
+                        if (index.masks.get(('dosen', row['dosen'], day), 0) & bits
+                                or index.masks.get(('kelas', row['kelas'], day), 0) & bits):
+                            continue
+                        if not is_online and all(index.masks.get(('ruangan', name, day), 0) & bits
+                                                 for _, name in allocator.candidates(count)):
+                            continue
+                        found = True
+                        break
+                    if found:
+                        break
+                if found:
+                    break
+            if not found:
+                reasons = [
+                    "Tidak ada hari yang tersedia (dari preferensi dosen)",
+                    f"Tidak ada slot waktu untuk {sks} SKS",
+                    f"Preferensi waktu dan waktu istirahat dosen tidak menyisakan slot {sks} SKS",
+                    f"Jumlah mahasiswa ({count}) melebihi kapasitas semua ruangan ({max_capacity}) dan kelas tidak bisa online",
+                    "Semua slot yang mungkin sudah terisi jadwal dosen, kelas atau ruangan yang ada"
+                ]
+                infeasible.append({'schedule': row, 'reasons': [reasons[stage + 1 if days else 0]]})
+        
+        # Beban per dosen dan kelas (termasuk jadwal yang sudah terisi) dibanding kapasitas mingguan
+        demand = {'dosen': defaultdict(int), 'kelas': defaultdict(int)}
+        for schedule in committed + list(rows):
+            for kind in demand:
+                demand[kind][schedule[kind]] += (schedule.get('sks') or 0) * 50
+        lecturers = []
+        for lecturer in {row['dosen'] for row in rows}:
+            capacity = lecturer_capacity(lecturer)
+            if demand['dosen'][lecturer] > capacity:
+                lecturers.append({'dosen': lecturer, 'menit': demand['dosen'][lecturer], 'kapasitas': capacity})
+        cover = {False: 0, True: 0}
+        for (_, is_online), ranges in slots.items():
+            for start, end in ranges:
+                cover[is_online] |= minute_bits(start, end)
+        class_capacity = bin(cover[False] | cover[True]).count('1') * len(self.days)
+        classes = [{'kelas': kelas, 'menit': demand['kelas'][kelas], 'kapasitas': class_capacity}
+                   for kelas in {row['kelas'] for row in rows} if demand['kelas'][kelas] > class_capacity]
+        
+        # Kelompok ruangan berkapasitas >= c: jadwal offline yang sudah ada di ruangan tersebut
+        # ditambah baris yang wajib offline dan hanya muat di ruangan >= c
+        room_week = bin(cover[False]).count('1') * len(self.days)
+        rooms = []
+        previous = 0
+        for capacity in sorted({room.get('kapasitas', 30) for room in self.available_rooms}):
+            pool = [room['nama'] for room in self.available_rooms if room.get('kapasitas', 30) >= capacity]
+            names = set(pool)
+            minutes = sum((s.get('sks') or 0) * 50 for s in committed if s.get('ruangan') in names)
+            minutes += sum((row.get('sks') or 0) * 50 for row in offline_only
+                           if (row.get('jumlah_mahasiswa', 0) or 0) > previous)
+            if minutes > len(pool) * room_week:
+                rooms.append({'kapasitas_min': capacity, 'ruangan': len(pool), 'menit': minutes,
+                              'kapasitas': len(pool) * room_week})
+            previous = capacity
+        
+        report = {
+            'infeasible': infeasible,
+            'lecturers': sorted(lecturers, key=lambda item: item['kapasitas'] - item['menit']),
+            'classes': classes,
+            'rooms': rooms,
+            'too_large': sum(1 for row in rows if (row.get('jumlah_mahasiswa', 0) or 0) > max_capacity),
+            'seconds': perf_counter() - start_clock
+        }
+        self.last_feasibility = report
+        return report
+
+    @staticmethod
+    def format_feasibility(report, limit=5):
+        """Ringkasan teks hasil analyze_feasibility"""
+        lines = []
+        if report['infeasible']:
+            lines.append(f"{len(report['infeasible'])} jadwal pasti gagal dan dilewati")
+        for item in report['lecturers'][:limit]:
+            lines.append(f"Dosen {item['dosen']}: butuh {item['menit']} menit, tersedia {item['kapasitas']} menit")
+        for item in report['classes'][:limit]:
+            lines.append(f"Kelas {item['kelas']}: butuh {item['menit']} menit, tersedia {item['kapasitas']} menit")
+        for item in report['rooms'][:limit]:
+            lines.append(f"Ruangan >= {item['kapasitas_min']} kursi ({item['ruangan']} ruangan): "
+                         f"butuh {item['menit']} menit, tersedia {item['kapasitas']} menit")
+        if report['too_large']:
+            lines.append(f"{report['too_large']} jadwal melebihi kapasitas ruangan terbesar (hanya bisa online)")
+        return lines
 
+    @unrecorded_batch
     def randomize_schedule(self, reshuffle_existing=False):
+        touched = []
+        
         # Reset only schedules that have been scheduled when reshuffling
         if reshuffle_existing:
             for s in self.fixed_schedules + self.generated_schedules:
@@ -922,12 +2998,15 @@ class ScheduleGenerator:
                     s['hari'] = ""
                     s['jam'] = ""
                     s['ruangan'] = ""
+                    touched.append(s)
         
         # Ambil semua jadwal yang belum terjadwal (baik excel maupun manual) dan bukan fixed
         unscheduled = [s for s in self.fixed_schedules + self.generated_schedules 
                       if (not s.get('hari') or not s.get('jam')) and not s.get('is_fixed', False)]
     
         if not unscheduled:
+            if touched:
+                self.record_change('update', rows=[self.row_state(s) for s in touched])
             return 0, 0, []  # Return empty list for failures
         
         success_count = 0
@@ -935,159 +3014,656 @@ class ScheduleGenerator:
         failed_schedules = []  # List of dictionaries with schedule and reasons
         
         unscheduled.sort(key=lambda x: x['sks'], reverse=True)
+        stats = self.solver_stats
+        metrics_start = perf_counter()
+        if stats is not None:
+            solve_start = perf_counter()
+        skipped = {}
+        if self.feasibility_precheck:
+            report = self.analyze_feasibility(unscheduled)
+            skipped = {id(item['schedule']): item['reasons'] for item in report['infeasible']}
+            if stats is not None:
+                stats.timers['precheck'] += report['seconds']
+            if skipped:
+                print(f"Pra-pemeriksaan: {len(skipped)} jadwal pasti gagal dan dilewati")
         
-        for schedule in unscheduled:
-            assigned = False
-            valid_days = self.days.copy()
-            
-            # Apply lecturer preferences for available days
-            lecturer_pref = self.lecturer_preferences.get(schedule['dosen'], {})
-            available_days = lecturer_pref.get('available_days', [])
-            if available_days:
-                valid_days = [day for day in available_days]
-            
-            if not valid_days:
-                failure_count += 1
-                conflict_reasons = ["Tidak ada hari yang tersedia (dari preferensi dosen)"]
-                failed_schedules.append({
-                    'schedule': schedule,
-                    'reasons': conflict_reasons
-                })
-                continue
-                
-            for attempt in range(self.max_attempts):
-                day = random.choice(valid_days)
+        try:
+            for index, schedule in enumerate(unscheduled):
+                self.job_tick(index, len(unscheduled), "Mengacak jadwal")
+                if id(schedule) in skipped:
+                    failure_count += 1
+                    if stats is not None:
+                        stats.reject(schedule.get('row_id') or id(schedule), 'infeasible')
+                        stats.finish_row(schedule, 0, False)
+                    failed_schedules.append({
+                        'schedule': schedule,
+                        'reasons': skipped[id(schedule)]
+                    })
+                    continue
+                assigned = False
+                attempts = 0
+                valid_days = self.days.copy()
                 
-                # Determine if this should be online class based on ratio
-                is_online_class = False
+                # Apply lecturer preferences for available days
                 lecturer_pref = self.lecturer_preferences.get(schedule['dosen'], {})
+                available_days = lecturer_pref.get('available_days', [])
+                if available_days:
+                    valid_days = [day for day in available_days]
                 
-                # Prioritize lecturer preferences
-                if day in lecturer_pref.get('online_days', []):
-                    is_online_class = True
-                else:
-                    # Apply 20% online ratio only if not specified by lecturer
-                    is_online_class = random.random() < self.online_ratio
-                
-                valid_slots = []
-                for slot in self.time_slots:
-                    if not self.is_valid_for_sks(slot, schedule['sks']):
+                if not valid_days:
+                    failure_count += 1
+                    if stats is not None:
+                        stats.reject(schedule.get('row_id') or id(schedule), 'no_day')
+                        stats.finish_row(schedule, 0, False)
+                    conflict_reasons = ["Tidak ada hari yang tersedia (dari preferensi dosen)"]
+                    failed_schedules.append({
+                        'schedule': schedule,
+                        'reasons': conflict_reasons
+                    })
+                    continue
+                    
+                for attempt in range(self.max_attempts):
+                    attempts += 1
+                    day = random.choice(valid_days)
+                    
+                    # Determine if this should be online class based on ratio
+                    is_online_class = False
+                    lecturer_pref = self.lecturer_preferences.get(schedule['dosen'], {})
+                    
+                    # Prioritize lecturer preferences
+                    if day in lecturer_pref.get('online_days', []):
+                        is_online_class = True
+                    else:
+                        # Apply 20% online ratio only if not specified by lecturer
+                        is_online_class = random.random() < self.online_ratio
+                    
+                    if stats is not None:
+                        phase_start = perf_counter()
+                    valid_slots = []
+                    for slot in self.time_slots:
+                        if not self.is_valid_for_sks(slot, schedule['sks']):
+                            continue
+                        
+                        slot_is_online = "(online)" in slot[0].lower() or "(online)" in slot[1].lower()
+                        
+                        # Filter slots based on online/offline requirement
+                        if is_online_class and slot_is_online:
+                            valid_slots.append(slot)
+                        elif not is_online_class and not slot_is_online:
+                            valid_slots.append(slot)
+                    
+                    if stats is not None:
+                        stats.timers['slot_filtering'] += perf_counter() - phase_start
+                    if not valid_slots:
+                        if stats is not None:
+                            stats.reject(schedule.get('row_id') or id(schedule), 'no_slot')
                         continue
                     
-                    slot_is_online = "(online)" in slot[0].lower() or "(online)" in slot[1].lower()
+                    time_slot = random.choice(valid_slots)
+                    schedule['hari'] = day
+                    schedule['jam'] = f"{time_slot[0]} - {time_slot[1]}"
                     
-                    # Filter slots based on online/offline requirement
-                    if is_online_class and slot_is_online:
-                        valid_slots.append(slot)
-                    elif not is_online_class and not slot_is_online:
-                        valid_slots.append(slot)
-                
-                if not valid_slots:
-                    continue
-                
-                time_slot = random.choice(valid_slots)
-                schedule['hari'] = day
-                schedule['jam'] = f"{time_slot[0]} - {time_slot[1]}"
+                    # Untuk kelas online, tidak perlu cek ruangan fisik
+                    check_room = True
+                    if is_online_class:
+                        room = 'Online'
+                        check_room = False
+                    else:
+                        if stats is not None:
+                            phase_start = perf_counter()
+                        department = schedule['kelas'][:2] if len(schedule['kelas']) >= 2 else 'default'
+                        room = self.get_available_room(
+                            department, 
+                            day, 
+                            time_slot[0], 
+                            time_slot[1],
+                            schedule.get('jumlah_mahasiswa', 0),
+                            ignore=schedule
+                        )
+                        if stats is not None:
+                            stats.timers['room_lookup'] += perf_counter() - phase_start
+                    
+                    if room:
+                        schedule['ruangan'] = room
+                        self.note_room(schedule)
+                        if stats is None:
+                            cause = self.conflict_cause(schedule, check_room_capacity=check_room)
+                        else:
+                            phase_start = perf_counter()
+                            cause = self.conflict_cause(schedule, check_room_capacity=check_room)
+                            stats.timers['conflict_check'] += perf_counter() - phase_start
+                            if cause:
+                                stats.reject(schedule.get('row_id') or id(schedule), cause)
+                        if not cause:
+                            success_count += 1
+                            assigned = True
+                            break
+                    else:
+                        # Jika tidak ada ruangan, coba lagi
+                        if stats is not None:
+                            stats.reject(schedule.get('row_id') or id(schedule), 'no_room')
+                        continue
                 
-                # Untuk kelas online, tidak perlu cek ruangan fisik
-                check_room = True
-                if is_online_class:
-                    room = 'Online'
-                    check_room = False
-                else:
-                    department = schedule['kelas'][:2] if len(schedule['kelas']) >= 2 else 'default'
+                if stats is not None:
+                    stats.finish_row(schedule, attempts, assigned)
+                if not assigned:
+                    # Dapatkan alasan konflik
+                    conflict_reasons = self.get_conflict_reasons(schedule)
+                    failed_schedules.append({
+                        'schedule': schedule,
+                        'reasons': conflict_reasons
+                    })
+                    schedule['hari'] = ""
+                    schedule['jam'] = ""
+                    schedule['ruangan'] = ""
+                    failure_count += 1
+        finally:
+            if stats is not None:
+                stats.seconds += perf_counter() - solve_start
+            self.metrics.inc('mutations_total', op='randomize')
+            self.metrics.set('solve_seconds', perf_counter() - metrics_start)
+            self.metrics.inc('solve_rows_total', success_count, result='scheduled')
+            self.metrics.inc('solve_rows_total', failure_count, result='failed')
+            attempted = success_count + failure_count
+            self.metrics.set('solve_failure_ratio', failure_count / attempted if attempted else 0.0)
+            # Satu entri journal untuk seluruh batch pengacakan (juga jika dibatalkan)
+            touched_ids = {id(s) for s in touched}
+            touched.extend(s for s in unscheduled if id(s) not in touched_ids)
+            self.record_change('update', rows=[self.row_state(s) for s in touched])
+        
+        return success_count, failure_count, failed_schedules
+
+    def validate_preferences(self):
+        conflicts = []
+        
+        for lecturer, prefs in self.lecturer_preferences.items():
+            available = prefs.get('available_days', [])
+            online = prefs.get('online_days', [])
+            
+            for day in online:
+                if day not in available:
+                    conflicts.append(
+                        f"{lecturer}: Hari {day} didefinisikan sebagai online tetapi tidak tersedia"
+                    )
+            
+            for start, end in prefs.get('preferred_times_offline', []):
+                if not self.is_valid_time_range(start, end):
+                    conflicts.append(
+                        f"{lecturer}: Waktu offline preferensi tidak valid ({start} - {end})"
+                    )
+            
+            for start, end in prefs.get('preferred_times_online', []):
+                if not self.is_valid_time_range(start, end):
+                    conflicts.append(
+                        f"{lecturer}: Waktu online preferensi tidak valid ({start} - {end})"
+                    )
+        
+        return conflicts
+
+    def store_ready(self):
+        """True jika SQLite store aktif dan isinya sama dengan data di memori"""
+        return self.store is not None and not self._unrecorded_batches
+
+    def resolve_row_ids(self, row_ids):
+        """Petakan row_id hasil query store ke baris jadwal di memori, urut seperti di memori.
+
+        Hasilnya bisa langsung diteruskan ke edit_schedule, remove_schedule atau set_fixed.
+        """
+        for attempt in range(2):
+            if attempt or self._row_positions_revision != self.revision:
+                all_schedules = self.fixed_schedules + self.generated_schedules
+                self._row_positions = {s.get('row_id'): (index, s) for index, s in enumerate(all_schedules)}
+                self._row_positions_revision = self.revision
+            found = [self._row_positions[row_id] for row_id in row_ids if row_id in self._row_positions]
+            # Ada row_id yang tidak ditemukan: daftar diganti tanpa revisi baru, bangun ulang sekali
+            if len(found) == len(row_ids):
+                break
+        found.sort(key=lambda item: item[0])
+        return [s for _, s in found]
+
+    def _store_overlaps(self, column, schedule, start_minute, end_minute, ignore=None):
+        # Kandidat bentrok dari indeks store; pemanggil tetap memeriksa ulang dengan aturan yang sama
+        row_ids = self.store.find_overlaps(column, schedule.get(column), schedule.get('hari', ''),
+                                           start_minute, end_minute, ids_only=True)
+        return [s for s in self.resolve_row_ids(row_ids) if s is not ignore]
+
+    def get_lecturer_schedule(self, lecturer_name):
+        if self.store_ready():
+            return self.resolve_row_ids(self.store.query_schedules(dosen=lecturer_name, ids_only=True))
+        return [s for s in self.fixed_schedules + self.generated_schedules 
+                if s['dosen'] == lecturer_name]
+
+    def query_schedules(self, dosen=None, kelas=None, ruangan=None, hari=None):
+        if self.store_ready():
+            return self.resolve_row_ids(self.store.query_schedules(dosen=dosen, kelas=kelas, ruangan=ruangan,
+                                                                   hari=hari, ids_only=True))
+        filters = (('dosen', dosen), ('kelas', kelas), ('ruangan', ruangan), ('hari', hari))
+        return [s for s in self.fixed_schedules + self.generated_schedules
+                if all(value is None or s.get(key) == value for key, value in filters)]
+    
+    @unrecorded_batch
+    def randomize_all_rooms(self):
+        """Alokasikan ulang ruangan semua jadwal offline secara best-fit; mengembalikan
+        jumlah yang berubah dan utilisasi kursi sebelum/sesudah"""
+        all_schedules = self.fixed_schedules + self.generated_schedules
+        before = self.seat_utilization()
+        
+        pending = []
+        for sched in all_schedules:
+            if sched.get('ruangan') == 'Online' or not sched.get('hari') or not sched.get('jam'):
+                continue
+            if len(sched['jam'].split(' - ')) != 2:
+                continue
+            pending.append((sched, sched.get('ruangan', '')))
+        # Urut per hari dan jam mulai (kelas terbesar dulu pada jam yang sama): seperti pewarnaan
+        # interval, ruangan yang dilepas kelas sebelumnya bisa langsung dipakai kelas berikutnya
+        pending.sort(key=lambda item: (item[0]['hari'], jam_to_minutes(item[0]['jam'])[0] or 0,
+                                       -(item[0].get('jumlah_mahasiswa', 0) or 0)))
+        
+        completed = False
+        try:
+            # Putaran pertama melepas semua ruangan lama agar kelas besar bisa memilih dari semua
+            # ruangan. Jika ada kelas yang jadi tidak kebagian, ruangan lama dikembalikan dan
+            # putaran kedua mengalokasikan ulang satu per satu tanpa melepas ruangan lain.
+            for release in (True, False):
+                if release:
+                    for sched, _ in pending:
+                        sched['ruangan'] = ''
+                unassigned = 0
+                for index, (sched, old_room) in enumerate(pending):
+                    self.job_tick(index, len(pending), "Mengacak ruangan")
+                    start, end = sched['jam'].split(' - ')
+                    department = sched['kelas'][:2] if isinstance(sched['kelas'], str) and len(sched['kelas']) >= 2 else 'default'
                     room = self.get_available_room(
                         department, 
-                        day, 
-                        time_slot[0], 
-                        time_slot[1],
-                        schedule.get('jumlah_mahasiswa', 0)
+                        sched['hari'], 
+                        start, 
+                        end,
+                        sched.get('jumlah_mahasiswa', 0),
+                        ignore=sched
                     )
-                
-                if room:
-                    schedule['ruangan'] = room
-                    if not self.is_conflict(schedule, check_room_capacity=check_room):
-                        success_count += 1
-                        assigned = True
-                        break
+                    if room:
+                        sched['ruangan'] = room
+                        self.note_room(sched)
+                    elif release and old_room:
+                        unassigned += 1
+                if not release or not unassigned:
+                    break
+                for sched, old_room in pending:
+                    sched['ruangan'] = old_room
+                    self.note_room(sched)
+            completed = True
+        finally:
+            if not completed:
+                # Dibatalkan di tengah jalan: kembalikan semua ruangan lama
+                for sched, old_room in pending:
+                    sched['ruangan'] = old_room
+                    self.note_room(sched)
+            changed = [sched for sched, old_room in pending if sched.get('ruangan') != old_room]
+            if changed:
+                self.record_change('update', rows=[self.row_state(s) for s in changed])
+        after = self.seat_utilization()
+        self.metrics.set('seat_utilization', after['overall'])
+        return {'changed': len(changed), 'before': before, 'after': after}
+
+
+class ScheduleSnapshot:
+    """Salinan baca-saja jadwal beserta indeks per dosen/kelas/ruangan; tidak diubah setelah dibuat"""
+
+    def __init__(self, generator):
+        # Revisi dibaca sebelum menyalin: perubahan di tengah penyalinan memicu snapshot baru
+        self.revision = generator.revision
+        self.generator = generator.clone()
+        self.created = monotonic()
+        self.rows = self.generator.fixed_schedules + self.generator.generated_schedules
+        self.by_key = {'dosen': defaultdict(list), 'kelas': defaultdict(list), 'ruangan': defaultdict(list)}
+        for row in self.rows:
+            for kind, rows in self.by_key.items():
+                rows[row.get(kind)].append(row)
+        self.index = self.generator.occupancy_index()
+
+    def query(self, kind, key, day=None):
+        rows = self.by_key[kind].get(key, [])
+        if day:
+            rows = [row for row in rows if row.get('hari') == day]
+        return rows
+
+
+class ScheduleQueryService:
+    """Layanan query HTTP/JSON lokal di atas ScheduleGenerator.
+
+    Pembacaan dilayani dari ScheduleSnapshot yang dibangun ulang saat revisi
+    berubah dan tidak ada job yang memegang mutation_lock; selama job berjalan
+    pembaca tetap mendapat snapshot terakhir yang konsisten. Penulisan wajib
+    membawa token dan ditolak (409) selama job berjalan.
+    """
+
+    def __init__(self, generator, host="127.0.0.1", port=8765, token=None):
+        self.generator = generator
+        self.host = host
+        self.port = port
+        self.token = token if token is not None else os.environ.get('SCHEDULE_API_TOKEN')
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.revision == self.generator.revision:
+            return snapshot
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.revision == self.generator.revision:
+                return snapshot
+            # Job yang sedang berjalan mengubah baris di tempat; pakai snapshot lama sampai selesai
+            if not self.generator.mutation_lock.acquire(blocking=snapshot is None):
+                return snapshot
+            try:
+                self._snapshot = ScheduleSnapshot(self.generator)
+            finally:
+                self.generator.mutation_lock.release()
+            return self._snapshot
+
+    def handle_get(self, path, params):
+        """Kembalikan (status, body) untuk permintaan baca"""
+        snapshot = self.snapshot()
+        day = params.get('hari')
+        if path == '/health':
+            return 200, {'revision': snapshot.revision, 'rows': len(snapshot.rows),
+                         'snapshot_age': round(monotonic() - snapshot.created, 3)}
+        if path == '/metrics':
+            return 200, self.generator.update_metrics().to_prometheus()
+        if path == '/lecturers':
+            return 200, {'lecturers': snapshot.generator.lecturers}
+        if path == '/rooms':
+            return 200, {'rooms': snapshot.generator.available_rooms}
+        if path in ('/lecturer', '/class', '/room'):
+            kind = {'/lecturer': 'dosen', '/class': 'kelas', '/room': 'ruangan'}[path]
+            name = params.get('name')
+            if not name:
+                return 400, {'error': "Parameter 'name' wajib diisi"}
+            body = {'name': name, 'hari': day, 'schedules': snapshot.query(kind, name, day)}
+            if kind == 'ruangan' and day and params.get('at'):
+                start, end = jam_to_minutes(f"{params['at']} - {params.get('until', params['at'])}")
+                if start is None:
+                    return 400, {'error': "Format 'at'/'until' harus HH:MM"}
+                end = max(end, start + 1)
+                busy = snapshot.index.overlapping('ruangan', name, day, start, end)
+                body['free'] = not busy
+                body['busy_with'] = busy
+            return 200, body
+        if path == '/free-slots':
+            try:
+                options = snapshot.generator.find_free_slots(
+                    params.get('lecturer', ''), params.get('kelas', ''), int(params.get('sks', 0)),
+                    int(params.get('students', 0)), limit=int(params.get('limit', 200)))
+            except ValueError:
+                return 400, {'error': "sks, students dan limit harus berupa angka"}
+            if day:
+                options = [option for option in options if option['hari'] == day]
+            return 200, {'options': options}
+        return 404, {'error': f"Endpoint tidak dikenal: {path}"}
+
+    def handle_post(self, path, body, token):
+        """Penulisan lewat method generator (tercatat di journal), dijaga token dan mutation_lock"""
+        if not self.token or token != self.token:
+            return 403, {'error': "Token tidak valid atau penulisan tidak diaktifkan"}
+        if not self.generator.mutation_lock.acquire(blocking=False):
+            return 409, {'error': "Sedang ada proses yang mengubah jadwal, coba lagi nanti"}
+        try:
+            rows = {row.get('row_id'): row for row in self.generator.fixed_schedules + self.generator.generated_schedules}
+            if path == '/schedules/add':
+                schedule = dict(body.get('schedule') or {})
+                if not all(schedule.get(key) for key in ('dosen', 'mata_kuliah', 'kelas')):
+                    return 400, {'error': "dosen, mata_kuliah dan kelas wajib diisi"}
+                schedule.pop('row_id', None)
+                schedule.setdefault('hari', '')
+                schedule.setdefault('jam', '')
+                self.generator.add_manual_schedule(schedule)
+                return 200, {'schedule': schedule}
+            row = rows.get(body.get('row_id'))
+            if row is None:
+                return 404, {'error': f"row_id {body.get('row_id')} tidak ditemukan"}
+            if path == '/schedules/edit':
+                new_schedule = dict(row, **(body.get('changes') or {}))
+                if not body.get('force') and self.generator.is_conflict(new_schedule, ignore=row):
+                    return 409, {'error': "Perubahan menimbulkan konflik",
+                                 'reasons': self.generator.get_conflict_reasons(new_schedule)}
+                self.generator.edit_schedule(row, new_schedule)
+                return 200, {'schedule': new_schedule}
+            if path == '/schedules/delete':
+                self.generator.remove_schedule(row)
+                return 200, {'deleted': body.get('row_id')}
+            return 404, {'error': f"Endpoint tidak dikenal: {path}"}
+        finally:
+            self.generator.mutation_lock.release()
+
+    def start(self, background=True):
+        from http.server import ThreadingHTTPServer
+
+        class QueryServer(ThreadingHTTPServer):
+            # Antrean listen bawaan (5) membuat klien paralel kena retry SYN
+            request_queue_size = 128
+            daemon_threads = True
+
+        self.server = QueryServer((self.host, self.port), make_query_handler(self))
+        self.port = self.server.server_address[1]
+        print(f"Layanan query berjalan di http://{self.host}:{self.port}")
+        if not background:
+            self.server.serve_forever()
+            return None
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def make_query_handler(service):
+    # http.server diimpor saat layanan dijalankan saja agar startup GUI tetap cepat
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import urlparse, parse_qs
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            if isinstance(body, str):
+                data, content_type = body.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+            else:
+                data, content_type = json.dumps(body, default=_json_default).encode('utf-8'), 'application/json; charset=utf-8'
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                self.send_json(*service.handle_get(url.path.rstrip('/') or '/', params))
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self.send_json(400, {'error': "Body harus berupa JSON"})
+                return
+            try:
+                self.send_json(*service.handle_post(urlparse(self.path).path.rstrip('/'), body,
+                                                    self.headers.get('X-Api-Token')))
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+
+class VirtualTreeview(ttk.Frame):
+    """Treeview virtual: hanya baris yang terlihat (plus buffer kecil) yang dibuat item-nya.
+
+    Data disimpan sebagai list record; scroll menggeser jendela record yang
+    ditampilkan, dan setiap render hanya memperbarui item yang nilainya
+    berubah sehingga ribuan baris tetap ringan.
+    """
+    def __init__(self, parent, columns, row_values, row_tags=None, on_select=None, height=15, buffer=10):
+        super().__init__(parent)
+        self.row_values = row_values
+        self.row_tags = row_tags or (lambda record: ())
+        self.on_select = on_select
+        self.buffer = buffer
+        self.records = []
+        self.top = 0
+        self.visible_rows = height
+        self.selected = None
+        self._items = []
+        self._item_state = {}
+        self._item_index = {}
+        self._rendering = False
+        self._expected_selection = ()
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in columns], show='headings',
+                                 height=height, selectmode='browse')
+        for col, width in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor='center')
+
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hsb.set)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        hsb.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(int(-1 * (e.delta / 120)) * 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))  # Untuk Linux
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows) or "break")
+
+    def set_records(self, records):
+        self.records = records
+        if self.selected is not None and not any(r is self.selected for r in records):
+            self.selected = None
+        self._clamp_top()
+        self.render()
+
+    def refresh(self):
+        """Render ulang setelah record berubah; hanya item yang berbeda yang disentuh"""
+        self.render()
+
+    def scroll(self, rows):
+        old_top = self.top
+        self.top += rows
+        self._clamp_top()
+        if self.top != old_top:
+            self.render()
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self.top = int(float(value) * len(self.records))
+            self._clamp_top()
+            self.render()
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll(int(value) * step)
+
+    def _clamp_top(self):
+        self.top = max(0, min(self.top, len(self.records) - self.visible_rows))
+
+    def _on_configure(self, event):
+        try:
+            row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        except (ValueError, tk.TclError):
+            row_height = 20
+        # Kurangi satu baris untuk heading
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible_rows:
+            self.visible_rows = visible
+            self._clamp_top()
+            self.render()
+
+    def render(self):
+        self._rendering = True
+        try:
+            window = self.records[self.top:self.top + self.visible_rows + self.buffer]
+            for slot, record in enumerate(window):
+                state = (tuple(self.row_values(record)), tuple(self.row_tags(record)))
+                if slot < len(self._items):
+                    item = self._items[slot]
+                    if self._item_state[item] != state:
+                        self.tree.item(item, values=state[0], tags=state[1])
                 else:
-                    # Jika tidak ada ruangan, coba lagi
-                    continue
-            
-            if not assigned:
-                # Dapatkan alasan konflik
-                conflict_reasons = self.get_conflict_reasons(schedule)
-                failed_schedules.append({
-                    'schedule': schedule,
-                    'reasons': conflict_reasons
-                })
-                schedule['hari'] = ""
-                schedule['jam'] = ""
-                schedule['ruangan'] = ""
-                failure_count += 1
-        
-        return success_count, failure_count, failed_schedules
+                    item = self.tree.insert('', 'end', values=state[0], tags=state[1])
+                    self._items.append(item)
+                self._item_state[item] = state
+                self._item_index[item] = self.top + slot
 
-    def validate_preferences(self):
-        conflicts = []
-        
-        for lecturer, prefs in self.lecturer_preferences.items():
-            available = prefs.get('available_days', [])
-            online = prefs.get('online_days', [])
-            
-            for day in online:
-                if day not in available:
-                    conflicts.append(
-                        f"{lecturer}: Hari {day} didefinisikan sebagai online tetapi tidak tersedia"
-                    )
-            
-            for start, end in prefs.get('preferred_times_offline', []):
-                if not self.is_valid_time_range(start, end):
-                    conflicts.append(
-                        f"{lecturer}: Waktu offline preferensi tidak valid ({start} - {end})"
-                    )
-            
-            for start, end in prefs.get('preferred_times_online', []):
-                if not self.is_valid_time_range(start, end):
-                    conflicts.append(
-                        f"{lecturer}: Waktu online preferensi tidak valid ({start} - {end})"
-                    )
-        
-        return conflicts
+            extra = self._items[len(window):]
+            if extra:
+                self.tree.delete(*extra)
+                for item in extra:
+                    self._item_state.pop(item, None)
+                    self._item_index.pop(item, None)
+                del self._items[len(window):]
 
-    def get_lecturer_schedule(self, lecturer_name):
-        return [s for s in self.fixed_schedules + self.generated_schedules 
-                if s['dosen'] == lecturer_name]
-    
-    def randomize_all_rooms(self):
-        all_schedules = self.fixed_schedules + self.generated_schedules
-        all_schedules.sort(key=lambda x: x.get('jumlah_mahasiswa', 0), reverse=True)
-    
-        for sched in all_schedules:
-            if sched.get('ruangan') == 'Online':
-                continue
-            
-            if not sched.get('hari') or not sched.get('jam'):
-                continue
-            
-            jam_parts = sched['jam'].split(' - ')
-            if len(jam_parts) != 2:
-                continue
-            
-            start, end = jam_parts
-            student_count = sched.get('jumlah_mahasiswa', 0)
-            department = sched['kelas'][:2] if isinstance(sched['kelas'], str) and len(sched['kelas']) >= 2 else 'default'
-        
-            room = self.get_available_room(
-                department, 
-                sched['hari'], 
-                start, 
-                end,
-                student_count
-            )
-        
-            if room:
-                sched['ruangan'] = room
+            selected_item = None
+            for slot, record in enumerate(window):
+                if record is self.selected:
+                    selected_item = self._items[slot]
+                    break
+            # <<TreeviewSelect>> dari perubahan seleksi ini datang belakangan dan diabaikan
+            current = self.tree.selection()
+            self._expected_selection = (selected_item,) if selected_item else ()
+            if selected_item and current != (selected_item,):
+                self.tree.selection_set(selected_item)
+            elif not selected_item and current:
+                self.tree.selection_remove(*current)
+
+            self.tree.yview_moveto(0)
+            total = len(self.records)
+            if total:
+                self.vsb.set(self.top / total, min(1.0, (self.top + self.visible_rows) / total))
+            else:
+                self.vsb.set(0, 1)
+        finally:
+            self._rendering = False
+
+    def record_for_item(self, item):
+        index = self._item_index.get(item)
+        if index is None or index >= len(self.records):
+            return None
+        return self.records[index]
+
+    def record_at(self, y):
+        return self.record_for_item(self.tree.identify_row(y))
+
+    def select_record(self, record):
+        self.selected = record
+        self.render()
+
+    def _on_tree_select(self, event):
+        selection = self.tree.selection()
+        if self._rendering or selection == self._expected_selection:
+            return
+        self._expected_selection = selection
+        self.selected = self.record_for_item(selection[0]) if selection else None
+        if self.on_select:
+            self.on_select(self.selected)
 
 
 class ManualInputDialog(tk.Toplevel):
@@ -1147,6 +3723,16 @@ class ManualInputDialog(tk.Toplevel):
                   text="Simpan Perubahan" if schedule else "Tambah", 
                   command=self.save_schedule).grid(row=11, column=0, columnspan=2, pady=10)
         
+        # Slot kosong untuk dosen/kelas/kapasitas yang sedang diisi
+        self.hint_var = tk.StringVar(value="Isi dosen, kelas dan SKS untuk melihat slot kosong")
+        ttk.Label(self, textvariable=self.hint_var, style="Status.TLabel").grid(
+            row=12, column=0, columnspan=2, sticky='w', padx=5)
+        self.slot_list = tk.Listbox(self, height=8, width=50)
+        self.slot_list.grid(row=13, column=0, columnspan=2, sticky='ew', padx=5, pady=(0, 10))
+        self.slot_list.bind("<Double-Button-1>", self.use_free_slot)
+        self.free_slots = []
+        self._hint_job = None
+        
         self.update_dropdowns()
         
         # Pasang trace untuk jam_mulai_var dan sks_var
@@ -1177,6 +3763,54 @@ class ManualInputDialog(tk.Toplevel):
         # Hitung jam selesai awal
         self.calculate_end_time()
         
+        for var_name in ('dosen_var', 'kelas_var', 'sks_var', 'mahasiswa_var'):
+            self.vars[var_name].trace_add("write", self.schedule_free_slot_hints)
+        self.schedule_free_slot_hints()
+        
+    def schedule_free_slot_hints(self, *args):
+        # Debounce: hitung ulang hanya setelah pengetikan berhenti sejenak
+        if self._hint_job:
+            self.after_cancel(self._hint_job)
+        self._hint_job = self.after(300, self.refresh_free_slot_hints)
+        
+    def refresh_free_slot_hints(self):
+        self._hint_job = None
+        self.slot_list.delete(0, tk.END)
+        self.free_slots = []
+        dosen = self.vars['dosen_var'].get().strip()
+        kelas = self.vars['kelas_var'].get().strip()
+        try:
+            sks = int(self.vars['sks_var'].get() or 0)
+            mahasiswa = int(self.vars['mahasiswa_var'].get() or 0)
+        except ValueError:
+            self.hint_var.set("SKS dan jumlah mahasiswa harus berupa angka")
+            return
+        if not dosen or not kelas or sks <= 0:
+            self.hint_var.set("Isi dosen, kelas dan SKS untuk melihat slot kosong")
+            return
+        if self.generator.mutation_lock.acquire(blocking=False):
+            try:
+                self.free_slots = self.generator.find_free_slots(dosen, kelas, sks, mahasiswa,
+                                                                 ignore=self.schedule, limit=200)
+            finally:
+                self.generator.mutation_lock.release()
+        else:
+            self.hint_var.set("Data sedang diproses, slot kosong belum bisa dihitung")
+            return
+        for option in self.free_slots:
+            self.slot_list.insert(tk.END, f"{option['hari']}  {option['jam']}  {option['ruangan']} (kap. {option['kapasitas']})")
+        self.hint_var.set(f"{len(self.free_slots)} slot kosong (klik dua kali untuk memakai)"
+                          if self.free_slots else "Tidak ada slot kosong yang cocok")
+        
+    def use_free_slot(self, event=None):
+        selection = self.slot_list.curselection()
+        if not selection:
+            return
+        option = self.free_slots[selection[0]]
+        self.vars['hari_var'].set(option['hari'])
+        self.vars['jam_mulai_var'].set(option['jam'].split(' - ')[0])
+        self.vars['ruangan_var'].set(option['ruangan'])
+        
     def calculate_end_time(self, *args):
         start_str = self.vars['jam_mulai_var'].get().strip()
         sks_str = self.vars['sks_var'].get().strip()
@@ -1479,6 +4113,95 @@ class LecturerPreferenceDialog(tk.Toplevel):
             messagebox.showerror("Error", f"极gagal menyimpan preferensi: {str(e)}")
 
 
+class JobRunner:
+    """Menjalankan operasi berat di thread worker; hasil dikirim balik ke thread Tk lewat root.after"""
+    POLL_MS = 100
+    PROGRESS_INTERVAL = 0.05
+
+    def __init__(self, root, generator, on_progress=None, on_state=None):
+        self.root = root
+        self.generator = generator
+        self.on_progress = on_progress
+        self.on_state = on_state
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.message = None
+        self._last_progress = 0.0
+
+    def is_busy(self):
+        return self.thread is not None
+
+    def start(self, message, func, *args, on_done=None, on_error=None, **kwargs):
+        if self.is_busy():
+            return False
+        self.message = message
+        self.cancel_event.clear()
+        self.thread = threading.Thread(target=self._run, args=(func, args, kwargs), daemon=True)
+        if self.on_state:
+            self.on_state(True, message)
+        self.thread.start()
+        self.root.after(self.POLL_MS, self._poll, on_done, on_error)
+        return True
+
+    def cancel(self):
+        if self.is_busy():
+            self.cancel_event.set()
+
+    def _report(self, done, total, message=None):
+        # Dibatasi agar antrean tidak banjir oleh ribuan tick per detik
+        now = monotonic()
+        if now - self._last_progress < self.PROGRESS_INTERVAL and done + 1 < total:
+            return
+        self._last_progress = now
+        self.events.put(('progress', (done + 1, total, message or self.message)))
+
+    def _run(self, func, args, kwargs):
+        # Generator dikunci selama job berjalan sehingga mutasi lain harus menunggu
+        with self.generator.mutation_lock:
+            self.generator.cancel_event = self.cancel_event
+            self.generator.progress_callback = self._report
+            try:
+                result = func(*args, **kwargs)
+                self.events.put(('done', result))
+            except JobCancelled:
+                self.events.put(('cancelled', None))
+            except Exception as e:
+                traceback.print_exc()
+                self.events.put(('error', e))
+            finally:
+                self.generator.cancel_event = None
+                self.generator.progress_callback = None
+
+    def _poll(self, on_done, on_error):
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                if self.on_progress:
+                    self.on_progress(*value)
+                continue
+            self.thread.join()
+            self.thread = None
+            if self.on_state:
+                self.on_state(False, kind)
+            if kind == 'done':
+                if on_done:
+                    on_done(value)
+            elif kind == 'error':
+                if on_error:
+                    on_error(value)
+                else:
+                    messagebox.showerror("Error", f"{self.message} gagal: {value}")
+            return
+        self.root.after(self.POLL_MS, self._poll, on_done, on_error)
+
+
+ALL_LECTURERS = "(Semua Dosen)"
+
+
 class ScheduleApp:
     def __init__(self, root):
         self.root = root
@@ -1486,19 +4209,20 @@ class ScheduleApp:
         self.root.geometry("1200x800")
         self.root.minsize(1000, 700)  # Set minimum window size
         self.generator = ScheduleGenerator()
+        self.state_writer = DebouncedStateWriter(self.generator.ui_state_file)
+        self.jobs = JobRunner(root, self.generator, on_progress=self.on_job_progress,
+                              on_state=self.on_job_state)
+        self.initializing = True
+        self.query_service = None
+        self.startup_timings = {}
+        if not os.environ.get('SCHEDULE_DB'):
+            self.generator.enable_journal()
         
         # Load style
         self.setup_styles()
         
-        if not self.generator.load_cache():
-            try:
-                if os.path.exists("data/rooms.json"):
-                    self.generator.load_rooms("data/rooms.json")
-            except:
-                pass
-        
-        self.setup_auto_save()
-        atexit.register(self.generator.save_cache)
+        self.root.after(300000, self.setup_auto_save)
+        atexit.register(self.generator.close_storage)
         
         self.sort_order_hari = 'asc'
         self.current_filter_hari = None
@@ -1506,6 +4230,76 @@ class ScheduleApp:
         self.selected_schedule = None
         self.create_widgets()
         self.load_ui_state()
+        
+        # Jendela tampil dulu, cache dimuat di background
+        self.root.after_idle(self.record_first_paint)
+        self.start_background_init()
+
+    def record_first_paint(self):
+        self.startup_timings['first_paint'] = perf_counter() - _PROCESS_START
+        print(f"[startup] first paint: {self.startup_timings['first_paint']:.3f} detik")
+
+    def start_background_init(self):
+        self.status_var.set("Memuat data dari cache...")
+        # Diset thread init setelah indeks (dosen, ruangan, preferensi) termuat, sebelum section jadwal
+        self.index_loaded = threading.Event()
+        self.index_shown = False
+        thread = self.init_thread = threading.Thread(target=self.background_init, daemon=True)
+        thread.start()
+        self.poll_background_init(thread)
+
+    def background_init(self):
+        # Hanya menyentuh generator, tidak boleh memanggil widget Tk dari thread ini
+        try:
+            # Backend SQLite opsional, aktif jika SCHEDULE_DB menunjuk ke file database
+            if os.environ.get('SCHEDULE_DB'):
+                self.generator.enable_sqlite(os.environ['SCHEDULE_DB'])
+                self.cache_loaded = self.generator.load_cache()
+                self.index_loaded.set()
+            else:
+                self.cache_loaded = self.generator.load_cache(lazy=True)
+                self.index_loaded.set()
+                self.generator.load_deferred_sections()
+        except Exception as e:
+            self.cache_loaded = False
+            self.generator.last_cache_error = f"Gagal memuat data: {e}"
+
+    def poll_background_init(self, thread):
+        if self.index_loaded.is_set() and not self.index_shown:
+            # Daftar dosen sudah bisa dipilih selagi section jadwal masih dimuat
+            self.index_shown = True
+            self.startup_timings['index_loaded'] = perf_counter() - _PROCESS_START
+            print(f"[startup] index loaded: {self.startup_timings['index_loaded']:.3f} detik")
+            self.refresh_lecturer_dropdown()
+            if not self.lecturer_var.get() and self.generator.lecturers:
+                self.lecturer_var.set(self.generator.lecturers[0])
+            self.status_var.set("Memuat jadwal dari cache...")
+        if thread.is_alive():
+            self.root.after(50, self.poll_background_init, thread)
+            return
+        self.initializing = False
+        self.startup_timings['cache_loaded'] = perf_counter() - _PROCESS_START
+        print(f"[startup] cache loaded: {self.startup_timings['cache_loaded']:.3f} detik")
+        
+        if not self.cache_loaded and os.path.exists("data/rooms.json"):
+            try:
+                self.generator.load_rooms("data/rooms.json")
+            except:
+                pass
+        
+        self.refresh_lecturer_dropdown()
+        if not self.lecturer_var.get() and self.generator.lecturers:
+            self.lecturer_var.set(self.generator.lecturers[0])
+        self.show_lecturer_schedule()
+        # Layanan query lokal opsional untuk departemen lain
+        if os.environ.get('SCHEDULE_API_PORT'):
+            try:
+                self.query_service = ScheduleQueryService(self.generator, port=int(os.environ['SCHEDULE_API_PORT']))
+                self.query_service.start()
+            except Exception as e:
+                print(f"Error starting query service: {e}")
+        if self.generator.last_cache_error:
+            messagebox.showwarning("Cache", self.generator.last_cache_error)
 
     def setup_styles(self):
         """Configure visual styles for consistent UI"""
@@ -1522,7 +4316,14 @@ class ScheduleApp:
         style.configure("Action.TButton", padding=5, font=("Arial", 9))
 
     def setup_auto_save(self):
-        self.generator.save_cache()
+        # Perubahan sudah tercatat di journal; di sini hanya pemadatan di background
+        if not self.initializing and not self.jobs.is_busy():
+            self.generator.compact_journal_async()
+        if os.environ.get('SCHEDULE_METRICS_FILE'):
+            try:
+                self.generator.update_metrics().write_prometheus(os.environ['SCHEDULE_METRICS_FILE'])
+            except Exception as e:
+                print(f"Error writing metrics: {e}")
         self.root.after(300000, self.setup_auto_save)
 
     def save_ui_state(self):
@@ -1533,7 +4334,8 @@ class ScheduleApp:
             'mode_filter': self.mode_var.get(),
             'sort_order': self.sort_order_hari
         }
-        self.generator.save_ui_state(state)
+        # Ditulis di background setelah perubahan berhenti sejenak
+        self.state_writer.update(state)
 
     def load_ui_state(self):
         state = self.generator.load_ui_state()
@@ -1611,6 +4413,10 @@ class ScheduleApp:
                   style="Action.TButton").pack(fill=tk.X, pady=2)
         ttk.Button(data_frame, text="💾 Simpan Semua Jadwal", command=self.save_schedule_all,
                   style="Action.TButton").pack(fill=tk.X, pady=2)
+        ttk.Button(data_frame, text="📦 Ekspor Massal", command=self.bulk_export,
+                  style="Action.TButton").pack(fill=tk.X, pady=2)
+        ttk.Button(data_frame, text="📄 Ekspor CSV/JSONL/Parquet", command=self.export_records,
+                  style="Action.TButton").pack(fill=tk.X, pady=2)
         
         # Filter Section
         filter_frame = ttk.LabelFrame(left_frame, text="Filter Jadwal", padding=5)
@@ -1709,26 +4515,18 @@ class ScheduleApp:
             ('Ruangan', 80), ('Jam', 120), ('SKS', 40), ('Semester', 70), ('Mahasiswa', 70)
         ]
         
-        self.schedule_tree = ttk.Treeview(tree_container, columns=[c[0] for c in columns], show='headings', height=15)
-        
-        for col, width in columns:
-            self.schedule_tree.heading(col, text=col)
-            self.schedule_tree.column(col, width=width, anchor='center')
-        
-        # Scrollbars
-        vsb = ttk.Scrollbar(tree_container, orient="vertical", command=self.schedule_tree.yview)
-        hsb = ttk.Scrollbar(tree_container, orient="horizontal", command=self.schedule_tree.xview)
-        self.schedule_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        
-        # Layout
+        self.schedule_tree = VirtualTreeview(
+            tree_container, columns,
+            row_values=self.schedule_row_values,
+            row_tags=lambda s: ("fixed",) if s.get('is_fixed', False) else (),
+            on_select=self.on_schedule_select
+        )
         self.schedule_tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
-        hsb.grid(row=1, column=0, sticky="ew")
+        # Konfigurasi tag untuk jadwal tetap
+        self.schedule_tree.tree.tag_configure("fixed", background="#e0f7fa")
         
         tree_container.grid_rowconfigure(0, weight=1)
         tree_container.grid_columnconfigure(0, weight=1)
-        
-        self.schedule_tree.bind('<<TreeviewSelect>>', self.on_schedule_select)
 
         # Action buttons for selected schedule
         action_btn_frame = ttk.Frame(data_display_frame)
@@ -1756,8 +4554,10 @@ class ScheduleApp:
         
         self.status_var = tk.StringVar()
         self.status_var.set("Siap | Pilih dosen untuk melihat jadwal")
+        self.cancel_btn = ttk.Button(status_frame, text="Batal", command=self.jobs.cancel)
+        self.progress = ttk.Progressbar(status_frame, mode='determinate', length=200)
         ttk.Label(status_frame, textvariable=self.status_var, style="Status.TLabel",
-                 anchor=tk.W).pack(fill=tk.X)
+                 anchor=tk.W).pack(side=tk.LEFT, fill=tk.X, expand=True)
         
         # Context menu
         self.context_menu = tk.Menu(self.root, tearoff=0)
@@ -1765,22 +4565,55 @@ class ScheduleApp:
         self.context_menu.add_command(label="🗑️ Hapus Jadwal", command=self.delete_selected_schedule)
         self.context_menu.add_separator()
         self.context_menu.add_command(label="📌 Tandai sebagai Tetap", command=self.toggle_fixed_schedule)
-        self.schedule_tree.bind("<Button-3>", self.show_context_menu)
+        self.schedule_tree.tree.bind("<Button-3>", self.show_context_menu)
         
         if self.generator.lecturers:
-            self.lecturer_dropdown['values'] = self.generator.lecturers
+            self.refresh_lecturer_dropdown()
             if not self.lecturer_var.get() and self.generator.lecturers:
                 self.lecturer_var.set(self.generator.lecturers[0])
                 self.show_lecturer_schedule()
 
+    def on_job_state(self, running, detail):
+        if running:
+            self.progress['value'] = 0
+            self.progress.pack(side=tk.LEFT, padx=5)
+            self.cancel_btn.pack(side=tk.LEFT)
+            self.status_var.set(f"{detail}...")
+        else:
+            self.progress.pack_forget()
+            self.cancel_btn.pack_forget()
+            if detail == 'cancelled':
+                self.status_var.set(f"{self.jobs.message} dibatalkan")
+                self.show_lecturer_schedule()
+
+    def on_job_progress(self, done, total, message):
+        self.progress['maximum'] = max(total, 1)
+        self.progress['value'] = done
+        self.status_var.set(f"{message}... {done}/{total}")
+
+    def ensure_idle(self):
+        """Cegah perubahan data selama cache dimuat atau job background berjalan"""
+        if self.initializing:
+            messagebox.showwarning("Peringatan", "Tunggu hingga data selesai dimuat dari cache.")
+            return False
+        if self.jobs.is_busy():
+            messagebox.showwarning("Peringatan", f"Tunggu hingga proses '{self.jobs.message}' selesai atau dibatalkan.")
+            return False
+        return True
+
     def save_current_lecturer_schedule(self):
+        if not self.ensure_idle():
+            return
         lecturer = self.lecturer_var.get()
         if not lecturer:
             messagebox.showwarning("Peringatan", "Pilih dosen terlebih dahulu!")
             return
             
         all_schedules = self.generator.fixed_schedules + self.generator.generated_schedules
-        lecturer_schedules = [s for s in all_schedules if s['dosen'] == lecturer]
+        if lecturer == ALL_LECTURERS:
+            lecturer_schedules = all_schedules
+        else:
+            lecturer_schedules = [s for s in all_schedules if s['dosen'] == lecturer]
         
         if not lecturer_schedules:
             messagebox.showinfo("Info", f"Tidak ada jadwal untuk dosen {lecturer}")
@@ -1794,36 +4627,25 @@ class ScheduleApp:
             
             if template_path:
                 # Create safe filename
-                safe_lecturer_name = re.sub(r'[^a-zA-Z0-9]', '_', lecturer)
+                safe_lecturer_name = safe_filename(lecturer)
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 output_filename = f"Jadwal_{safe_lecturer_name}_{timestamp}.xlsx"
-                output_path = os.path.join(folder, output_filename)
                 
-                try:
-                    wb = load_workbook(template_path)
-                    sheet = wb.active
-                    
-                    headers = ["Hari", "Mata Kuliah", "Kelas", "Ruangan", "Jam", "SKS", "Semester", "Dosen", "Jumlah Mahasiswa"]
-                    for col, header in enumerate(headers, start=1):
-                        sheet.cell(row=3, column=col, value=header)
-                    
-                    for row_idx, sched in enumerate(lecturer_schedules, start=4):
-                        sheet.cell(row=row_idx, column=1, value=sched['hari'])
-                        sheet.cell(row=row_idx, column=2, value=sched['mata_kuliah'])
-                        sheet.cell(row=row_idx, column=3, value=sched['kelas'])
-                        sheet.cell(row=row_idx, column=4, value=sched.get('ruangan', ''))
-                        sheet.cell(row=row_idx, column=5, value=sched['jam'])
-                        sheet.cell(row=row_idx, column=6, value=sched['sks'])
-                        sheet.cell(row=row_idx, column=7, value=sched['semester'])
-                        sheet.cell(row=row_idx, column=8, value=sched['dosen'])
-                        sheet.cell(row=row_idx, column=9, value=sched.get('jumlah_mahasiswa', ''))
-                        
-                    wb.save(output_path)
+                def done(output_path):
+                    self.show_export_stats()
                     messagebox.showinfo("Sukses", f"Jadwal untuk dosen {lecturer} berhasil disimpan di:\n{output_path}")
                     # Open the output folder
-                    os.startfile(folder)
-                except Exception as e:
-                    messagebox.showerror("Error", f"Gagal menyimpan: {str(e)}")   
+                    open_folder(folder)
+                
+                self.jobs.start("Menyimpan jadwal dosen", self.generator.export_to_excel,
+                                lecturer_schedules, template_path, folder, output_filename, on_done=done,
+                                on_error=lambda e: messagebox.showerror("Error", f"Gagal menyimpan: {str(e)}"))
+
+    def show_export_stats(self):
+        stats = self.generator.last_export_stats
+        if stats:
+            self.status_var.set(f"Export {stats['rows']} baris dalam {stats['seconds']:.2f} detik "
+                                f"({stats['rows_per_sec']:.0f} baris/detik)")
 
     def load_data_wrapper(self):
         """Wrapper untuk memilih tipe data yang akan dimuat"""
@@ -1834,45 +4656,92 @@ class ScheduleApp:
 
     def toggle_fixed_schedule(self):
         """Toggle status jadwal tetap"""
-        if self.selected_schedule:
-            self.selected_schedule['is_fixed'] = not self.selected_schedule.get('is_fixed', False)
+        if self.selected_schedule and self.ensure_idle():
+            self.generator.set_fixed(self.selected_schedule, not self.selected_schedule.get('is_fixed', False))
             status = "DITETAPKAN" if self.selected_schedule['is_fixed'] else "TIDAK TETAP"
             self.status_var.set(f"Status jadwal diubah: {status}")
             self.show_lecturer_schedule()
 
     def show_context_menu(self, event):
-        item = self.schedule_tree.identify_row(event.y)
-        if item:
-            self.schedule_tree.selection_set(item)
-            self.on_schedule_select(None)  # Untuk memilih jadwal
+        record = self.schedule_tree.record_at(event.y)
+        if record:
+            self.schedule_tree.select_record(record)
+            self.on_schedule_select(record)  # Untuk memilih jadwal
             self.context_menu.post(event.x_root, event.y_root)
 
     def load_excel_data(self):
-        path = filedialog.askopenfilename(title="Pilih File Excel", filetypes=[("Excel Files", "*.xlsx")])
-        if path and self.generator.load_data(path):
-            self.lecturer_dropdown["values"] = self.generator.lecturers
-            if self.generator.lecturers:
-                self.lecturer_var.set(self.generator.lecturers[0])
-                self.show_lecturer_schedule()
-            self.status_var.set("Data jadwal berhasil dimuat dari Excel")
-            self.save_ui_state()
+        if not self.ensure_idle():
+            return
+        paths = filedialog.askopenfilenames(title="Pilih File Excel", filetypes=[("Excel Files", "*.xlsx")])
+        if not paths:
+            return
+        if len(paths) == 1:
+            if not self.generator.load_data(paths[0]):
+                return
+            status = "Data jadwal berhasil dimuat dari Excel"
+        else:
+            summary = self.generator.load_data_multi(paths)
+            if summary['errors']:
+                messagebox.showwarning("Peringatan", "Sebagian file gagal dimuat:\n" + "\n".join(summary['errors']))
+            if not summary['rows']:
+                return
+            status = (f"{summary['rows']} jadwal dari {summary['sources'] - len(summary['errors'])} file dimuat "
+                      f"({summary['lecturers']} dosen, {summary['classes']} kelas, "
+                      f"{summary['merged_names']} nama digabung) dalam {summary['seconds']:.2f} detik")
+        self.refresh_lecturer_dropdown()
+        if self.generator.lecturers:
+            self.lecturer_var.set(self.generator.lecturers[0])
+            self.show_lecturer_schedule()
+        self.status_var.set(status)
+        self.save_ui_state()
 
     def load_room_data(self):
+        if not self.ensure_idle():
+            return
         path = filedialog.askopenfilename(title="Pilih File Ruangan (JSON)", filetypes=[("JSON Files", "*.json")])
         if path and self.generator.load_rooms(path):
             self.status_var.set("Data ruangan berhasil dimuat")
             self.save_ui_state()
 
+    def schedule_row_values(self, s):
+        # Tentukan sumber jadwal
+        source = "Excel" if s.get('source') == 'excel' else "Manual"
+        return (
+            source,
+            s['hari'],
+            s['dosen'],
+            s['mata_kuliah'],
+            s['kelas'],
+            s.get('ruangan', ''),
+            s['jam'],
+            s['sks'],
+            s['semester'],
+            s.get('jumlah_mahasiswa', '')
+        )
+
+    def refresh_lecturer_dropdown(self):
+        self.lecturer_dropdown['values'] = [ALL_LECTURERS] + list(self.generator.lecturers)
+
     def show_lecturer_schedule(self, event=None):
         lecturer = self.lecturer_var.get()
-        self.schedule_tree.delete(*self.schedule_tree.get_children())
         
         if not lecturer:
+            self.schedule_tree.set_records([])
             self.status_var.set("Pilih dosen terlebih dahulu")
             return
             
-        all_schedules = self.generator.fixed_schedules + self.generator.generated_schedules
-        filtered_schedules = [s for s in all_schedules if s['dosen'] == lecturer]
+        if self.initializing or self.generator.sections_pending():
+            self.status_var.set("Memuat jadwal dari cache...")
+            return
+            
+        if self.jobs.is_busy():
+            # Tabel diperbarui setelah job selesai
+            return
+            
+        if lecturer == ALL_LECTURERS:
+            filtered_schedules = self.generator.fixed_schedules + self.generator.generated_schedules
+        else:
+            filtered_schedules = self.generator.get_lecturer_schedule(lecturer)
         
         hari_filter = self.hari_var.get()
         if hari_filter and hari_filter != 'Semua':
@@ -1887,33 +4756,11 @@ class ScheduleApp:
         elif mode_filter == 'Offline':
             filtered_schedules = [s for s in filtered_schedules if s.get('ruangan') != 'Online']
         
-        if self.sort_order_hari == 'asc':
-            filtered_schedules.sort(key=lambda x: x['hari'])
-        else:
-            filtered_schedules.sort(key=lambda x: x['hari'], reverse=True)
-        
-        for s in filtered_schedules:
-            # Tentukan sumber jadwal
-            source = "Excel" if s.get('source') == 'excel' else "Manual"
-            
-            # Tandai jadwal tetap dengan ikon khusus
-            tags = ("fixed",) if s.get('is_fixed', False) else ()
-            
-            self.schedule_tree.insert('', 'end', values=(
-                source,
-                s['hari'],
-                s['dosen'],
-                s['mata_kuliah'],
-                s['kelas'],
-                s.get('ruangan', ''),
-                s['jam'],
-                s['sks'],
-                s['semester'],
-                s.get('jumlah_mahasiswa', '')
-            ), tags=tags)
+        filtered_schedules = sorted(filtered_schedules, key=lambda x: x['hari'],
+                                    reverse=self.sort_order_hari != 'asc')
         
-        # Konfigurasi tag untuk jadwal tetap
-        self.schedule_tree.tag_configure("fixed", background="#e0f7fa")
+        # Hanya baris yang terlihat yang dibuat item Treeview-nya
+        self.schedule_tree.set_records(filtered_schedules)
         
         status_text = f"Menampilkan {len(filtered_schedules)} jadwal untuk {lecturer}"
         if any(s.get('is_fixed', False) for s in filtered_schedules):
@@ -1988,12 +4835,21 @@ class ScheduleApp:
         self.save_ui_state()
 
     def generate_rooms(self):
-        self.generator.randomize_all_rooms()
-        self.show_lecturer_schedule()
-        self.status_var.set("Ruangan berhasil diacak ulang untuk semua jadwal!")
-        self.save_ui_state()
+        if not self.ensure_idle():
+            return
+            
+        def done(result):
+            self.show_lecturer_schedule()
+            self.status_var.set(
+                f"Ruangan berhasil diacak ulang: {result['changed']} jadwal pindah, utilisasi kursi "
+                f"{result['before']['overall']:.1%} -> {result['after']['overall']:.1%}")
+            self.save_ui_state()
+            
+        self.jobs.start("Mengacak ruangan", self.generator.randomize_all_rooms, on_done=done)
 
     def save_schedule_all(self):
+        if not self.ensure_idle():
+            return
         all_sched = self.generator.fixed_schedules + self.generator.generated_schedules
         folder = filedialog.askdirectory(title="Pilih Folder Output")
         if folder:
@@ -2002,14 +4858,103 @@ class ScheduleApp:
                 template_path = filedialog.askopenfilename(title="Pilih Template Excel", filetypes=[("Excel Files", "*.xlsx")])
             
             if template_path:
-                out = self.generator.save_to_excel(all_sched, template_path, folder)
-                if out:
+                def done(out):
+                    self.show_export_stats()
                     messagebox.showinfo("Sukses", f"Jadwal disimpan di:\n{out}")
-                    os.startfile(folder)
+                    open_folder(folder)
                     self.save_ui_state()
+                
+                self.jobs.start("Menyimpan semua jadwal", self.generator.export_to_excel,
+                                all_sched, template_path, folder, on_done=done,
+                                on_error=lambda e: messagebox.showerror("Error", f"Gagal menyimpan: {str(e)}"))
+
+    def bulk_export(self):
+        if not self.ensure_idle():
+            return
+        if not (self.generator.fixed_schedules or self.generator.generated_schedules):
+            messagebox.showwarning("Peringatan", "Belum ada jadwal untuk diekspor!")
+            return
+            
+        folder = filedialog.askdirectory(title="Pilih Folder Output")
+        if folder:
+            template_path = "templates/schedule_template.xlsx"
+            if not os.path.exists(template_path):
+                template_path = filedialog.askopenfilename(title="Pilih Template Excel", filetypes=[("Excel Files", "*.xlsx")])
+            
+            if template_path:
+                self.jobs.start("Ekspor massal", self.generator.bulk_export, template_path, folder,
+                                on_done=lambda summary: self.show_bulk_summary(summary, folder),
+                                on_error=lambda e: messagebox.showerror("Error", f"Gagal ekspor massal: {str(e)}"))
+
+    def show_bulk_summary(self, summary, folder):
+        message = (f"File dosen: {summary['files']['Dosen']}\n"
+                   f"File kelas: {summary['files']['Kelas']}\n"
+                   f"File ruangan: {summary['files']['Ruangan']}\n"
+                   f"Total baris: {summary['rows']}\n"
+                   f"Waktu: {summary['seconds']:.2f} detik")
+        if summary['errors']:
+            message += f"\n\n{len(summary['errors'])} file gagal:\n" + "\n".join(summary['errors'][:10])
+            messagebox.showwarning("Ekspor Massal", message)
+        else:
+            messagebox.showinfo("Ekspor Massal", message)
+        self.status_var.set(f"Ekspor massal selesai dalam {summary['seconds']:.2f} detik")
+        open_folder(folder)
+
+    def export_records(self):
+        if not self.ensure_idle():
+            return
+        all_sched = self.generator.fixed_schedules + self.generator.generated_schedules
+        path = filedialog.asksaveasfilename(
+            title="Simpan Data Jadwal",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet")]
+        )
+        if path:
+            self.jobs.start("Mengekspor data", self.generator.export_records, all_sched, path,
+                            on_done=lambda result: self.show_export_stats(),
+                            on_error=lambda e: messagebox.showerror("Error", f"Gagal mengekspor: {str(e)}"))
 
     def show_conflicts(self):
-        conflicts = self.generator.find_all_conflicts()
+        if not self.ensure_idle():
+            return
+        # Pencarian konflik di background, jendela dibangun setelah hasilnya tersedia
+        self.jobs.start("Memeriksa konflik", self.generator.find_all_conflicts, on_done=self.build_conflict_window)
+
+    CONFLICT_PAGE_SIZE = 200
+
+    def conflict_row_values(self, c_type, conflict):
+        if c_type in ('lecturer', 'room', 'class'):
+            entity = {'lecturer': 'dosen', 'room': 'ruangan', 'class': 'kelas'}[c_type]
+            return (
+                conflict['conflict_type'],
+                conflict[entity],
+                conflict['hari'],
+                conflict['waktu'],
+                f"{conflict['schedule1']['mata_kuliah']} ({conflict['schedule1']['kelas']})",
+                f"{conflict['schedule2']['mata_kuliah']} ({conflict['schedule2']['kelas']})"
+            )
+        schedule = conflict['schedule']
+        if c_type == 'capacity':
+            return (
+                conflict['conflict_type'],
+                f"{conflict['ruangan']} (Kap: {conflict['kapasitas']})",
+                schedule['hari'],
+                schedule['jam'],
+                f"{schedule['mata_kuliah']} ({schedule['kelas']})",
+                f"Mahasiswa: {conflict['mahasiswa']}"
+            )
+        detail2 = {'break_time': "Waktu istirahat",
+                   'online_day': f"Ruangan: {conflict.get('ruangan', '')}"}.get(c_type, "")
+        return (
+            conflict['conflict_type'],
+            conflict['dosen'],
+            conflict['hari'],
+            conflict['waktu'],
+            f"{schedule['mata_kuliah']} ({schedule['kelas']})",
+            detail2
+        )
+
+    def build_conflict_window(self, conflicts):
         conflict_window = tk.Toplevel(self.root)
         conflict_window.title("Konflik Jadwal")
         conflict_window.geometry("1000x600")
@@ -2024,147 +4969,98 @@ class ScheduleApp:
             'Preferensi': ['break_time', 'online_day', 'preference']
         }
         
+        # Isi tab baru dibuat saat tab pertama kali dibuka
+        tabs = {}
         for title, types in conflict_types.items():
             frame = ttk.Frame(notebook)
-            notebook.add(frame, text=title)
-            
-            tree = ttk.Treeview(frame, 
-                               columns=('Tipe', 'Entitas', 'Hari', 'Waktu', 'Detail1', 'Detail2', 'Solusi'), 
-                               show='headings',
-                               height=15)
-            
-            scroll = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
-            scroll.pack(side=tk.RIGHT, fill=tk.Y)
-            tree.configure(yscrollcommand=scroll.set)
-            tree.pack(fill=tk.BOTH, expand=True)
-            
-            tree.heading('Tipe', text='Tipe')
-            tree.heading('Entitas', text='Entitas')
-            tree.heading('Hari', text='Hari')
-            tree.heading('Waktu', text='Waktu')
-            tree.heading('Detail1', text='Detail 1')
-            tree.heading('Detail2', text='Detail 2')
-            tree.heading('Solusi', text='Solusi')
-            
-            tree.column('Tipe', width=100, anchor='w')
-            tree.column('Entitas', width=100, anchor='w')
-            tree.column('Hari', width=80, anchor='center')
-            tree.column('Waktu', width=100, anchor='center')
-            tree.column('Detail1', width=180, anchor='w')
-            tree.column('Detail2', width=180, anchor='w')
-            tree.column('Solusi', width=200, anchor='w')
-            
-            for c_type in types:
-                for conflict in conflicts.get(c_type, []):
-                    solutions = self.generator.suggest_conflict_resolutions(conflict)
-                    solution_text = solutions[0] if solutions else "Perlu penyesuaian manual"
-                    
-                    if c_type == 'lecturer':
-                        tree.insert('', 'end', values=(
-                            conflict['conflict_type'],
-                            conflict['dosen'],
-                            conflict['hari'],
-                            conflict['waktu'],
-                            f"{conflict['schedule1']['mata_kuliah']} ({conflict['schedule1']['kelas']})",
-                            f"{conflict['schedule2']['mata_kuliah']} ({conflict['schedule2']['kelas']})",
-                            solution_text
-                        ))
-                    elif c_type == 'room':
-                        tree.insert('', 'end', values=(
-                            conflict['conflict_type'],
-                            conflict['ruangan'],
-                            conflict['hari'],
-                            conflict['waktu'],
-                            f"{conflict['schedule1']['mata_kuliah']} ({conflict['schedule1']['kelas']})",
-                            f"{conflict['schedule2']['mata_kuliah']} ({conflict['schedule2']['kelas']})",
-                            solution_text
-                        ))
-                    elif c_type == 'capacity':
-                        tree.insert('', 'end', values=(
-                            conflict['conflict_type'],
-                            f"{conflict['ruangan']} (Kap: {conflict['kapasitas']})",
-                            conflict['schedule']['hari'],
-                            conflict['schedule']['jam'],
-                            f"{conflict['schedule']['mata_kuliah']} ({conflict['schedule']['kelas']})",
-                            f"Mahasiswa: {conflict['mahasiswa']}",
-                            solution_text
-                        ))
-                    elif c_type == 'break_time':
-                        tree.insert('', 'end', values=(
-                            conflict['conflict_type'],
-                            conflict['dosen'],
-                            conflict['hari'],
-                            conflict['waktu'],
-                            f"{conflict['schedule']['mata_kuliah']} ({conflict['schedule']['kelas']})",
-                            "Waktu istirahat",
-                            solution_text
-                        ))
-                    elif c_type == 'online_day':
-                        tree.insert('', 'end', values=(
-                            conflict['conflict_type'],
-                            conflict['dosen'],
-                            conflict['hari'],
-                            conflict['waktu'],
-                            f"{conflict['schedule']['mata_kuliah']} ({conflict['schedule']['kelas']})",
-                            f"Ruangan: {conflict['ruangan']}",
-                            solution_text
-                        ))
-                    elif c_type == 'preference':
-                        tree.insert('', 'end', values=(
-                            conflict['conflict_type'],
-                            conflict['dosen'],
-                            conflict['hari'],
-                            conflict['waktu'],
-                            f"{conflict['schedule']['mata_kuliah']} ({conflict['schedule']['kelas']})",
-                            "",
-                            solution_text
-                        ))
+            rows = [(c_type, conflict) for c_type in types for conflict in conflicts.get(c_type, [])]
+            notebook.add(frame, text=f"{title} ({len(rows)})")
+            tabs[str(frame)] = (frame, rows)
+        
+        def on_tab_changed(event):
+            tab = tabs.pop(notebook.select(), None)
+            if tab:
+                self.build_conflict_tab(*tab)
+                
+        notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
+        on_tab_changed(None)
+
+    def build_conflict_tab(self, frame, rows):
+        columns = ('Tipe', 'Entitas', 'Hari', 'Waktu', 'Detail1', 'Detail2', 'Solusi')
+        page_size = self.CONFLICT_PAGE_SIZE
+        page_count = max(1, (len(rows) + page_size - 1) // page_size)
+        page = [0]
+        
+        nav_frame = ttk.Frame(frame)
+        nav_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 0))
+        page_var = tk.StringVar()
+        
+        tree = ttk.Treeview(frame, columns=columns, show='headings', height=15)
+        
+        scroll = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.configure(yscrollcommand=scroll.set)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        tree.heading('Tipe', text='Tipe')
+        tree.heading('Entitas', text='Entitas')
+        tree.heading('Hari', text='Hari')
+        tree.heading('Waktu', text='Waktu')
+        tree.heading('Detail1', text='Detail 1')
+        tree.heading('Detail2', text='Detail 2')
+        tree.heading('Solusi', text='Solusi')
+        
+        tree.column('Tipe', width=100, anchor='w')
+        tree.column('Entitas', width=100, anchor='w')
+        tree.column('Hari', width=80, anchor='center')
+        tree.column('Waktu', width=100, anchor='center')
+        tree.column('Detail1', width=180, anchor='w')
+        tree.column('Detail2', width=180, anchor='w')
+        tree.column('Solusi', width=200, anchor='w')
+        
+        def show_page(number):
+            page[0] = max(0, min(number, page_count - 1))
+            tree.delete(*tree.get_children())
+            start = page[0] * page_size
+            # Saran hanya dihitung untuk baris di halaman yang tampil
+            for c_type, conflict in rows[start:start + page_size]:
+                solutions = self.generator.cached_suggestions(conflict)
+                solution_text = solutions[0]['description'] if solutions else "Perlu penyesuaian manual"
+                tree.insert('', 'end', values=self.conflict_row_values(c_type, conflict) + (solution_text,))
+            page_var.set(f"Halaman {page[0] + 1}/{page_count} | {len(rows)} konflik")
+        
+        ttk.Button(nav_frame, text="◀ Sebelumnya",
+                  command=lambda: show_page(page[0] - 1)).pack(side=tk.LEFT)
+        ttk.Label(nav_frame, textvariable=page_var).pack(side=tk.LEFT, padx=10)
+        ttk.Button(nav_frame, text="Berikutnya ▶",
+                  command=lambda: show_page(page[0] + 1)).pack(side=tk.LEFT)
+        
+        show_page(0)
 
     def show_manual_input(self):
+        if not self.ensure_idle():
+            return
         ManualInputDialog(self.root, self.generator, self.show_lecturer_schedule)
 
-    def on_schedule_select(self, event):
-        selected = self.schedule_tree.selection()
-        if selected:
-            item = self.schedule_tree.item(selected[0])
-            values = item['values']
-            
-            # Kolom: 
-            # 0: Sumber, 1: Hari, 2: Dosen, 3: Mata Kuliah, 4: Kelas, 
-            # 5: Ruangan, 6: Jam, 7: SKS, 8: Semester, 9: Mahasiswa
-            
-            lecturer = values[2]
-            hari = values[1]
-            matkul = values[3]
-            kelas = values[4]
-            ruangan = values[5]
-            jam = values[6]
-            
-            all_schedules = self.generator.fixed_schedules + self.generator.generated_schedules
-            
-            for s in all_schedules:
-                if (s['dosen'] == lecturer and 
-                    s['hari'] == hari and
-                    s['mata_kuliah'] == matkul and
-                    s['kelas'] == kelas and
-                    s.get('ruangan', '') == ruangan and
-                    s['jam'] == jam):
-                    self.selected_schedule = s
-                    return
-                    
-            self.selected_schedule = None
-        else:
-            self.selected_schedule = None
+    def on_schedule_select(self, record):
+        self.selected_schedule = record
 
     def edit_selected_schedule(self):
         if not self.selected_schedule:
             messagebox.showwarning("Peringatan", "Pilih jadwal yang akan diedit!")
             return
+        if not self.ensure_idle():
+            return
             
         ManualInputDialog(self.root, self.generator, self.show_lecturer_schedule, self.selected_schedule)
 
     def resolve_conflicts(self):
-        resolved = self.generator.auto_resolve_conflicts()
+        if not self.ensure_idle():
+            return
+        self.jobs.start("Menyelesaikan konflik", self.generator.auto_resolve_conflicts,
+                        on_done=self.show_resolve_result)
+
+    def show_resolve_result(self, resolved):
         if resolved > 0:
             messagebox.showinfo("Sukses", f"Berhasil menyelesaikan {resolved} konflik!")
             self.show_lecturer_schedule()
@@ -2173,6 +5069,8 @@ class ScheduleApp:
             messagebox.showinfo("Info", "Tidak ada konflik yang bisa diselesaikan secara otomatis")
             
     def randomize_schedule(self, reshuffle_existing=False):
+        if not self.ensure_idle():
+            return
         if not self.generator.lecturers:
             messagebox.showwarning("Peringatan", "Load data dosen terlebih dahulu!")
             return
@@ -2183,14 +5081,21 @@ class ScheduleApp:
                                       "Ini akan menghapus semua jadwal yang sudah dibuat sebelumnya."):
                 return
         
-        success_count, failure_count, failed_schedules = self.generator.randomize_schedule(reshuffle_existing)
-    
+        self.jobs.start("Mengacak jadwal", self.generator.randomize_schedule, reshuffle_existing,
+                        on_done=self.show_randomize_result)
+
+    def show_randomize_result(self, result):
+        success_count, failure_count, failed_schedules = result
         if success_count == 0 and failure_count == 0:
             message = "Semua jadwal sudah memiliki waktu. Tidak ada yang diacak."
         elif failure_count > 0:
             self.show_failed_schedules_dialog(failed_schedules)
             message = (f"Berhasil mengacak {success_count} jadwal!\n" 
                     f"{failure_count} jadwal gagal diacak (lihat detail konflik).")
+            if self.generator.last_feasibility is not None:
+                lines = self.generator.format_feasibility(self.generator.last_feasibility)
+                if lines:
+                    message += "\n\nPra-pemeriksaan:\n" + "\n".join(lines)
         else:
             message = f"Berhasil mengacak {success_count} jadwal!"
     
@@ -2199,6 +5104,8 @@ class ScheduleApp:
         self.save_ui_state()
             
     def show_lecturer_preference(self):
+        if not self.ensure_idle():
+            return
         LecturerPreferenceDialog(self.root, self.generator, self.show_lecturer_schedule)
 
     def validate_preferences(self):
@@ -2210,12 +5117,16 @@ class ScheduleApp:
             messagebox.showinfo("Validasi Preferensi", "Semua preferensi dosen valid!")
 
     def show_break_time_dialog(self):
+        if not self.ensure_idle():
+            return
         BreakTimeDialog(self.root, self.generator, self.show_lecturer_schedule)
 
     def delete_selected_schedule(self):
         if not self.selected_schedule:
             messagebox.showwarning("Peringatan", "Pilih jadwal yang akan dihapus!")
             return
+        if not self.ensure_idle():
+            return
             
         if self.generator.remove_schedule(self.selected_schedule):
             self.status_var.set("Jadwal berhasil dihapus")
@@ -2225,12 +5136,262 @@ class ScheduleApp:
             messagebox.showerror("Error", "Gagal menghapus jadwal")
 
     def on_closing(self):
+        if self.jobs.is_busy():
+            # Hentikan job di titik aman; worker tidak menyentuh Tk sehingga join aman
+            self.jobs.cancel()
+            self.jobs.thread.join()
+        if self.initializing:
+            # Cache masih dimuat: tunggu sampai state lengkap agar save_cache tidak menyimpan setengahnya
+            self.status_var.set("Menunggu pemuatan cache selesai...")
+            self.init_thread.join()
+        if self.query_service is not None:
+            self.query_service.stop()
         self.save_ui_state()
-        self.generator.save_cache()
+        self.state_writer.close()
+        self.generator.wait_for_compaction()
+        if not self.generator.save_cache() and self.generator.cache_read_only:
+            messagebox.showwarning("Cache", "Perubahan sesi ini tidak disimpan karena cache gagal dimuat.\n"
+                                            f"File {self.generator.cache_file} dibiarkan utuh.")
+        self.generator.close_storage()
         self.root.destroy()
 
 
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_INPUT = 3
+EXIT_UNSCHEDULED = 4
+EXIT_CONFLICTS = 5
+EXIT_EXPORT = 6
+
+
+def build_cli_parser():
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="app13.py",
+        description="Penjadwalan tanpa GUI: load data, acak jadwal, cek konflik dan ekspor.")
+    parser.add_argument('--mapping', nargs='+', metavar='XLSX', help="Workbook mapping mata kuliah (boleh lebih dari satu)")
+    parser.add_argument('--rooms', default="data/rooms.json", help="File JSON ruangan")
+    parser.add_argument('--cache', help="File cache yang dimuat di awal (jika ada) dan disimpan di akhir")
+    parser.add_argument('--preferences', help="JSON {dosen: {available_days, online_days, preferred_times_offline, ...}}")
+    parser.add_argument('--breaks', help="JSON [{dosen, hari, mulai, selesai}, ...]")
+    parser.add_argument('--reshuffle', action='store_true', help="Acak ulang semua jadwal yang tidak tetap")
+    parser.add_argument('--reshuffle-rooms', action='store_true', help="Acak ulang ruangan semua jadwal")
+    parser.add_argument('--room-strategy', choices=['best_fit', 'random'], default='best_fit',
+                        help="best_fit = ruangan terkecil yang cukup, random = ruangan acak yang cukup")
+    parser.add_argument('--reserve-large', type=int, metavar='N',
+                        help="Cadangkan ruangan berkapasitas >= N untuk kelas dengan >= N mahasiswa")
+    parser.add_argument('--seed', type=int, help="Seed random agar hasil bisa diulang")
+    parser.add_argument('--output', help="Folder untuk file Excel semua jadwal")
+    parser.add_argument('--template', default="templates/schedule_template.xlsx", help="Template Excel")
+    parser.add_argument('--bulk', action='store_true', help="Ekspor juga per dosen/kelas/ruangan ke folder --output")
+    parser.add_argument('--records', help="Ekspor data mentah ke .csv/.jsonl/.parquet")
+    parser.add_argument('--report', help="Tulis ringkasan JSON ke file ini (default: stdout)")
+    parser.add_argument('--strict', action='store_true',
+                        help="Exit code non-nol jika ada jadwal gagal diacak atau konflik tersisa")
+    parser.add_argument('--no-precheck', action='store_true',
+                        help="Jangan lewati jadwal yang pasti gagal menurut pra-pemeriksaan kapasitas")
+    parser.add_argument('--solver-stats', nargs='?', const='', metavar='LOG',
+                        help="Catat statistik solver (opsional: file log per jadwal)")
+    parser.add_argument('--scenarios', metavar='JSON',
+                        help="Bandingkan skenario what-if: JSON list override (online_ratio, closed_floors, ...)")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Tulis metrik di akhir: .json untuk JSON, selain itu format teks Prometheus")
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help="Setelah pipeline selesai, layani query HTTP/JSON di port ini sampai dihentikan")
+    parser.add_argument('--host', default="127.0.0.1", help="Alamat untuk --serve")
+    return parser
+
+
+def run_cli(argv):
+    """Jalankan seluruh pipeline tanpa Tk; mengembalikan exit code"""
+    import contextlib
+    args = build_cli_parser().parse_args(argv)
+    if not args.mapping and not args.cache:
+        print("Error: --mapping atau --cache wajib diisi", file=sys.stderr)
+        return EXIT_USAGE
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    errors = []
+    report = {'phases': {}, 'errors': errors, 'exit_code': EXIT_OK}
+    # Disimpan sebelum redirect_stdout agar laporan tetap ke stdout meski finish dipanggil di dalamnya
+    stdout = sys.stdout
+    generator = ScheduleGenerator()
+    generator.error_handler = errors.append
+    generator.room_strategy = args.room_strategy
+    generator.room_reserve_threshold = args.reserve_large
+    
+    @contextlib.contextmanager
+    def phase(name):
+        start = perf_counter()
+        print(f"[{name}] mulai", file=sys.stderr)
+        try:
+            yield
+        finally:
+            report['phases'][name] = round(perf_counter() - start, 4)
+            print(f"[{name}] {report['phases'][name]:.3f} detik", file=sys.stderr)
+    
+    def finish(code):
+        report['exit_code'] = code
+        if args.metrics:
+            generator.update_metrics()
+            if args.metrics.endswith('.json'):
+                generator.metrics.write_json(args.metrics)
+            else:
+                generator.metrics.write_prometheus(args.metrics)
+        output = json.dumps(report, indent=2, default=_json_default)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            print(output, file=stdout)
+        return code
+    
+    # Output print dari generator dialihkan ke stderr agar stdout hanya berisi laporan JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            with phase('load'):
+                if args.cache:
+                    generator.cache_file = args.cache
+                    if os.path.exists(args.cache):
+                        generator.load_cache()
+                if args.mapping and len(args.mapping) == 1:
+                    loaded = generator.load_data(args.mapping[0])
+                elif args.mapping:
+                    summary = generator.load_data_multi(args.mapping)
+                    errors.extend(summary['errors'])
+                    loaded = summary['rows'] > 0
+                else:
+                    loaded = bool(generator.fixed_schedules or generator.generated_schedules)
+                if os.path.exists(args.rooms):
+                    loaded = generator.load_rooms(args.rooms) and loaded
+                elif not generator.available_rooms:
+                    errors.append(f"File ruangan tidak ditemukan: {args.rooms}")
+                    loaded = False
+            if not loaded:
+                return finish(EXIT_INPUT)
+            report['rows'] = len(generator.fixed_schedules) + len(generator.generated_schedules)
+            
+            with phase('preferences'):
+                if args.preferences:
+                    with open(args.preferences, 'r', encoding='utf-8') as f:
+                        for lecturer, prefs in json.load(f).items():
+                            generator.add_lecturer_preference(
+                                lecturer,
+                                available_days=prefs.get('available_days'),
+                                preferred_times_offline=[tuple(t) for t in prefs.get('preferred_times_offline', [])],
+                                preferred_times_online=[tuple(t) for t in prefs.get('preferred_times_online', [])],
+                                online_days=prefs.get('online_days'),
+                                use_additional_breaks=prefs.get('use_additional_breaks', False))
+                if args.breaks:
+                    with open(args.breaks, 'r', encoding='utf-8') as f:
+                        for item in json.load(f):
+                            generator.add_lecturer_break(item['dosen'], item['hari'], item['mulai'], item['selesai'])
+            
+            if args.solver_stats is not None:
+                generator.solver_stats = SolverStats(log=args.solver_stats or None)
+            generator.feasibility_precheck = not args.no_precheck
+            with phase('randomize'):
+                success_count, failure_count, failed_schedules = generator.randomize_schedule(args.reshuffle)
+            if generator.last_feasibility is not None:
+                feasibility = generator.last_feasibility
+                report['feasibility'] = {
+                    'skipped': len(feasibility['infeasible']),
+                    'lecturers': feasibility['lecturers'],
+                    'classes': feasibility['classes'],
+                    'rooms': feasibility['rooms'],
+                    'too_large': feasibility['too_large'],
+                    'seconds': round(feasibility['seconds'], 4)
+                }
+                for line in generator.format_feasibility(feasibility):
+                    print(f"[pra-pemeriksaan] {line}", file=sys.stderr)
+            if generator.solver_stats is not None:
+                report['solver_stats'] = generator.solver_stats.as_dict()
+                print(generator.solver_stats.format_report(), file=sys.stderr)
+            report['scheduled'] = success_count
+            report['unscheduled'] = [
+                {'dosen': item['schedule']['dosen'], 'mata_kuliah': item['schedule']['mata_kuliah'],
+                 'kelas': item['schedule']['kelas'], 'reasons': item['reasons']}
+                for item in failed_schedules
+            ]
+            
+            with phase('rooms'):
+                before = generator.seat_utilization()
+                if args.reshuffle_rooms:
+                    generator.randomize_all_rooms()
+                generator.fill_empty_rooms_randomly()
+                after = generator.seat_utilization()
+            report['seat_utilization'] = {
+                'before': round(before['overall'], 4), 'after': round(after['overall'], 4),
+                'wasted_seats_before': before['wasted_seats'], 'wasted_seats_after': after['wasted_seats']
+            }
+            
+            with phase('audit'):
+                conflicts = generator.find_all_conflicts()
+            report['conflicts'] = {kind: len(items) for kind, items in conflicts.items()}
+            
+            if args.scenarios:
+                with phase('scenarios'):
+                    with open(args.scenarios, 'r', encoding='utf-8') as f:
+                        scenarios = json.load(f)
+                    report['scenarios'] = generator.run_scenarios(scenarios)
+                print(generator.format_scenario_table(report['scenarios']), file=sys.stderr)
+            
+            export_failed = False
+            with phase('export'):
+                all_schedules = generator.fixed_schedules + generator.generated_schedules
+                outputs = report['outputs'] = []
+                try:
+                    if args.output:
+                        os.makedirs(args.output, exist_ok=True)
+                        outputs.append(generator.export_to_excel(all_schedules, args.template, args.output))
+                        if args.bulk:
+                            summary = generator.bulk_export(args.template, args.output)
+                            errors.extend(summary['errors'])
+                            export_failed = bool(summary['errors'])
+                            report['bulk'] = {'files': summary['files'], 'rows': summary['rows']}
+                    if args.records:
+                        outputs.append(generator.export_records(all_schedules, args.records))
+                except Exception as e:
+                    errors.append(f"Gagal mengekspor: {e}")
+                    export_failed = True
+            
+            if args.cache:
+                generator.save_cache()
+        except Exception as e:
+            traceback.print_exc()
+            errors.append(str(e))
+            return finish(EXIT_ERROR)
+    
+    if export_failed:
+        code = EXIT_EXPORT
+    elif args.strict and failure_count:
+        code = EXIT_UNSCHEDULED
+    elif args.strict and any(report['conflicts'].values()):
+        code = EXIT_CONFLICTS
+    else:
+        code = EXIT_OK
+    finish(code)
+    
+    if args.serve is not None:
+        service = ScheduleQueryService(generator, host=args.host, port=args.serve)
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                service.start(background=False)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                if args.cache:
+                    generator.save_cache()
+    return code
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Mode batch tanpa display, mis. untuk job terjadwal di server
+        sys.exit(run_cli(sys.argv[1:]))
+    
     root = tk.Tk()
     try:
         app = ScheduleApp(root)
@@ -0,0 +1,205 @@
+"""Benchmark penjadwalan dengan data sintetis.
+
+Membuat workbook mapping dan katalog ruangan sintetis pada beberapa skala,
+lalu mengukur operasi utama ScheduleGenerator. Hasil ditulis sebagai JSON
+agar regresi performa bisa dilacak antar commit.
+
+Contoh:
+    python benchmark.py --scales 500:24,2000:60 --output bench.json
+    python benchmark.py --generate-only --scales 10000:200 --workdir data_sintetis
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+import app13
+
+DEFAULT_SCALES = [(500, 24), (2000, 60), (10000, 200), (50000, 500)]
+OPERATIONS = ['load_data', 'randomize_schedule', 'find_all_conflicts', 'randomize_all_rooms',
+              'save_to_excel', 'save_cache', 'load_cache']
+
+DEPARTMENTS = [('TI', 0.45), ('SI', 0.3), ('DKV', 0.25)]
+FIRST_NAMES = ['Adi', 'Budi', 'Citra', 'Dewi', 'Eka', 'Fajar', 'Gina', 'Hadi', 'Indra', 'Joko',
+               'Kartika', 'Lina', 'Made', 'Nur', 'Oki', 'Putri', 'Rina', 'Sari', 'Tono', 'Wulan']
+LAST_NAMES = ['Pratama', 'Saputra', 'Wijaya', 'Lestari', 'Hidayat', 'Kusuma', 'Santoso',
+              'Nugroho', 'Rahayu', 'Permana', 'Siregar', 'Utami']
+TITLES = ['M.Kom', 'S.Kom., M.Kom', 'ST., M.T', 'M.Ds', 'Dr.', 'S.Si., M.Kom']
+SUBJECT_WORDS = ['Algoritma', 'Basis Data', 'Jaringan Komputer', 'Pemrograman Web', 'Desain Grafis',
+                 'Sistem Informasi', 'Kecerdasan Buatan', 'Statistika', 'Tipografi', 'Rekayasa Perangkat Lunak',
+                 'Interaksi Manusia dan Komputer', 'Keamanan Informasi', 'Ilustrasi', 'Manajemen Proyek']
+SUBJECT_LEVELS = ['Dasar', 'Lanjut', 'I', 'II', 'Terapan']
+
+
+def parse_scales(text):
+    scales = []
+    for item in text.split(','):
+        rows, _, rooms = item.partition(':')
+        scales.append((int(rows), int(rooms or 24)))
+    return scales
+
+
+def generate_rooms(path, count, seed=0):
+    """Katalog ruangan sintetis: 8 ruangan per lantai mulai lantai 3, kapasitas bervariasi"""
+    rng = random.Random(seed)
+    rooms = []
+    for index in range(count):
+        floor = 3 + index // 8
+        rooms.append({
+            'nama': f"B{floor}{chr(ord('A') + index % 8)}",
+            'lantai': floor,
+            'kapasitas': rng.choice([30, 30, 40, 40, 50, 60])
+        })
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rooms, f, indent=1)
+    return rooms
+
+
+def generate_mapping(path, rows, seed=0):
+    """Workbook mapping sintetis dengan tata letak yang sama seperti data/Mapping.xlsx"""
+    from openpyxl import Workbook
+    rng = random.Random(seed)
+    lecturer_count = max(5, rows // 6)
+    class_count = max(5, rows // 7)
+    lecturers = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i + 1}, {rng.choice(TITLES)}"
+                 for i in range(lecturer_count)]
+    classes = []
+    for i in range(class_count):
+        department = rng.choices([d for d, _ in DEPARTMENTS], weights=[w for _, w in DEPARTMENTS])[0]
+        year = rng.choice([22, 23, 24])
+        classes.append(f"{department}{year}{chr(ord('A') + i % 26)}{i // 26 or ''}")
+    subjects = [f"{word} {level}" for word in SUBJECT_WORDS for level in SUBJECT_LEVELS]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(app13.MAPPING_SHEET)
+    sheet.append([])
+    sheet.append([])
+    sheet.append(['No', 'Nama Dosen', 'Mata Kuliah', 'Semester', 'SKS', 'Kelas', 'Hari', 'Jam', 'Jumlah Mahasiswa'])
+    for number in range(1, rows + 1):
+        sheet.append([
+            number,
+            rng.choice(lecturers),
+            rng.choice(subjects),
+            rng.choice([1, 3, 5, 7]),
+            rng.choices([2, 3, 4], weights=[5, 4, 1])[0],
+            rng.choice(classes),
+            None,
+            None,
+            rng.randint(15, 45)
+        ])
+    workbook.save(path)
+
+
+def prepare_dataset(workdir, rows, rooms, seed=0):
+    mapping_path = os.path.join(workdir, f"mapping_{rows}.xlsx")
+    rooms_path = os.path.join(workdir, f"rooms_{rooms}.json")
+    if not os.path.exists(mapping_path):
+        generate_mapping(mapping_path, rows, seed)
+    if not os.path.exists(rooms_path):
+        generate_rooms(rooms_path, rooms, seed)
+    return mapping_path, rooms_path
+
+
+def new_generator(workdir, errors):
+    generator = app13.ScheduleGenerator()
+    generator.cache_file = os.path.join(workdir, "bench_cache.pkl")
+    generator.error_handler = errors.append
+    return generator
+
+
+def run_scale(rows, rooms, workdir, template, budget, slow_operations, seed=0):
+    """Ukur semua operasi pada satu skala; operasi yang pernah melewati budget dilewati"""
+    mapping_path, rooms_path = prepare_dataset(workdir, rows, rooms, seed)
+    errors = []
+    generator = new_generator(workdir, errors)
+    generator.load_rooms(rooms_path)
+    all_schedules = lambda: generator.fixed_schedules + generator.generated_schedules
+    steps = {
+        'load_data': lambda: generator.load_data(mapping_path),
+        'randomize_schedule': lambda: generator.randomize_schedule(),
+        'find_all_conflicts': lambda: generator.find_all_conflicts(),
+        'randomize_all_rooms': lambda: generator.randomize_all_rooms(),
+        'save_to_excel': lambda: generator.save_to_excel(all_schedules(), template, workdir, "bench_export.xlsx"),
+        'save_cache': lambda: generator.save_cache(),
+        'load_cache': lambda: new_generator(workdir, errors).load_cache()
+    }
+    results = []
+    for operation in OPERATIONS:
+        result = {'rows': rows, 'rooms': rooms, 'operation': operation}
+        if operation in slow_operations:
+            result['skipped'] = f"melewati budget {budget:.0f} detik pada skala lebih kecil"
+        else:
+            random.seed(seed)
+            start = perf_counter()
+            steps[operation]()
+            result['seconds'] = round(perf_counter() - start, 4)
+            if result['seconds'] > budget:
+                slow_operations.add(operation)
+        if errors:
+            result['errors'] = list(errors)
+            errors.clear()
+        print(f"{rows:>6} baris {rooms:>4} ruangan  {operation:<20} "
+              f"{result.get('seconds', '-')}", file=sys.stderr)
+        results.append(result)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ScheduleGenerator dengan data sintetis")
+    parser.add_argument('--scales', type=parse_scales, default=DEFAULT_SCALES,
+                        help="Daftar baris:ruangan dipisah koma (default 500:24,2000:60,10000:200,50000:500)")
+    parser.add_argument('--workdir', help="Folder data sintetis (default: folder sementara)")
+    parser.add_argument('--template', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           "templates", "schedule_template.xlsx"))
+    parser.add_argument('--budget', type=float, default=300.0,
+                        help="Operasi yang lebih lama dari ini (detik) dilewati pada skala berikutnya")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default="benchmark_results.json")
+    parser.add_argument('--generate-only', action='store_true', help="Hanya buat data sintetis")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="schedule_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    if args.generate_only:
+        for rows, rooms in args.scales:
+            print(*prepare_dataset(workdir, rows, rooms, args.seed))
+        return 0
+
+    slow_operations = set()
+    results = []
+    for rows, rooms in args.scales:
+        results.extend(run_scale(rows, rooms, workdir, args.template, args.budget, slow_operations, args.seed))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'budget': args.budget
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil ditulis ke {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
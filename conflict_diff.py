@@ -0,0 +1,197 @@
+"""Uji diferensial pemeriksa konflik.
+
+Membuat jadwal acak (termasuk baris tanpa jam, format jam rusak, ruangan
+Online/kosong, preferensi dan jam istirahat dosen) lalu membandingkan
+conflict_cause, get_conflict_reasons dan find_all_conflicts di app13.py
+dengan salinan referensi di conflict_reference.py. Verdict, penyebab,
+daftar konflik (termasuk urutannya) dan jenis exception harus identik.
+Rasio percepatan dicetak di akhir setiap percobaan.
+
+Contoh:
+    python conflict_diff.py --trials 20 --rows 400 --seed 1
+"""
+import argparse
+import random
+import sys
+from time import perf_counter
+
+import app13
+from conflict_reference import reference_conflict_cause, reference_conflict_reasons, reference_find_all_conflicts
+
+ROOMS = [('B3A', 30), ('B3B', 40), ('B4A', 50), ('B4B', 60), ('B5A', 35)]
+MALFORMED_JAM = ['08:00', '08:00-09:40', '25:00 - 26:00', '10:00 - 09:00', 'x - y']
+
+
+def random_jam(rng, generator, online, malformed=0.0):
+    if rng.random() < malformed:
+        return rng.choice(MALFORMED_JAM)
+    slots = [slot for slot in generator.time_slots if ('(online)' in slot[0]) == online]
+    start, end = rng.choice(slots)
+    return f"{start} - {end}"
+
+
+def random_generator(rng, rows, malformed=0.0):
+    """ScheduleGenerator berisi jadwal, preferensi dan istirahat dosen acak"""
+    generator = app13.ScheduleGenerator()
+    generator.room_capacities = dict(ROOMS)
+    lecturers = [f"Dosen {i}" for i in range(max(3, rows // 5))]
+    classes = [f"TI24{chr(ord('A') + i % 26)}{i // 26 or ''}" for i in range(max(3, rows // 10))]
+
+    for lecturer in lecturers:
+        roll = rng.random()
+        if roll < 0.4:
+            available = rng.sample(generator.days, rng.randint(1, 4))
+            generator.lecturer_preferences[lecturer] = {
+                'available_days': available,
+                'online_days': [day for day in rng.sample(generator.days, rng.randint(0, 2)) if day not in available],
+                'preferred_times_offline': [rng.choice([('08:00', '12:00'), ('13:00', '17:00'), ('09:00', '21:00')])]
+                                           if rng.random() < 0.5 else [],
+                'preferred_times_online': [rng.choice([('15:30', '21:10'), ('08:00', '12:00')])]
+                                          if rng.random() < 0.5 else [],
+                'use_additional_breaks': rng.random() < 0.5
+            }
+        if rng.random() < 0.3:
+            day = rng.choice(generator.days)
+            key = f"{lecturer}|{day}" if rng.random() < 0.5 else lecturer
+            generator.lecturer_breaks[key].append(rng.choice(['12:00 - 13:00', '10:00 - 11:00', '16:00 - 17:30']))
+
+    for row_id in range(1, rows + 1):
+        roll = rng.random()
+        online = roll < 0.2
+        if online:
+            ruangan = 'Online'
+        elif roll < 0.25:
+            ruangan = ''
+        else:
+            ruangan = rng.choice(ROOMS)[0]
+        schedule = {
+            'id': row_id,
+            'dosen': rng.choice(lecturers),
+            'mata_kuliah': f"MK {row_id}",
+            'kelas': rng.choice(classes),
+            'hari': rng.choice(generator.days),
+            'jam': '' if rng.random() < 0.05 else random_jam(rng, generator, online, malformed),
+            'ruangan': ruangan,
+            'sks': 2,
+            'semester': 3,
+            'jumlah_mahasiswa': rng.randint(15, 65)
+        }
+        target = generator.fixed_schedules if rng.random() < 0.1 else generator.generated_schedules
+        target.append(schedule)
+    # Preferensi dan istirahat diisi langsung, jadi kompilasi seperti setelah dimuat dari cache
+    generator.compile_lecturer_masks()
+    return generator
+
+
+def outcome(func, *args, **kwargs):
+    """Hasil pemanggilan atau nama exception-nya, supaya error juga ikut dibandingkan"""
+    try:
+        return 'ok', func(*args, **kwargs)
+    except Exception as e:
+        return 'error', type(e).__name__
+
+
+def canonical_conflicts(conflicts, all_schedules):
+    """Ganti dict jadwal dengan posisinya agar dua hasil bisa dibandingkan dengan =="""
+    positions = {id(schedule): index for index, schedule in enumerate(all_schedules)}
+    canonical = {}
+    for category, items in conflicts.items():
+        canonical[category] = [
+            tuple(sorted((key, positions[id(value)] if isinstance(value, dict) else value)
+                         for key, value in item.items()))
+            for item in items
+        ]
+    return canonical
+
+
+def run_trial(rng, rows):
+    # find_all_conflicts gagal pada jam rusak; hanya sebagian percobaan memuatnya
+    # agar daftar konflik lengkap tetap sering dibandingkan
+    generator = random_generator(rng, rows, malformed=0.03 if rng.random() < 0.3 else 0.0)
+    all_schedules = generator.fixed_schedules + generator.generated_schedules
+    mismatches = []
+
+    # Salinan yang dipindah ke hari/jam lain dengan baris asalnya diabaikan, seperti mesin saran
+    probes = [(schedule, None) for schedule in all_schedules]
+    for schedule in rng.sample(all_schedules, min(len(all_schedules), rows // 4)):
+        moved = dict(schedule, hari=rng.choice(generator.days),
+                     jam=random_jam(rng, generator, schedule['ruangan'] == 'Online'))
+        probes.append((moved, schedule))
+
+    timings = {}
+    for label, cause in (('reference', lambda s, ignore: reference_conflict_cause(generator, s, ignore=ignore)),
+                         ('optimized', lambda s, ignore: generator.conflict_cause(s, ignore=ignore))):
+        start = perf_counter()
+        timings[('cause', label)] = [outcome(cause, schedule, ignore) for schedule, ignore in probes]
+        timings[('cause_seconds', label)] = perf_counter() - start
+
+    for index, (expected, actual) in enumerate(zip(timings[('cause', 'reference')],
+                                                   timings[('cause', 'optimized')])):
+        if expected != actual:
+            mismatches.append(f"conflict_cause probe {index}: referensi {expected}, optimasi {actual}")
+        schedule, ignore = probes[index]
+        if ignore is None and expected[0] == 'ok':
+            verdict = outcome(generator.is_conflict, schedule)
+            if verdict != ('ok', expected[1] is not None):
+                mismatches.append(f"is_conflict baris {index}: {verdict}, penyebab referensi {expected[1]}")
+
+    for index, schedule in enumerate(all_schedules):
+        expected = outcome(reference_conflict_reasons, generator, schedule)
+        actual = outcome(generator.get_conflict_reasons, schedule)
+        if expected != actual:
+            mismatches.append(f"get_conflict_reasons baris {index}: referensi {expected}, optimasi {actual}")
+
+    start = perf_counter()
+    expected = outcome(reference_find_all_conflicts, generator)
+    timings['find_reference'] = perf_counter() - start
+    start = perf_counter()
+    actual = outcome(generator.find_all_conflicts)
+    timings['find_optimized'] = perf_counter() - start
+    if expected[0] == 'ok' and actual[0] == 'ok':
+        expected = canonical_conflicts(expected[1], all_schedules)
+        actual = canonical_conflicts(actual[1], all_schedules)
+    if expected != actual:
+        mismatches.append("find_all_conflicts berbeda dari referensi")
+
+    return mismatches, timings, len(probes)
+
+
+def ratio(reference, optimized):
+    return reference / optimized if optimized > 0 else float('inf')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan pemeriksa konflik dengan implementasi referensi")
+    parser.add_argument('--trials', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=300, help="Jumlah baris jadwal per percobaan")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    failed = 0
+    totals = {'cause_reference': 0.0, 'cause_optimized': 0.0, 'find_reference': 0.0, 'find_optimized': 0.0}
+    for trial in range(1, args.trials + 1):
+        mismatches, timings, probe_count = run_trial(rng, args.rows)
+        totals['cause_reference'] += timings[('cause_seconds', 'reference')]
+        totals['cause_optimized'] += timings[('cause_seconds', 'optimized')]
+        totals['find_reference'] += timings['find_reference']
+        totals['find_optimized'] += timings['find_optimized']
+        status = "OK" if not mismatches else f"{len(mismatches)} BEDA"
+        print(f"Percobaan {trial:>3}: {status:<8} {probe_count} probe  "
+              f"conflict_cause {ratio(timings[('cause_seconds', 'reference')], timings[('cause_seconds', 'optimized')]):.2f}x  "
+              f"find_all_conflicts {ratio(timings['find_reference'], timings['find_optimized']):.2f}x")
+        for message in mismatches[:10]:
+            print(f"  {message}")
+        failed += bool(mismatches)
+
+    print(f"Total: conflict_cause {ratio(totals['cause_reference'], totals['cause_optimized']):.2f}x, "
+          f"find_all_conflicts {ratio(totals['find_reference'], totals['find_optimized']):.2f}x "
+          f"({totals['find_reference']:.3f}s -> {totals['find_optimized']:.3f}s)")
+    if failed:
+        print(f"{failed} dari {args.trials} percobaan tidak identik dengan referensi", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
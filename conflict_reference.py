@@ -0,0 +1,412 @@
+"""Implementasi referensi pemeriksa konflik.
+
+Salinan beku dari ScheduleGenerator.conflict_cause, get_conflict_reasons dan
+find_all_conflicts sebelum dioptimasi. Jangan dioptimasi: conflict_diff.py
+membandingkan hasil versi di app13.py dengan fungsi-fungsi ini. Jika aturan
+konflik sengaja diubah, ubah juga di sini pada commit yang sama.
+"""
+
+
+def reference_lecturer_breaks(generator, schedule):
+    """Istirahat dosen yang berlaku pada hari jadwal: kunci "dosen|hari" dan kunci lama "dosen" (setiap hari)"""
+    keys = (schedule['dosen'], f"{schedule['dosen']}|{schedule['hari']}")
+    return [value for key, values in generator.lecturer_breaks.items() if key in keys for value in values]
+
+
+def reference_conflict_cause(generator, schedule, check_room_capacity=True, ignore=None):
+    """Penyebab konflik pertama yang ditemukan (mis. 'lecturer_overlap'), atau None jika bebas konflik"""
+    if not schedule['jam']:
+        return None
+        
+    jam_parts = schedule['jam'].split(' - ')
+    if len(jam_parts) != 2:
+        return 'invalid_time'
+        
+    start, end = jam_parts
+    start_time, is_online = generator.parse_time(start)
+    end_time, _ = generator.parse_time(end)
+    
+    if not start_time or not end_time or not generator.is_valid_time_range(start, end):
+        return 'invalid_time'
+        
+    all_schedules = generator.fixed_schedules + generator.generated_schedules
+    if ignore is not None:
+        # Baris asal dari salinan yang sedang dievaluasi tidak dihitung
+        all_schedules = [s for s in all_schedules if s is not ignore]
+    
+    # 1. Check lecturer availability
+    for sched in all_schedules:
+        if (sched != schedule and sched['dosen'] == schedule['dosen'] 
+            and sched['hari'] == schedule['hari'] and sched['jam']):
+            s_start, s_end = sched['jam'].split(' - ')
+            s_start_time, _ = generator.parse_time(s_start)
+            s_end_time, _ = generator.parse_time(s_end)
+            
+            if s_start_time and s_end_time and generator.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
+                return 'lecturer_overlap'
+    
+    # Check lecturer preferences
+    lecturer_pref = generator.lecturer_preferences.get(schedule['dosen'], {})
+    
+    # Check available days (hari yang tersedia)
+    available_days = lecturer_pref.get('available_days', [])
+    if available_days and schedule['hari'] not in available_days:
+        return 'preference'
+        
+    # Check online days
+    if schedule['hari'] in lecturer_pref.get('online_days', []) and schedule.get('ruangan') != 'Online':
+        return 'online_day'
+        
+    # Check preferred times (online/offline specific)
+    if lecturer_pref.get('preferred_times_offline') or lecturer_pref.get('preferred_times_online'):
+        time_ok = False
+        is_online_class = schedule.get('ruangan') == 'Online'
+        
+        if is_online_class:
+            preferred_times = lecturer_pref.get('preferred_times_online', [])
+        else:
+            preferred_times = lecturer_pref.get('preferred_times_offline', [])
+        
+        for pref_start, pref_end in preferred_times:
+            pref_start_time, _ = generator.parse_time(pref_start)
+            pref_end_time, _ = generator.parse_time(pref_end)
+            
+            if pref_start_time and pref_end_time and start_time >= pref_start_time and end_time <= pref_end_time:
+                time_ok = True
+                break
+        
+        if preferred_times and not time_ok:
+            return 'preference'
+                
+    # 2. Check room availability and capacity (only for offline classes)
+    if (check_room_capacity and schedule.get('ruangan') 
+        and schedule['ruangan'] != 'Online' and schedule.get('jam')):
+        for sched in all_schedules:
+            if (sched != schedule and sched.get('ruangan') == schedule['ruangan'] 
+                and sched['hari'] == schedule['hari'] and sched['jam']):
+                s_start, s_end = sched['jam'].split(' - ')
+                s_start_time, _ = generator.parse_time(s_start)
+                s_end_time, _ = generator.parse_time(s_end)
+                
+                if s_start_time and s_end_time and generator.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
+                    return 'room_overlap'
+        
+        room_capacity = generator.room_capacities.get(schedule['ruangan'], 0)
+        if schedule.get('jumlah_mahasiswa', 0) > room_capacity:
+            return 'capacity'
+    
+    # 3. Check class availability (for both online and offline)
+    for sched in all_schedules:
+        if (sched != schedule and sched['kelas'] == schedule['kelas'] 
+            and sched['hari'] == schedule['hari'] and sched['jam']):
+            s_start, s_end = sched['jam'].split(' - ')
+            s_start_time, _ = generator.parse_time(s_start)
+            s_end_time, _ = generator.parse_time(s_end)
+            
+            if s_start_time and s_end_time and generator.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
+                return 'class_overlap'
+    
+    # 4. Check break times (only for offline classes)
+    if schedule.get('ruangan') != 'Online' and schedule.get('jam'):
+        break_times_to_check = generator.break_times.copy()
+        
+        if lecturer_pref.get('use_additional_breaks', False):
+            break_times_to_check.extend(generator.additional_break_times)
+        
+        for bt in break_times_to_check:
+            if start_time < bt['end'] and end_time > bt['start']:
+                return 'break_time'
+        
+    # 5. Check lecturer break times (for both online and offline)
+    lecturer_breaks = reference_lecturer_breaks(generator, schedule)
+    for break_time in lecturer_breaks:
+        break_start, break_end = break_time.split(' - ')
+        break_start_time, _ = generator.parse_time(break_start)
+        break_end_time, _ = generator.parse_time(break_end)
+        
+        if break_start_time and break_end_time and generator.is_time_overlap(start_time, end_time, break_start_time, break_end_time):
+            return 'break_time'
+            
+    return None
+
+
+def reference_conflict_reasons(generator, schedule):
+    reasons = []
+    if not schedule.get('jam'):
+        return ["Jadwal belum diisi waktu"]
+    
+    jam_parts = schedule['jam'].split(' - ')
+    if len(jam_parts) != 2:
+        return ["Format waktu tidak valid"]
+    
+    start, end = jam_parts
+    start_time, is_online = generator.parse_time(start)
+    end_time, _ = generator.parse_time(end)
+    
+    if not start_time or not end_time or not generator.is_valid_time_range(start, end):
+        reasons.append("Format waktu tidak valid")
+        return reasons
+    
+    all_schedules = generator.fixed_schedules + generator.generated_schedules
+    
+    # Check lecturer conflict
+    for sched in all_schedules:
+        if (sched != schedule and sched['dosen'] == schedule['dosen'] 
+            and sched['hari'] == schedule['hari'] and sched['jam']):
+            s_start, s_end = sched['jam'].split(' - ')
+            s_start_time, _ = generator.parse_time(s_start)
+            s_end_time, _ = generator.parse_time(s_end)
+            
+            if s_start_time and s_end_time and generator.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
+                reasons.append(f"Konflik dengan dosen di jadwal {sched['mata_kuliah']} (kelas {sched['kelas']})")
+    
+    # Check room conflict and capacity (only for offline)
+    if schedule.get('ruangan') and schedule['ruangan'] != 'Online':
+        room_capacity = generator.room_capacities.get(schedule['ruangan'], 0)
+        if schedule.get('jumlah_mahasiswa', 0) > room_capacity:
+            reasons.append(f"Kapasitas ruangan {schedule['ruangan']} ({room_capacity}) terlampaui")
+        
+        for sched in all_schedules:
+            if (sched != schedule and sched.get('ruangan') == schedule['ruangan'] 
+                and sched['hari'] == schedule['hari'] and sched['jam']):
+                s_start, s_end = sched['jam'].split(' - ')
+                s_start_time, _ = generator.parse_time(s_start)
+                s_end_time, _ = generator.parse_time(s_end)
+                
+                if s_start_time and s_end_time and generator.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
+                    reasons.append(f"Konflik ruangan dengan jadwal {sched['mata_kuliah']} (kelas {sched['kelas']})")
+    
+    # Check class conflict
+    for sched in all_schedules:
+        if (sched != schedule and sched['kelas'] == schedule['kelas'] 
+            and sched['hari'] == schedule['hari'] and sched['jam']):
+            s_start, s_end = sched['jam'].split(' - ')
+            s_start_time, _ = generator.parse_time(s_start)
+            s_end_time, _ = generator.parse_time(s_end)
+            
+            if s_start_time and s_end_time and generator.is_time_overlap(start_time, end_time, s_start_time, s_end_time):
+                reasons.append(f"Konflik kelas dengan jadwal {sched['mata_kuliah']}")
+    
+    # Check break times (only for offline)
+    lecturer_pref = generator.lecturer_preferences.get(schedule['dosen'], {})
+    if schedule.get('ruangan') != 'Online':
+        break_times_to_check = generator.break_times.copy()
+        if lecturer_pref.get('use_additional_breaks', False):
+            break_times_to_check.extend(generator.additional_break_times)
+        
+        for bt in break_times_to_check:
+            if start_time < bt['end'] and end_time > bt['start']:
+                reasons.append(f"Tumpang tindih dengan waktu istirahat ({bt['start'].strftime('%H:%M')}-{bt['end'].strftime('%H:%M')})")
+    
+    # Check lecturer breaks
+    lecturer_breaks = reference_lecturer_breaks(generator, schedule)
+    for break_time in lecturer_breaks:
+        break_start, break_end = break_time.split(' - ')
+        break_start_time, _ = generator.parse_time(break_start)
+        break_end_time, _ = generator.parse_time(break_end)
+        
+        if break_start_time and break_end_time and generator.is_time_overlap(start_time, end_time, break_start_time, break_end_time):
+            reasons.append(f"Tumpang tindih dengan waktu istirahat dosen ({break_start}-{break_end})")
+    
+    # Check lecturer preferences
+    available_days = lecturer_pref.get('available_days', [])
+    if available_days and schedule['hari'] not in available_days:
+        reasons.append(f"Hari {schedule['hari']} tidak tersedia untuk dosen ini")
+        
+    if schedule['hari'] in lecturer_pref.get('online_days', []) and schedule.get('ruangan') != 'Online':
+        reasons.append(f"Hari {schedule['hari']} harus online tetapi jadwal offline")
+        
+    if lecturer_pref.get('preferred_times_offline') or lecturer_pref.get('preferred_times_online'):
+        time_ok = False
+        is_online_class = schedule.get('ruangan') == 'Online'
+        
+        if is_online_class:
+            preferred_times = lecturer_pref.get('preferred_times_online', [])
+        else:
+            preferred_times = lecturer_pref.get('preferred_times_offline', [])
+        
+        for pref_start, pref_end in preferred_times:
+            pref_start_time, _ = generator.parse_time(pref_start)
+            pref_end_time, _ = generator.parse_time(pref_end)
+            
+            if pref_start_time and pref_end_time and start_time >= pref_start_time and end_time <= pref_end_time:
+                time_ok = True
+                break
+        
+        if preferred_times and not time_ok:
+            reasons.append("Waktu tidak sesuai preferensi dosen")
+    
+    return reasons
+
+
+def reference_find_all_conflicts(generator):
+    conflicts = {
+        'lecturer': [],
+        'room': [],
+        'capacity': [],
+        'class': [],
+        'break_time': [],
+        'online_day': [],
+        'preference': []
+    }
+    
+    all_schedules = generator.fixed_schedules + generator.generated_schedules
+    
+    for i, sched in enumerate(all_schedules):
+        if not sched.get('jam'):
+            continue
+            
+        for j, other in enumerate(all_schedules[i+1:], i+1):
+            if (sched['dosen'] == other['dosen'] 
+                and sched['hari'] == other['hari'] 
+                and other.get('jam')):
+                try:
+                    s_start, s_end = sched['jam'].split(' - ')
+                    o_start, o_end = other['jam'].split(' - ')
+                    
+                    s_start_time, _ = generator.parse_time(s_start)
+                    s_end_time, _ = generator.parse_time(s_end)
+                    o_start_time, _ = generator.parse_time(o_start)
+                    o_end_time, _ = generator.parse_time(o_end)
+                    
+                    if (s_start_time and s_end_time and o_start_time and o_end_time
+                        and generator.is_time_overlap(s_start_time, s_end_time, o_start_time, o_end_time)):
+                        conflicts['lecturer'].append({
+                            'conflict_type': 'Dosen ganda',
+                            'dosen': sched['dosen'],
+                            'hari': sched['hari'],
+                            'waktu': f"{max(s_start_time, o_start_time)}-{min(s_end_time, o_end_time)}",
+                            'schedule1': sched,
+                            'schedule2': other
+                        })
+                except:
+                    continue
+        
+        if (sched.get('ruangan') and sched['ruangan'] != 'Online' 
+            and sched.get('jam')):
+            for j, other in enumerate(all_schedules[i+1:], i+1):
+                if (other.get('ruangan') == sched['ruangan'] 
+                    and other['hari'] == sched['hari'] 
+                    and other.get('jam')):
+                    try:
+                        s_start, s_end = sched['jam'].split(' - ')
+                        o_start, o_end = other['jam'].split(' - ')
+                        
+                        s_start_time, _ = generator.parse_time(s_start)
+                        s_end_time, _ = generator.parse_time(s_end)
+                        o_start_time, _ = generator.parse_time(o_start)
+                        o_end_time, _ = generator.parse_time(o_end)
+                        
+                        if (s_start_time and s_end_time and o_start_time and o_end_time
+                            and generator.is_time_overlap(s_start_time, s_end_time, o_start_time, o_end_time)):
+                            conflicts['room'].append({
+                                'conflict_type': 'Ruangan ganda',
+                                'ruangan': sched['ruangan'],
+                                'hari': sched['hari'],
+                                'waktu': f"{max(s_start_time, o_start_time)}-{min(s_end_time, o_end_time)}",
+                                'schedule1': sched,
+                                'schedule2': other
+                            })
+                    except:
+                        continue
+            
+            room_capacity = generator.room_capacities.get(sched['ruangan'], 0)
+            if sched.get('jumlah_mahasiswa', 0) > room_capacity:
+                conflicts['capacity'].append({
+                    'conflict_type': 'Kapasitas ruangan terlampaui',
+                    'ruangan': sched['ruangan'],
+                    'kapasitas': room_capacity,
+                    'mahasiswa': sched.get('jumlah_mahasiswa', 0),
+                    'schedule': sched
+                })
+        
+        for j, other in enumerate(all_schedules[i+1:], i+1):
+            if (sched['kelas'] == other['kelas'] 
+                and sched['hari'] == other['hari'] 
+                and other.get('jam')):
+                try:
+                    s_start, s_end = sched['jam'].split(' - ')
+                    o_start, o_end = other['jam'].split(' - ')
+                    
+                    s_start_time, _ = generator.parse_time(s_start)
+                    s_end_time, _ = generator.parse_time(s_end)
+                    o_start_time, _ = generator.parse_time(o_start)
+                    o_end_time, _ = generator.parse_time(o_end)
+                    
+                    if (s_start_time and s_end_time and o_start_time and o_end_time
+                        and generator.is_time_overlap(s_start_time, s_end_time, o_start_time, o_end_time)):
+                        conflicts['class'].append({
+                            'conflict_type': 'Kelas ganda',
+                            'kelas': sched['kelas'],
+                            'hari': sched['hari'],
+                            'waktu': f"{max(s_start_time, o_start_time)}-{min(s_end_time, o_end_time)}",
+                            'schedule1': sched,
+                            'schedule2': other
+                        })
+                except:
+                    continue
+        
+        if sched.get('ruangan') != 'Online' and sched.get('jam'):
+            try:
+                jam_parts = sched['jam'].split(' - ')
+                if len(jam_parts) == 2:
+                    start, end = jam_parts
+                    if generator.is_break_time(start, end):
+                        conflicts['break_time'].append({
+                            'conflict_type': 'Waktu istirahat',
+                            'dosen': sched['dosen'],
+                            'hari': sched['hari'],
+                            'waktu': sched['jam'],
+                            'schedule': sched
+                        })
+            except:
+                pass
+            
+        lecturer_pref = generator.lecturer_preferences.get(sched['dosen'], {})
+        online_days = lecturer_pref.get('online_days', [])
+        if sched['hari'] in online_days and sched.get('ruangan') != 'Online':
+            conflicts['online_day'].append({
+                'conflict_type': 'Hari online tidak menggunakan ruang online',
+                'dosen': sched['dosen'],
+                'hari': sched['hari'],
+                'waktu': sched['jam'],
+                'schedule': sched,
+                'ruangan': sched.get('ruangan', '')
+            })
+        
+        available_days = lecturer_pref.get('available_days', [])
+        if available_days and sched['hari'] not in available_days:
+            conflicts['preference'].append({
+                'conflict_type': 'Hari tidak tersedia',
+                'dosen': sched['dosen'],
+                'hari': sched['hari'],
+                'waktu': sched['jam'],
+                'schedule': sched
+            })
+            
+        if lecturer_pref.get('preferred_times_offline') or lecturer_pref.get('preferred_times_online'):
+            time_ok = False
+            start_time, _ = generator.parse_time(sched['jam'].split(' - ')[0])
+            end_time, _ = generator.parse_time(sched['jam'].split(' - ')[1])
+            
+            is_online = sched.get('ruangan') == 'Online'
+            preferred_times = lecturer_pref.get('preferred_times_online' if is_online else 'preferred_times_offline', [])
+            
+            for pref_start, pref_end in preferred_times:
+                pref_start_time, _ = generator.parse_time(pref_start)
+                pref_end_time, _ = generator.parse_time(pref_end)
+                
+                if pref_start_time and pref_end_time and start_time >= pref_start_time and end_time <= pref_end_time:
+                    time_ok = True
+                    break
+            
+            if preferred_times and not time_ok:
+                conflicts['preference'].append({
+                    'conflict_type': 'Waktu tidak diinginkan',
+                    'dosen': sched['dosen'],
+                    'hari': sched['hari'],
+                    'waktu': sched['jam'],
+                    'schedule': sched
+                })
+    
+    return conflicts
@@ -0,0 +1,121 @@
+"""Cek bahwa cache yang gagal dimuat tidak pernah ditimpa.
+
+Untuk setiap kasus (snapshot dari versi lebih baru, index snapshot rusak,
+section jadwal rusak, pickle lama yang rusak) dibuat file cache dan journal
+berisi entri, lalu ScheduleGenerator baru memuatnya secara lazy seperti GUI,
+memuat ruangan (checkpoint -> save_cache), memadatkan journal dan mencatat
+perubahan.
+Isi file cache dan journal harus tetap sama byte per byte.
+
+Contoh:
+    python snapshot_check.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+import app13
+
+ROOMS = [{'nama': 'B3A', 'lantai': 3, 'kapasitas': 40}, {'nama': 'B3B', 'lantai': 3, 'kapasitas': 30}]
+
+
+def write_newer_snapshot(generator):
+    # Snapshot valid tetapi dengan byte versi di atas yang didukung build ini
+    supported = app13.SnapshotFile.VERSION
+    app13.SnapshotFile.VERSION = supported + 1
+    try:
+        generator.save_cache()
+    finally:
+        app13.SnapshotFile.VERSION = supported
+
+
+def write_corrupt_index(generator):
+    with open(generator.cache_file, 'wb') as f:
+        f.write(app13.SnapshotFile.MAGIC + b'\x00\x01\xff\xff\xff\xffbukan index')
+
+
+def write_corrupt_schedules(generator):
+    # Index dan section lain utuh; hanya section jadwal yang tidak bisa di-decompress
+    generator.save_cache()
+    snapshot = app13.SnapshotFile(generator.cache_file)
+    snapshot.read_index()
+    info = snapshot.index['sections']['schedules']
+    with open(generator.cache_file, 'r+b') as f:
+        f.seek(snapshot._data_offset + info['offset'])
+        f.write(b'\xff' * info['length'])
+
+
+def write_corrupt_pickle(generator):
+    with open(generator.cache_file, 'wb') as f:
+        f.write(b'bukan pickle')
+
+
+def prepare(folder, write_cache):
+    """Cache dan journal dari sesi sebelumnya, dengan entri journal yang belum dipadatkan"""
+    generator = app13.ScheduleGenerator()
+    generator.error_handler = print
+    generator.cache_file = os.path.join(folder, 'schedule_cache.pkl')
+    generator.enable_journal(os.path.join(folder, 'schedule_journal.jsonl'))
+    generator.add_manual_schedule({'dosen': 'Dosen A', 'mata_kuliah': 'MK 1', 'kelas': 'TI24A',
+                                   'hari': 'Senin', 'jam': '08:00 - 09:40', 'ruangan': 'B3A',
+                                   'sks': 2, 'jumlah_mahasiswa': 30})
+    write_cache(generator)
+    generator.add_manual_schedule({'dosen': 'Dosen B', 'mata_kuliah': 'MK 2', 'kelas': 'TI24B',
+                                   'hari': 'Selasa', 'jam': '10:00 - 11:40', 'ruangan': 'B3B',
+                                   'sks': 2, 'jumlah_mahasiswa': 25})
+    generator.close_storage()
+    return generator.cache_file, generator.journal_file
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def run_case(name, write_cache):
+    with tempfile.TemporaryDirectory() as folder:
+        cache_file, journal_file = prepare(folder, write_cache)
+        rooms_file = os.path.join(folder, 'rooms.json')
+        with open(rooms_file, 'w', encoding='utf-8') as f:
+            json.dump(ROOMS, f)
+        before = read_bytes(cache_file), read_bytes(journal_file)
+
+        generator = app13.ScheduleGenerator()
+        generator.error_handler = print
+        generator.cache_file = cache_file
+        generator.enable_journal(journal_file)
+        generator.load_cache(lazy=True)
+        # Sama seperti fallback GUI saat cache tidak termuat
+        generator.load_rooms(rooms_file)
+        generator.save_cache()
+        generator.compact_journal_async(force=True)
+        generator.wait_for_compaction()
+        generator.add_lecturer_break('Dosen A', 'Senin', '12:00', '13:00')
+        generator.close_storage()
+
+        problems = []
+        if not generator.cache_read_only:
+            problems.append("cache_read_only tidak diset")
+        if read_bytes(cache_file) != before[0]:
+            problems.append("file cache berubah")
+        if read_bytes(journal_file) != before[1]:
+            problems.append("journal berubah")
+        print(f"{name:<22} {'OK' if not problems else ', '.join(problems)}")
+        return not problems
+
+
+def main():
+    cases = (('versi lebih baru', write_newer_snapshot),
+             ('index snapshot rusak', write_corrupt_index),
+             ('section jadwal rusak', write_corrupt_schedules),
+             ('pickle lama rusak', write_corrupt_pickle))
+    failed = [name for name, write_cache in cases if not run_case(name, write_cache)]
+    if failed:
+        print(f"{len(failed)} kasus menimpa cache yang gagal dimuat", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())